@@ -0,0 +1,44 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+'''
+	Build time and graph memory of the array backend against networkx
+'''
+
+import tracemalloc
+
+from common import *
+
+from GraphDSL.Builder import GraphBuilder
+from GraphDSL.Plan import GraphPlanner
+from GraphDSL.backend.networkx import NetworkXBackend
+from GraphDSL.backend.array import ArrayBackend
+
+
+def graph_size(build):
+	# Memory freed when the built graph is dropped
+	tracemalloc.start()
+	graphs = [build()]
+	held = tracemalloc.get_traced_memory()[0]
+	graphs.clear()
+	size = held - tracemalloc.get_traced_memory()[0]
+	tracemalloc.stop()
+	return size
+
+
+def run(sizes=(10000, 100000)):
+	for n in sizes:
+		plan = GraphPlanner(random_graphdef(n // 10, n), graph_directed=True).lower()
+		
+		for name, backend in (('networkx', NetworkXBackend), ('array', ArrayBackend)):
+			build = lambda: GraphBuilder(plan, backend, graph_directed=True).build()
+			
+			seconds = best_of(build, repeat=3)
+			report(f'{name} edges={n}', seconds, graph_mb=f'{graph_size(build) / 2**20:.1f}')
+			
+		g = GraphBuilder(plan, ArrayBackend, graph_directed=True).build()
+		report(f'array to_scipy edges={n}', best_of(lambda: g.to_scipy('length'), repeat=3))
+		
+		
+if __name__ == '__main__':
+	run()
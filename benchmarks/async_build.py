@@ -0,0 +1,57 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+'''
+	Longest event loop stall while a graph is built: plain call vs abuild.
+	Full collections of a large networkx graph are stalls abuild can't split.
+'''
+
+import gc
+import time
+import asyncio
+
+from common import *
+from instantiate_many import sweep_factory
+
+from GraphDSL.backend import networkx, array
+
+
+async def max_stall(build):
+	# Longest gap between two runs of a task yielding to the loop
+	task = asyncio.ensure_future(build())
+	stall = 0
+	last = time.perf_counter()
+	while not task.done():
+		await asyncio.sleep(0)
+		now = time.perf_counter()
+		stall = max(stall, now - last)
+		last = now
+	await task
+	return stall
+
+
+async def blocking(factory, backend):
+	return factory({'color': 1}, backend=backend)
+
+
+def run(edges=200000):
+	factory = sweep_factory(edges // 10, edges)
+	factory.lower()
+	
+	for name, backend in (('networkx', networkx), ('array', array)):
+		if not getattr(backend, 'imported', True):
+			continue
+			
+		gc.collect()
+		call = asyncio.run(max_stall(lambda: blocking(factory, backend)))
+		report(f'{name} call edges={edges}', call)
+		
+		# The longest stall as a fraction of a plain call's
+		for chunk_size in (1000, 5000):
+			gc.collect()
+			stall = asyncio.run(max_stall(lambda: factory.abuild({'color': 1}, backend=backend, chunk_size=chunk_size)))
+			report(f'{name} abuild chunk_size={chunk_size}', stall, of_call=f'{stall / call:.2f}')
+			
+			
+if __name__ == '__main__':
+	run()
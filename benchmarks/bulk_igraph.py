@@ -0,0 +1,40 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+'''
+	Build time scaling of the igraph backend, per-element vs batched
+'''
+
+import warnings
+
+from common import *
+
+from GraphDSL.Builder import GraphBuilder
+from GraphDSL.Plan import GraphPlanner
+from GraphDSL.backend.abstract import Backend
+from GraphDSL.backend.igraph import IGraphBackend
+
+
+class PerElementBackend(IGraphBackend):
+	add_nodes_from = Backend.add_nodes_from
+	add_edges_from = Backend.add_edges_from
+
+
+def run(sizes=(1000, 10000, 100000), per_element_limit=10000):
+	warnings.simplefilter('ignore', DeprecationWarning)
+	
+	for n in sizes:
+		plan = GraphPlanner(random_graphdef(n // 10, n), graph_directed=True).lower()
+		
+		build = lambda backend: GraphBuilder(plan, backend, graph_directed=True).build()
+		
+		bulk = best_of(lambda: build(IGraphBackend), repeat=3)
+		report(f'igraph bulk edges={n}', bulk, us_per_edge=f'{bulk / n * 1e6:.2f}')
+		
+		if n <= per_element_limit:
+			per_element = best_of(lambda: build(PerElementBackend), repeat=1)
+			report(f'igraph per-element edges={n}', per_element, us_per_edge=f'{per_element / n * 1e6:.2f}')
+			
+			
+if __name__ == '__main__':
+	run()
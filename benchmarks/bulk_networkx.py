@@ -0,0 +1,35 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+'''
+	Per-element vs bulk insertion in the NetworkX backend
+'''
+
+from common import *
+
+from GraphDSL.Builder import GraphBuilder
+from GraphDSL.Plan import GraphPlanner
+from GraphDSL.backend.abstract import Backend
+from GraphDSL.backend.networkx import NetworkXBackend
+
+
+class PerElementBackend(NetworkXBackend):
+	add_nodes_from = Backend.add_nodes_from
+	add_edges_from = Backend.add_edges_from
+
+
+def run(sizes=(1000, 10000, 50000)):
+	for n in sizes:
+		plan = GraphPlanner(random_graphdef(n // 10, n), graph_directed=True).lower()
+		
+		build = lambda backend: GraphBuilder(plan, backend, graph_directed=True).build()
+		
+		per_element = best_of(lambda: build(PerElementBackend))
+		bulk = best_of(lambda: build(NetworkXBackend))
+		
+		report(f'networkx per-element edges={n}', per_element)
+		report(f'networkx bulk edges={n}', bulk, speedup=f'{per_element / bulk:.2f}x')
+		
+		
+if __name__ == '__main__':
+	run()
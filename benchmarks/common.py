@@ -0,0 +1,42 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import random
+import timeit
+
+import context
+
+from GraphDSL.GraphAst import *
+
+
+def nodedef(value, **data):
+	return GraphAstNodedef(GraphAstLitteralValue(value), {k: GraphAstLitteralValue(v) for k, v in data.items()})
+
+def edge(n1, n2, **data):
+	return GraphAstEdge(n1, n2, {k: GraphAstLitteralValue(v) for k, v in data.items()}, '-', '>')
+
+
+def random_graphdef(nodes, edges, seed=0):
+	'''
+		GraphDef with `edges` random edges between `nodes` values
+	'''
+	rnd = random.Random(seed)
+	
+	statements = [nodedef(i, weight=i) for i in range(nodes)]
+	statements += [
+		edge(nodedef(rnd.randrange(nodes)), nodedef(rnd.randrange(nodes)), length=i)
+		for i in range(edges)
+	]
+	
+	return GraphDef(statements)
+
+
+def best_of(fn, repeat=5, number=1, gc=False):
+	# timeit disables the garbage collector unless gc=True
+	setup = 'gc.enable()' if gc else 'pass'
+	return min(timeit.repeat(fn, setup=setup, repeat=repeat, number=number)) / number
+
+
+def report(name, seconds, **extra):
+	fields = ' '.join(f'{k}={v}' for k, v in extra.items())
+	print(f'{name:<48} {seconds * 1000:10.2f} ms {fields}')
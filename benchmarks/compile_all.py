@@ -0,0 +1,40 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+'''
+	Compiling every graph of a large template module, sequentially vs with
+	compile_all in a process pool
+'''
+
+import os
+import sys
+import subprocess
+import tempfile
+
+from common import *
+from lazy_import import template_module
+
+
+def compile_time(directory, module, workers):
+	code = (
+		f'import time, GraphDSL; t = time.perf_counter(); import {module}; '
+		f'GraphDSL.compile_all({module}, workers={workers}); print(time.perf_counter() - t)'
+	)
+	path = os.pathsep.join([directory, os.path.dirname(os.path.realpath(__file__)) + '/../src', *sys.path])
+	
+	out = subprocess.run([sys.executable, '-c', code], env={**os.environ, 'PYTHONPATH': path}, capture_output=True, text=True, check=True)
+	return float(out.stdout)
+
+
+def run(count=300, workers=(1, 2, 4), repeat=3):
+	with tempfile.TemporaryDirectory() as directory:
+		with open(os.path.join(directory, 'templates.py'), 'w') as f:
+			f.write(template_module(count, True))
+			
+		for n in workers:
+			seconds = min(compile_time(directory, 'templates', n) for i in range(repeat))
+			report(f'import + compile {count} graphs workers={n}', seconds, cpus=os.cpu_count())
+			
+			
+if __name__ == '__main__':
+	run()
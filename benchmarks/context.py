@@ -0,0 +1,6 @@
+#!/usr/bin/env python3
+
+import sys
+import os
+# GRAPHDSL_SRC runs the benchmarks against another checkout (see suite.py)
+sys.path.insert(0, os.environ.get('GRAPHDSL_SRC') or os.path.dirname(os.path.realpath(__file__)) + "/../src")
@@ -0,0 +1,43 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+'''
+	Stars written as one line per edge vs a single fan-out statement:
+	AST size, compile, lowering and networkx build times.
+'''
+
+from common import *
+from loops import compile_source
+
+from GraphDSL.Builder import GraphBuilder
+from GraphDSL.Plan import GraphPlanner
+from GraphDSL.backend.networkx import NetworkXBackend
+
+
+def lines(n):
+	return '@Graph(directed=True)\ndef g():\n\thub = (0)\n' + ''.join(f'\thub -{{w: 1}}> ({i})\n' for i in range(1, n + 1))
+
+def fan(n):
+	return '@Graph(directed=True)\ndef g():\n\thub = (0)\n\thub -{w: 1}> [' + ', '.join(f'({i})' for i in range(1, n + 1)) + ']\n'
+
+
+def run(sizes=(1000, 10000, 100000)):
+	for n in sizes:
+		for name, source in (('lines', lines(n)), ('fan', fan(n))):
+			compile_time = best_of(lambda: compile_source(source), repeat=3)
+			ast = compile_source(source)
+
+			lower = lambda: GraphPlanner(ast, graph_directed=True).lower()
+			lower_time = best_of(lower, repeat=3)
+			plan = lower()
+
+			build = lambda: GraphBuilder(plan, NetworkXBackend, graph_directed=True).build()
+			build_time = best_of(build, repeat=3)
+
+			report(f'{name} compile edges={n}', compile_time, statements=len(ast.nodes))
+			report(f'{name} lower edges={n}', lower_time)
+			report(f'{name} networkx build edges={n}', build_time)
+
+
+if __name__ == '__main__':
+	run()
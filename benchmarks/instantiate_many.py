@@ -0,0 +1,39 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+'''
+	Parameter sweep over one topology, full builds vs structural copies
+'''
+
+from common import *
+
+from GraphDSL.Factory import GraphFactory
+
+
+def sweep_factory(nodes, edges):
+	'''
+		GraphFactory over random_graphdef, with one node colored by a parameter
+	'''
+	ast = random_graphdef(nodes, edges)
+	ast.nodes[0].data['color'] = GraphAstGetValue('color')
+	
+	factory = GraphFactory.__new__(GraphFactory)
+	factory.__init__(lambda: None, directed=True, lazy=True)
+	factory.compiled_ast = ast
+	
+	return factory
+
+
+def run(edges=20000, variants=50):
+	factory = sweep_factory(edges // 10, edges)
+	parameters = [{'color': i} for i in range(variants)]
+	
+	rebuild = best_of(lambda: factory.instantiate_many(parameters), repeat=3)
+	copy = best_of(lambda: factory.instantiate_many(parameters, copy=True), repeat=3)
+	
+	report(f'instantiate_many build edges={edges} x{variants}', rebuild)
+	report(f'instantiate_many copy edges={edges} x{variants}', copy, speedup=f'{rebuild / copy:.2f}x')
+	
+	
+if __name__ == '__main__':
+	run()
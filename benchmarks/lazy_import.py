@@ -0,0 +1,53 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+'''
+	Import time of a module declaring many graphs, eager vs lazy compilation
+'''
+
+import os
+import sys
+import subprocess
+import tempfile
+
+from common import *
+
+
+def template_module(count, lazy):
+	lines = ['from GraphDSL import Graph', '']
+	
+	for i in range(count):
+		lines += [
+			f'@Graph(directed=True, lazy={lazy})',
+			f'def g{i}(c):',
+			f'\t(0, {{color: c, index: {i}}}) -{{weight: 1}}> (1) -{{weight: 2}}> (2) <{{}}- (3)',
+			'\tcenter = (4)',
+			'\tcenter -{}> (5) -{}> (6)',
+			'\t(7) -{}> center',
+			''
+		]
+		
+	return '\n'.join(lines)
+
+
+def import_time(directory, module):
+	code = f'import time; t = time.perf_counter(); import {module}; print(time.perf_counter() - t)'
+	path = os.pathsep.join([directory, os.path.dirname(os.path.realpath(__file__)) + '/../src', *sys.path])
+	
+	out = subprocess.run([sys.executable, '-c', code], env={**os.environ, 'PYTHONPATH': path}, capture_output=True, text=True, check=True)
+	return float(out.stdout)
+
+
+def run(count=300, repeat=3):
+	with tempfile.TemporaryDirectory() as directory:
+		for lazy in (False, True):
+			module = f'templates_{"lazy" if lazy else "eager"}'
+			with open(os.path.join(directory, module + '.py'), 'w') as f:
+				f.write(template_module(count, lazy))
+				
+			seconds = min(import_time(directory, module) for i in range(repeat))
+			report(f'import {count} graphs lazy={lazy}', seconds)
+			
+			
+if __name__ == '__main__':
+	run()
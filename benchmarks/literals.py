@@ -0,0 +1,56 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+'''
+	Compile time of a graph holding 100k property values, eval vs decode_literal
+'''
+
+import tokenize
+import unittest.mock
+from io import BytesIO
+
+from common import *
+
+from GraphDSL import Compiler
+from GraphDSL.Compiler import GraphCompiler
+
+
+def property_source(values):
+	lines = []
+	for i in range(0, values, 4):
+		lines.append(f"({i}, {{label: 'node {i % 100}', weight: {i % 1000}, ratio: {i / 7:.3f}}}) -{{length: {i % 50}}}> ({i + 1})")
+	return '\n'.join(lines) + '\n'
+
+
+class NoMemo(dict):
+	def __setitem__(self, key, value):
+		pass
+
+
+def compile_source(source, memo=True):
+	compiler = GraphCompiler(BytesIO(source.encode('utf-8')).readline, graph_directed=True, default_node_params={}, default_edge_params={})
+	if not memo:
+		compiler.literals = NoMemo()
+	return compiler.parse_graph()
+
+
+def run(values=100000):
+	source = property_source(values)
+	tokens = [t.string for t in tokenize.tokenize(BytesIO(source.encode('utf-8')).readline) if t.type in (tokenize.STRING, tokenize.NUMBER)]
+	
+	evaluated = best_of(lambda: [eval(t) for t in tokens], repeat=3)
+	decoded = best_of(lambda: [Compiler.decode_literal(t) for t in tokens], repeat=3)
+	
+	report(f'eval tokens={len(tokens)}', evaluated)
+	report(f'decode_literal tokens={len(tokens)}', decoded, speedup=f'{evaluated / decoded:.2f}x')
+	
+	with unittest.mock.patch.object(Compiler, 'decode_literal', eval):
+		evaluated = best_of(lambda: compile_source(source, memo=False), repeat=3)
+	decoded = best_of(lambda: compile_source(source), repeat=3)
+	
+	report(f'compile eval values={values}', evaluated)
+	report(f'compile decode_literal+memo values={values}', decoded, speedup=f'{evaluated / decoded:.2f}x')
+	
+	
+if __name__ == '__main__':
+	run()
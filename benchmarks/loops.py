@@ -0,0 +1,56 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+'''
+	Lattices written with loops vs the same lattices unrolled into one
+	statement per edge: source size, compile time and lowering time.
+'''
+
+from io import BytesIO
+
+from common import *
+
+from GraphDSL.Compiler import GraphCompiler
+from GraphDSL.Plan import GraphPlanner
+
+
+LOOP = '''@Graph(directed=True)
+def g(n):
+	for i in range(n):
+		for j in range(n - 1):
+			(i * n + j, {row: i}) -{w: j}> (i * n + j + 1)
+			(j * n + i) -{w: j}> ((j + 1) * n + i)
+'''
+
+def unrolled(n):
+	lines = ['@Graph(directed=True)\n', 'def g(n):\n']
+	for i in range(n):
+		for j in range(n - 1):
+			lines.append(f'\t({i * n + j}, {{row: {i}}}) -{{w: {j}}}> ({i * n + j + 1})\n')
+			lines.append(f'\t({j * n + i}) -{{w: {j}}}> ({(j + 1) * n + i})\n')
+	return ''.join(lines)
+
+
+def compile_source(source):
+	return GraphCompiler(
+		BytesIO(source.encode('utf-8')).readline,
+		graph_directed=True, default_node_params={}, default_edge_params={}
+	).compile_to_ast()
+
+
+def run():
+	for n in (30, 100, 300):
+		edges = 2 * n * (n - 1)
+
+		for name, source in (('loop', LOOP), ('unrolled', unrolled(n))):
+			seconds = best_of(lambda: compile_source(source), repeat=3)
+			report(f'{name} compile n={n}', seconds, source=f'{len(source) / 1024:.0f}kB')
+
+			ast = compile_source(source)
+			lower = lambda: GraphPlanner(ast, graph_directed=True, parameters={'n': n}).lower()
+			seconds = best_of(lower, repeat=3)
+			report(f'{name} lower edges={edges}', seconds, rate=f'{edges / seconds / 1000:.0f}k/s')
+
+
+if __name__ == '__main__':
+	run()
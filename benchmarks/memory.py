@@ -0,0 +1,63 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+'''
+	Traced memory of declaring a 10^5 edges graph, then building it twice.
+	Only uses the public API, so it runs against any checkout (see
+	GRAPHDSL_SRC in context.py) to compare them.
+'''
+
+import sys
+import random
+import tempfile
+import tracemalloc
+
+from common import *
+from suite import graph_module
+
+from GraphDSL.backend import networkx as nxbackend
+
+
+def edges_body(nodes, edges, seed=0):
+	rnd = random.Random(seed)
+	return [
+		f'({rnd.randrange(nodes)}) -{{length: {i % 10}}}> ({rnd.randrange(nodes)}) -{{}}> ({rnd.randrange(nodes)})'
+		for i in range(edges // 2)
+	]
+
+
+def edges_source(nodes, edges, seed=0):
+	# The same graph as a source file, for GraphCompiler
+	return ''.join(line + '\n' for line in edges_body(nodes, edges, seed)).encode('utf-8')
+
+
+def run(edges=100000):
+	body = edges_body(edges // 10, edges)
+	mb = lambda size: f'{size / 2**20:.1f}'
+
+	print(f'edges={edges}')
+
+	with tempfile.TemporaryDirectory() as directory:
+		sys.path.insert(0, directory)
+		tracemalloc.start()
+
+		# Compiles the source
+		g = graph_module(directory, 'bench_memory', body)
+		declared, declare_peak = tracemalloc.get_traced_memory()
+		print(f'declaration    {mb(declared):>8} MB (peak {mb(declare_peak)} MB)')
+
+		# The first call also does whatever the checkout does once per graph
+		for call in ('first call', 'second call'):
+			tracemalloc.reset_peak()
+			base = tracemalloc.get_traced_memory()[0]
+			graph = g(backend=nxbackend)
+			size, peak = tracemalloc.get_traced_memory()
+			print(f'{call:<14} {mb(size - base):>8} MB kept (peak {mb(peak - base)} MB)')
+			del graph
+
+		tracemalloc.stop()
+		sys.path.remove(directory)
+
+
+if __name__ == '__main__':
+	run()
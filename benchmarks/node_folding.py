@@ -0,0 +1,39 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+'''
+	Node definitions folded by value at lowering vs every definition
+	inserted: plan slots, lowering and build times on graphs whose edges
+	repeat node literals
+'''
+
+from common import *
+
+from GraphDSL.Plan import GraphPlan, GraphPlanner
+from GraphDSL.Builder import GraphBuilder
+from GraphDSL.backend.networkx import NetworkXBackend
+from GraphDSL.backend.array import ArrayBackend
+
+
+def run(sizes=(10000, 100000)):
+	fold = GraphPlan.fold
+
+	for n in sizes:
+		ast = random_graphdef(n // 10, n)
+
+		for name in ('unfolded', 'folded'):
+			GraphPlan.fold = fold if name == 'folded' else lambda plan: None
+			try:
+				lower = lambda: GraphPlanner(ast, graph_directed=True).lower()
+				report(f'{name} lower edges={n}', best_of(lower, repeat=3, gc=True))
+				plan = lower()
+			finally:
+				GraphPlan.fold = fold
+
+			for backend in (NetworkXBackend, ArrayBackend):
+				build = lambda: GraphBuilder(plan, backend, graph_directed=True).build()
+				report(f'{name} {backend.__name__} edges={n}', best_of(build, repeat=3, gc=True), slots=len(plan.node_values))
+
+
+if __name__ == '__main__':
+	run()
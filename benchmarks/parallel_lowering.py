@@ -0,0 +1,41 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+'''
+	First build of a large graph (lowering + build), sequential vs
+	lowering in a process pool
+'''
+
+import time
+
+from common import *
+
+from GraphDSL.Builder import GraphBuilder
+from GraphDSL.Plan import GraphPlanner
+from GraphDSL.backend.networkx import NetworkXBackend
+
+
+def first_build(ast, workers):
+	start = time.perf_counter()
+	if workers:
+		plan = GraphPlanner.lower_parallel(ast, workers, graph_directed=True)
+	else:
+		plan = GraphPlanner(ast, graph_directed=True).lower()
+	lowered = time.perf_counter()
+	
+	GraphBuilder(plan, NetworkXBackend, graph_directed=True).build()
+	
+	return lowered - start, time.perf_counter() - start
+
+
+def run(edges=200000, workers=(0, 2, 4)):
+	ast = random_graphdef(edges // 20, edges)
+	
+	for n in workers:
+		lower, total = min(first_build(ast, n) for _ in range(3))
+		report(f'workers={n} lower edges={edges}', lower)
+		report(f'workers={n} lower+build edges={edges}', total)
+		
+		
+if __name__ == '__main__':
+	run()
@@ -0,0 +1,33 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+'''
+	Changing one parameter of a built graph: full build vs rebuild in place
+'''
+
+from common import *
+from instantiate_many import sweep_factory
+
+from GraphDSL.backend import networkx, igraph, array
+
+
+def run(sizes=(10000, 100000)):
+	for edges in sizes:
+		factory = sweep_factory(edges // 10, edges)
+		
+		for name, backend in (('networkx', networkx), ('igraph', igraph), ('array', array)):
+			if not getattr(backend, 'imported', True):
+				continue
+				
+			g = factory(parameters={'color': 0}, backend=backend, rebuildable=True)
+			colors = iter(range(1, 10**6))
+			
+			build = best_of(lambda: factory(parameters={'color': 1}, backend=backend), repeat=3)
+			rebuild = best_of(lambda: factory.rebuild(g, {'color': next(colors)}), repeat=3, number=100)
+			
+			report(f'{name} build edges={edges}', build)
+			report(f'{name} rebuild edges={edges}', rebuild, speedup=f'{build / rebuild:.0f}x')
+			
+			
+if __name__ == '__main__':
+	run()
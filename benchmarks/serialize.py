@@ -0,0 +1,46 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+'''
+	Size and speed of GraphDSL.serialize against pickle, for a compiled
+	AST and its plan, and against compiling the source again
+'''
+
+import pickle
+from io import BytesIO
+
+from common import *
+from memory import edges_source
+
+from GraphDSL import serialize
+from GraphDSL.Compiler import GraphCompiler
+from GraphDSL.Plan import GraphPlanner
+
+
+def compile_source(source):
+	readline = BytesIO(source).readline
+	return GraphCompiler(readline, graph_directed=True, default_node_params={'size': 1}, default_edge_params={}).parse_graph()
+
+
+def run(edges=100000):
+	source = edges_source(edges // 10, edges)
+	
+	report(f'compile edges={edges}', best_of(lambda: compile_source(source), repeat=1, gc=True), bytes=len(source))
+	
+	ast = compile_source(source)
+	plan = GraphPlanner(ast, graph_directed=True).lower()
+	
+	codecs = (
+		('serialize', serialize.dumps, serialize.loads),
+		('pickle', lambda obj: pickle.dumps(obj, pickle.HIGHEST_PROTOCOL), pickle.loads)
+	)
+	
+	for kind, obj in (('ast', ast), ('plan', plan)):
+		for name, dumps, loads in codecs:
+			data = dumps(obj)
+			report(f'{name} {kind} dumps edges={edges}', best_of(lambda: dumps(obj), repeat=3, gc=True), bytes=len(data))
+			report(f'{name} {kind} loads edges={edges}', best_of(lambda: loads(data), repeat=3, gc=True))
+			
+			
+if __name__ == '__main__':
+	run()
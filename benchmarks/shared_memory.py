@@ -0,0 +1,57 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+'''
+	Handing a built graph to worker processes: pickled networkx / array
+	graphs against a shared memory array graph
+'''
+
+import pickle
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from common import *
+
+from GraphDSL.Builder import GraphBuilder
+from GraphDSL.Plan import GraphPlanner
+from GraphDSL.backend.networkx import NetworkXBackend
+from GraphDSL.backend.array import ArrayBackend
+
+
+def edge_count(g):
+	return g.number_of_edges()
+
+
+def transfer(pool, g, workers):
+	# Wall time for every worker to receive g and answer
+	start = time.perf_counter()
+	[*pool.map(edge_count, [g] * workers)]
+	return time.perf_counter() - start
+
+
+def run(sizes=(100000, 1000000), workers=4):
+	# Workers are started before any block exists, as in most pools
+	with ProcessPoolExecutor(workers) as pool:
+		for n in sizes:
+			plan = GraphPlanner(random_graphdef(n // 10, n), graph_directed=True).lower()
+			nx_graph = GraphBuilder(plan, NetworkXBackend, graph_directed=True).build()
+			array_graph = GraphBuilder(plan, ArrayBackend, graph_directed=True).build()
+			
+			for name, g in (('networkx pickle', nx_graph), ('array pickle', array_graph)):
+				data = pickle.dumps(g, protocol=pickle.HIGHEST_PROTOCOL)
+				report(f'{name} dumps+loads edges={n}', best_of(lambda: pickle.loads(pickle.dumps(g, protocol=pickle.HIGHEST_PROTOCOL)), repeat=3), mb=f'{len(data) / 2**20:.1f}')
+				report(f'{name} to {workers} workers edges={n}', min(transfer(pool, g, workers) for _ in range(3)))
+				
+			shared = array_graph.share()
+			try:
+				data = pickle.dumps(shared)
+				report(f'shared share edges={n}', best_of(lambda: array_graph.share().unlink(), repeat=3))
+				report(f'shared attach edges={n}', best_of(lambda: pickle.loads(data).close(), repeat=3), bytes=len(data))
+				report(f'shared to {workers} workers edges={n}', min(transfer(pool, shared, workers) for _ in range(3)))
+			finally:
+				shared.close()
+				shared.unlink()
+				
+				
+if __name__ == '__main__':
+	run()
@@ -0,0 +1,57 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+'''
+	Exporting a graph to a file: sink backends vs a networkx build followed
+	by its writer. Throughput and peak traced memory.
+'''
+
+import os
+import tempfile
+import tracemalloc
+
+from common import *
+from instantiate_many import sweep_factory
+
+from GraphDSL.backend import networkx
+from GraphDSL.backend.sink import EdgeListBackend, CSVBackend, DOTBackend, GraphMLBackend
+
+
+def peak(fn):
+	tracemalloc.start()
+	fn()
+	size = tracemalloc.get_traced_memory()[1]
+	tracemalloc.stop()
+	return size
+
+
+def run(edges=200000):
+	factory = sweep_factory(edges // 10, edges)
+	factory.lower()
+	parameters = {'color': 1}
+	
+	with tempfile.TemporaryDirectory() as directory:
+		path = lambda name: os.path.join(directory, name)
+		
+		sinks = [
+			('edgelist', EdgeListBackend(path('g.txt')), 'write_edgelist'),
+			('csv', CSVBackend(path('g.csv'), columns=['length'])),
+			('dot', DOTBackend(path('g.dot'))),
+			('graphml', GraphMLBackend(path('g.graphml')), 'write_graphml'),
+		]
+		
+		for name, backend, *writer in sinks:
+			sink = lambda: factory(parameters, backend=backend)
+			seconds = best_of(sink, repeat=3, gc=True)
+			report(f'{name} sink edges={edges}', seconds, rate=f'{edges / seconds / 1000:.0f}k/s', peak=f'{peak(sink) / 2**20:.1f}MB')
+			
+			if writer and networkx.imported:
+				import networkx as nx
+				write = getattr(nx, writer[0])
+				export = lambda: write(factory(parameters), path('nx'))
+				seconds = best_of(export, repeat=3, gc=True)
+				report(f'{name} networkx + {writer[0]}', seconds, rate=f'{edges / seconds / 1000:.0f}k/s', peak=f'{peak(export) / 2**20:.1f}MB')
+				
+				
+if __name__ == '__main__':
+	run()
@@ -0,0 +1,60 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+'''
+	Time and peak memory of GraphDSL.load on a large .gdsl file, streamed vs
+	compiled as a whole
+'''
+
+import os
+import random
+import tempfile
+import tracemalloc
+from io import BytesIO
+
+from common import *
+
+from GraphDSL.Loader import load
+from GraphDSL.Compiler import GraphCompiler
+from GraphDSL.Plan import GraphPlanner
+from GraphDSL.Builder import GraphBuilder
+from GraphDSL.backend.networkx import NetworkXBackend
+
+
+def write_source(path, nodes, edges, seed=0):
+	rnd = random.Random(seed)
+	with open(path, 'w') as f:
+		for i in range(edges):
+			f.write(f'({rnd.randrange(nodes)}) -{{length: {i}}}> ({rnd.randrange(nodes)})\n')
+			
+			
+def load_whole(path):
+	with open(path, 'rb') as f:
+		source = f.read()
+		
+	compiler = GraphCompiler(BytesIO(source).readline, graph_directed=True, default_node_params={}, default_edge_params={})
+	plan = GraphPlanner(compiler.parse_graph(), graph_directed=True).lower()
+	
+	return GraphBuilder(plan, NetworkXBackend, graph_directed=True).build()
+
+
+def peak(fn):
+	tracemalloc.start()
+	fn()
+	peak = tracemalloc.get_traced_memory()[1]
+	tracemalloc.stop()
+	return peak
+
+
+def run(edges=50000):
+	with tempfile.TemporaryDirectory() as directory:
+		path = os.path.join(directory, 'graph.gdsl')
+		write_source(path, edges // 10, edges)
+		
+		for name, fn in (('whole', lambda: load_whole(path)), ('streamed', lambda: load(path))):
+			seconds = best_of(fn, repeat=1)
+			report(f'load {name} edges={edges}', seconds, peak_mb=f'{peak(fn) / 2**20:.1f}')
+			
+			
+if __name__ == '__main__':
+	run()
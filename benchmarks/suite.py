@@ -0,0 +1,229 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+'''
+	Benchmark suite: compile time by source size, build time and memory
+	peak of chains, stars, cliques and property-heavy graphs on each
+	backend, and parameter-heavy instantiation. Only uses the public API,
+	so it runs against any checkout.
+
+	python suite.py [--quick] [--filter TEXT] [-o results.json]
+	python suite.py compare old.json new.json
+	python suite.py checkouts ../old .      # runs both, then compares
+'''
+
+import os
+import sys
+import json
+import time
+import platform
+import argparse
+import tempfile
+import importlib
+import subprocess
+import tracemalloc
+from io import BytesIO
+
+from common import *
+
+import GraphDSL
+from GraphDSL.Compiler import GraphCompiler
+
+
+BACKENDS = ('networkx', 'igraph', 'array')
+
+
+def backends():
+	for name in BACKENDS:
+		try:
+			backend = importlib.import_module('GraphDSL.backend.' + name)
+		except ImportError: # Not in this checkout
+			continue
+		if getattr(backend, 'imported', True):
+			yield name, backend
+
+
+# Graph bodies, one statement per line
+
+def chain(n):
+	# Chains of 10 hops
+	return [
+		' -{}> '.join(f'({i})' for i in range(start, min(start + 11, n + 1)))
+		for start in range(0, n, 10)
+	]
+
+def star(n):
+	return ['c = (0)'] + [f'c -{{}}> ({i})' for i in range(1, n + 1)]
+
+def clique(n):
+	k = int((1 + (1 + 4 * n) ** 0.5) / 2)
+	return [f'({i}) -{{}}> ({j})' for i in range(k) for j in range(k) if i != j]
+
+def properties(n):
+	return [
+		f"({i % 500}, {{size: {i}, label: 'n{i}', ratio: 0.5, color: c}}) "
+		f"-{{weight: {i}, kind: 'road', length: l, cost: 1.5}}> "
+		f"({(i * 7) % 500}, {{size: {i}, color: c}})"
+		for i in range(n)
+	]
+
+def parameterized(n):
+	# Every edge weight is one of 50 parameters
+	return [f'({i % 200}) -{{weight: p{i % 50}}}> ({(i + 1) % 200})' for i in range(n)]
+
+SHAPES = {'chain': chain, 'star': star, 'clique': clique, 'properties': properties}
+
+
+def function_source(name, body, parameters=()):
+	return f'def {name}({", ".join(parameters)}):\n' + ''.join(f'\t{line}\n' for line in body)
+
+def graph_module(directory, name, body, parameters=()):
+	# Graphs are declared in a module file, inspect.getsource needs one
+	with open(os.path.join(directory, name + '.py'), 'w') as f:
+		f.write('from GraphDSL import Graph\n\n@Graph(directed=True)\n')
+		f.write(function_source('g', body, parameters))
+
+	return importlib.import_module(name).g
+
+
+def peak_memory(fn):
+	tracemalloc.start()
+	try:
+		result = fn()
+		peak = tracemalloc.get_traced_memory()[1]
+	finally:
+		tracemalloc.stop()
+	del result
+	return peak
+
+
+def cases(scale, directory):
+	'''
+		(name, function, measure memory) of every benchmark
+	'''
+	for n in (100, 1000, 10000):
+		source = function_source('g', chain(n * scale)).encode('utf-8')
+		parse = lambda source=source: GraphCompiler(
+			BytesIO(source).readline, False,
+			graph_directed=True, default_node_params={}, default_edge_params={}
+		).compile_to_ast()
+		yield f'compile/chain/edges={n * scale}', parse, False
+
+	for shape, body in SHAPES.items():
+		n = 5000 * scale
+		g = graph_module(directory, f'bench_{shape}', body(n), ('c', 'l'))
+
+		for name, backend in backends():
+			build = lambda g=g, backend=backend: g(parameters={'c': 'red', 'l': 2}, backend=backend)
+			yield f'build/{shape}/{name}/edges={n}', build, True
+
+	n = 2000 * scale
+	g = graph_module(directory, 'bench_parameters', parameterized(n), [f'p{i}' for i in range(50)])
+	sweep = [{f'p{i}': i * j for i in range(50)} for j in range(20)]
+
+	for name, backend in backends():
+		instantiate = lambda g=g, backend=backend: [g(parameters=p, backend=backend) for p in sweep]
+		yield f'instantiate/params=50x20/{name}/edges={n}', instantiate, False
+
+
+def metadata():
+	src = os.path.dirname(os.path.dirname(os.path.realpath(GraphDSL.__file__)))
+	try:
+		commit = subprocess.run(['git', 'rev-parse', 'HEAD'], cwd=src, capture_output=True, text=True, check=True).stdout.strip()
+	except (OSError, subprocess.CalledProcessError):
+		commit = None
+
+	return {
+		'src': src,
+		'commit': commit,
+		'version': getattr(GraphDSL, '__version__', None),
+		'python': platform.python_version(),
+		'platform': platform.platform(),
+		'date': time.strftime('%Y-%m-%dT%H:%M:%S')
+	}
+
+
+def run(quick=False, only=None, repeat=None):
+	scale = 1 if quick else 2
+	repeat = repeat or (3 if quick else 5)
+	results = {}
+
+	with tempfile.TemporaryDirectory() as directory:
+		sys.path.insert(0, directory)
+
+		for name, fn, memory in cases(scale, directory):
+			if only and only not in name:
+				continue
+
+			result = {'seconds': best_of(fn, repeat=repeat, gc=True)}
+			if memory:
+				result['peak_bytes'] = peak_memory(fn)
+			results[name] = result
+
+			extra = {'peak': f'{result["peak_bytes"] / 2**20:.1f}MB'} if memory else {}
+			report(name, result['seconds'], **extra)
+
+		sys.path.remove(directory)
+
+	return {'metadata': metadata(), 'results': results}
+
+
+def compare(old, new, out=sys.stdout):
+	'''
+		Prints new / old ratios of the benchmarks found in both
+	'''
+	a, b = old['results'], new['results']
+
+	print(f'{"benchmark":<52} {"old ms":>10} {"new ms":>10} {"ratio":>7}', file=out)
+	for name in [k for k in a if k in b]:
+		ratio = b[name]['seconds'] / a[name]['seconds']
+		line = f'{name:<52} {a[name]["seconds"] * 1000:10.2f} {b[name]["seconds"] * 1000:10.2f} {ratio:6.2f}x'
+		if 'peak_bytes' in a[name] and 'peak_bytes' in b[name]:
+			line += f'  memory {b[name]["peak_bytes"] / a[name]["peak_bytes"]:.2f}x'
+		print(line, file=out)
+
+	for name in [k for k in a if k not in b]:
+		print(f'{name:<52} only in old', file=out)
+	for name in [k for k in b if k not in a]:
+		print(f'{name:<52} only in new', file=out)
+
+
+def run_checkout(path, args):
+	# The suite of this checkout, importing GraphDSL from the other one
+	with tempfile.NamedTemporaryFile(suffix='.json') as f:
+		env = {**os.environ, 'GRAPHDSL_SRC': os.path.join(os.path.realpath(path), 'src')}
+		subprocess.run([sys.executable, os.path.realpath(__file__), '-o', f.name, *args], env=env, check=True)
+		with open(f.name) as r:
+			return json.load(r)
+
+
+def main(argv=None):
+	parser = argparse.ArgumentParser(description='GraphDSL benchmark suite')
+	parser.add_argument('command', nargs='?', default='run', choices=('run', 'compare', 'checkouts'))
+	parser.add_argument('paths', nargs='*', help='results to compare, or checkouts to run')
+	parser.add_argument('-o', '--output', help='write the results as JSON')
+	parser.add_argument('--quick', action='store_true', help='smaller sizes and fewer repeats')
+	parser.add_argument('--filter', help='only run the benchmarks whose name contains this')
+	parser.add_argument('--repeat', type=int)
+	args = parser.parse_args(argv)
+
+	if args.command == 'compare':
+		old, new = [json.load(open(path)) for path in args.paths]
+		compare(old, new)
+		return
+
+	if args.command == 'checkouts':
+		forward = [*(['--quick'] if args.quick else []), *(['--filter', args.filter] if args.filter else []), *(['--repeat', str(args.repeat)] if args.repeat else [])]
+		old, new = [run_checkout(path, forward) for path in args.paths]
+		compare(old, new)
+		return
+
+	results = run(args.quick, args.filter, args.repeat)
+
+	if args.output:
+		with open(args.output, 'w') as f:
+			json.dump(results, f, indent=1)
+
+
+if __name__ == '__main__':
+	main()
@@ -2,148 +2,163 @@
 # -*- coding: utf-8 -*-
 
 from types import ModuleType
+from itertools import islice
 
-from GraphDSL.graphAst import *
+from GraphDSL.plan import GraphPlan
+from GraphDSL.stats import phase
+from GraphDSL.exceptions import *
 
 class GraphBuilder:
-	def __init__(self, ast, backend, **kwargs):
-		self.ast = ast
-		
+	def __init__(self, plan, backend, **kwargs):
+		self.plan = plan
+
 		if isinstance(backend, ModuleType):
 			backend = backend.default
-			
-		self.backend = backend()
-		
+
+		# A backend class, or an instance (sinks, which take their output)
+		self.backend = backend() if callable(backend) else backend
+
+		# GraphStats, None when disabled
+		self.stats = kwargs.get('stats')
+		if self.stats is not None:
+			self.stats.observe(self.backend)
+
 		self.parameters = {}
-		
+
 		self.definitions = {}
-		
-		self.built_nodes = []
-				
+
 		self.graph_directed = kwargs.get('graph_directed')
 		self.graph_init = kwargs.get('graph_init')
-	
-		
-	def parse_assignation(self, node, g):
-		assert isinstance(node, GraphAstAssignation)
-		
-		name = node.name
-		value = self.parse_node(node.value, g)
-		
-		self.definitions[name] = value
-		
-		return value
-	
-	def parse_getnode(self, node, g):
-		assert isinstance(node, GraphAstGetNode)
-		
-		name = node.name
-		if name not in self.definitions.keys():
-			raise GraphNotDefinedException.NotDefined(name)
-		n = self.definitions[name]
-		
-		return n
-	
-	def parse_nodedef(self, node, g):
-		assert isinstance(node, GraphAstNodedef)
 		
-		v = self.parse_value(node.value)
-		
-		if node.data is None:
-			parsed_data = None
+		# Backend handles of the last run plan, by slot and by edge
+		self.handles = []
+		self.edge_handles = None
+		self.slot_groups = None
+
+
+	def run(self, plan, g):
+		for step in self.steps(plan, g, self.backend.chunk_size):
+			pass
+
+
+	def steps(self, plan, g, chunk_size=None):
+		'''
+			run() as a generator, pausing after each backend call. With a
+			chunk_size, nodes and edges are added by chunks of that many.
+		'''
+		assert isinstance(plan, GraphPlan)
+
+		count = len(plan.node_values) or 1
+		size = chunk_size or count
+
+		handles = []
+		for start in range(0, count, size):
+			handles += self.backend.add_nodes_from(g, plan.resolve_nodes(self.parameters, start, start + size))
+			yield
+
+		for name in plan.inputs:
+			if name not in self.definitions.keys():
+				raise GraphNotDefinedException.NotDefined(name)
+			handles.append(self.definitions[name])
+
+		edges = plan.resolve_edges(self.parameters, handles)
+
+		if chunk_size is None:
+			self.edge_handles = self.backend.add_edges_from(g, edges)
 		else:
-			parsed_data = {k: self.parse_value(v) for k, v in node.data.items()}
-		
-		n = self.backend.add_node(g, v, parsed_data)
-		
-		return n
-	
-	def parse_edge(self, node, g):
-		assert isinstance(node, GraphAstEdge)
-		
-		n1 = self.parse_node(node.node1, g)
-		n2 = self.parse_node(node.node2, g)
-		
-		
-		parsed_data = {k: self.parse_value(v) for k, v in node.data.items()}
-		
-		if not self.graph_directed and node.left_char == '-' and node.right_char == '-':
-			self.backend.add_edge(g, n1, n2, parsed_data)
-		elif node.left_char == '-' and node.right_char == '>':
-			self.backend.add_edge(g, n1, n2, parsed_data)
-		elif node.left_char == '<' and node.right_char == '-':
-			self.backend.add_edge(g, n2, n1, parsed_data)
-		elif node.left_char == '<' and node.right_char == '>':
-			self.backend.add_edge(g, n1, n2, parsed_data)
-			self.backend.add_edge(g, n2, n1, parsed_data)
-			
-		return n1
-	
-	
-	
-	def parse_node(self, node, g):
-		assert isinstance(node, GraphNode)
-		
-		if isinstance(node, GraphAstNodedef):
-			n = self.parse_nodedef(node, g)
-		elif isinstance(node, GraphAstGetNode):
-			n = self.parse_getnode(node, g)
-		elif isinstance(node, GraphAstAssignation):
-			n = self.parse_assignation(node, g)
-		elif isinstance(node, GraphAstEdge):
-			n = self.parse_edge(node, g)
-			
-		self.built_nodes.append(n)
-		
-		return n
-	
-	
-	def parse_literal_value(self, node):
-		assert isinstance(node, GraphAstLitteralValue)
-		
-		return node.value
-	
-	
-	def parse_get_value(self, node):
-		assert isinstance(node, GraphAstGetValue)
-		return self.parameters[node.name]
-	
-	
-	def parse_value(self, node):
-		if node is None:
-			return None
-		
-		assert isinstance(node, GraphAstValue)
-		
-		
-		if isinstance(node, GraphAstLitteralValue):
-			v = self.parse_literal_value(node)
-		elif isinstance(node, GraphAstGetValue):
-			v = self.parse_get_value(node)
-			
-		return v
-			
-	
-	def parse(self, ast, g):
-		assert isinstance(self.ast, GraphDef)
-		
-		for n in ast.nodes:
-			self.parse_node(n, g)
-			
-			
-	def build(self):
+			# Edge handles are only kept when the graph can be patched
+			updatable = self.backend.updatable
+			self.edge_handles = [] if updatable else None
+			chunk = [*islice(edges, chunk_size)]
+			while chunk:
+				edge_handles = self.backend.add_edges_from(g, chunk)
+				if updatable:
+					self.edge_handles += edge_handles
+				yield
+				chunk = [*islice(edges, chunk_size)]
+
+		self.handles = handles
+
+		for name, ref in plan.outputs.items():
+			self.definitions[name] = handles[ref]
+
+		if self.stats is not None:
+			self.stats.count('nodes', len(plan.node_values))
+			self.stats.count('edges', len(plan.edges))
+
+
+	def overlay(self, g, parameters, changed):
+		'''
+			Updates g, a graph built by this builder or a copy of it, to
+			`parameters`, which differ from the build ones by the `changed`
+			names. Only the nodes and edges depending on them are touched.
+			Returns False when the topology itself depends on a changed name.
+		'''
+		plan = self.plan
+
+		if plan.value_parameters & changed or self.edge_handles is None or not self.backend.updatable:
+			return False
+
+		with phase(self.stats, 'overlay'):
+			self.patch(g, parameters, changed)
+
+		return True
+
+	def patch(self, g, parameters, changed):
+		plan = self.plan
+
+		slots = set()
+		edges = set()
+		for name in changed:
+			s, e = plan.dependents.get(name, ((), ()))
+			slots.update(s)
+			edges.update(e)
+
+		if slots:
+			# Every definition of an affected node is replayed, in order
+			if self.slot_groups is None:
+				self.slot_groups = {}
+				for slot in range(len(plan.node_values)):
+					self.slot_groups.setdefault(self.handles[slot], []).append(slot)
+
+			affected = dict.fromkeys(self.handles[slot] for slot in sorted(slots))
+			self.backend.update_nodes(g, [
+				(n, plan.resolve_node(slot, parameters))
+				for n in affected for slot in self.slot_groups[n]
+			])
+
+		if edges:
+			self.backend.update_edges(g, [
+				(self.edge_handles[edge], plan.resolve_edge(edge, parameters))
+				for edge in sorted(edges)
+			])
+
+
+	def create_graph(self):
 		if self.graph_init is not None:
 			if isinstance(self.graph_init, tuple):
-				g = self.graph_init[0].__call__(*self.graph_init[1:])
+				return self.graph_init[0].__call__(*self.graph_init[1:])
 			else:
-				g = self.graph_init.__call__()
+				return self.graph_init.__call__()
 		else:
 			if self.graph_directed:
-				g = self.backend.create_directed_graph()
+				return self.backend.create_directed_graph()
 			else:
-				g = self.backend.create_undirected_graph()
-		
-		self.parse(self.ast, g)
-		
+				return self.backend.create_undirected_graph()
+
+
+	def build(self):
+		with phase(self.stats, 'build'):
+			g = self.create_graph()
+
+			try:
+				self.run(self.plan, g)
+				g = self.backend.finish_graph(g)
+			except BaseException:
+				self.backend.abort_graph(g)
+				raise
+
+		if self.stats is not None:
+			self.stats.count('builds')
+
 		return g
-	
\ No newline at end of file
@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import os
+import hashlib
+import tempfile
+
+from GraphDSL import __version__
+from GraphDSL import serialize
+from GraphDSL import compiler
+from GraphDSL.exceptions import GraphFormatException
+
+class GraphCache:
+	'''
+		On-disk cache of compiled GraphDef, in the GraphDSL.serialize format.
+		
+		Entries are keyed by the function source, the compile options, the
+		library version, and the compiler and serialization format versions.
+		`hook`, if given, is called with ('hit' | 'miss', key). A failed write
+		is ignored, the graph is just compiled again next time.
+	'''
+	
+	def __init__(self, directory, hook=None):
+		self.directory = directory
+		self.hook = hook
+		
+		self.hits = 0
+		self.misses = 0
+		
+		os.makedirs(directory, exist_ok=True)
+		
+		
+	def key(self, source, **options):
+		h = hashlib.sha256()
+		h.update(f'{__version__}/{compiler.FORMAT}/{serialize.VERSION}\n'.encode('utf-8'))
+		h.update(source.encode('utf-8'))
+		h.update(repr(sorted(options.items())).encode('utf-8'))
+		
+		return h.hexdigest()
+	
+	def path(self, key):
+		return os.path.join(self.directory, key + '.gdsl')
+	
+	
+	def get(self, key):
+		try:
+			with open(self.path(key), 'rb') as f:
+				ast = serialize.loads(f.read())
+		except (OSError, GraphFormatException):
+			ast = None
+			
+		if ast is None:
+			self.misses += 1
+			event = 'miss'
+		else:
+			self.hits += 1
+			event = 'hit'
+			
+		if self.hook is not None:
+			self.hook(event, key)
+			
+		return ast
+	
+	def put(self, key, ast):
+		# Written aside then renamed, readers never see a partial entry.
+		# Returns False if it couldn't be written
+		tmp = None
+		try:
+			fd, tmp = tempfile.mkstemp(dir=self.directory, suffix='.tmp')
+			with os.fdopen(fd, 'wb') as f:
+				f.write(serialize.dumps(ast))
+			os.replace(tmp, self.path(key))
+			tmp = None
+		except OSError:
+			return False
+		finally:
+			if tmp is not None:
+				try:
+					os.unlink(tmp)
+				except OSError:
+					pass
+					
+		return True
+		
+		
+	def stats(self):
+		return {'hits': self.hits, 'misses': self.misses}
+	
+	def clear(self):
+		for name in os.listdir(self.directory):
+			if name.endswith('.gdsl'):
+				os.unlink(os.path.join(self.directory, name))
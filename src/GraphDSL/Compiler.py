@@ -1,11 +1,49 @@
 #!/usr/bin/env python3
 # -*- coding: utf-8 -*-
 
+import ast
 import tokenize
 from GraphDSL.graphAst import *
 
 from GraphDSL.exceptions import *
 
+# Bumped whenever the AST produced for a source changes, so cached ASTs
+# of older compilers are not used
+FORMAT = 1
+
+# Operators of value expressions, by precedence level
+ADDITIVE = ('+', '-')
+MULTIPLICATIVE = ('*', '//', '%')
+
+
+def decode_literal(string):
+	'''
+		Value of a STRING or NUMBER token.
+		Plain ints, floats and strings are decoded directly, anything else
+		goes through ast.literal_eval (no expression is ever evaluated).
+	'''
+	first = string[0]
+	
+	if first in '\'"':
+		if '\\' not in string and not string.startswith(first * 3):
+			return string[1:-1]
+		
+	elif first in '0123456789.':
+		try:
+			return int(string)
+		except ValueError:
+			pass
+		try:
+			return float(string)
+		except ValueError:
+			pass
+		
+	try:
+		return ast.literal_eval(string)
+	except (ValueError, SyntaxError):
+		raise GraphSyntaxException(f'Invalid literal {string}')
+	
+
 class GraphCompiler:
 	def __init__(self, source, debug_tokens=False, **kwargs):
 		
@@ -13,7 +51,11 @@ class GraphCompiler:
 		self.default_node_params = {k: GraphAstLitteralValue(v) for k, v in kwargs.get('default_node_params').items()}
 		self.default_edge_params = {k: GraphAstLitteralValue(v) for k, v in kwargs.get('default_edge_params').items()}
 		
-		self.tokens = tokenize.tokenize(source)
+		# Literal values, by token string
+		self.literals = {}
+		
+		# Comments and non-logical newlines (inside brackets) carry no syntax
+		self.tokens = (t for t in tokenize.tokenize(source) if t.type not in (tokenize.COMMENT, tokenize.NL))
 		
 		# Debug
 		if debug_tokens:
@@ -46,11 +88,10 @@ class GraphCompiler:
 		if vt is None:
 			raise GraphSyntaxException.Expected('(value),"}"')
 		elif vt.type == tokenize.OP and vt.string == ')': # Empty node
-			return GraphAstNodedef(None, {**self.default_node_params})
+			return GraphAstNodedef(None, self.default_node_params)
 		
-		val = self.parse_value(vt)
+		val, closing = self.parse_expr(vt)
 	
-		closing = next(self.tokens, None)
 		if closing is None:
 			raise GraphSyntaxException.Expected('")",","')
 			
@@ -58,7 +99,7 @@ class GraphCompiler:
 			raise GraphSyntaxException.Expected('")",","', closing.string)
 			
 		elif closing.type == tokenize.OP and closing.string == ')': # (42)
-			return GraphAstNodedef(val, {**self.default_node_params})
+			return GraphAstNodedef(val, self.default_node_params)
 			
 		elif closing.type == tokenize.OP and closing.string == ',': # (42, {abc:def})
 			n = next(self.tokens, None)
@@ -90,11 +131,84 @@ class GraphCompiler:
 			return GraphAstGetValue(n.string)
 		if n.type not in (tokenize.STRING, tokenize.NUMBER):
 			raise GraphSyntaxException.Expected('(value)', n)
-		val = eval(n.string)
 		
-		return GraphAstLitteralValue(val)
+		# AST values are never mutated, a repeated literal shares its node
+		val = self.literals.get(n.string)
+		if val is None:
+			val = self.literals[n.string] = GraphAstLitteralValue(decode_literal(n.string))
+		
+		return val
 	
 	
+	def parse_expr(self, n=None):
+		'''
+			expr: term (('+'|'-') term)*
+			Returns the value and the token following it
+		'''
+		if n is None:
+			n = next(self.tokens, None)
+			
+		# Single values, the most common, skip the operator levels
+		if n is not None and n.type != tokenize.OP:
+			left = self.parse_value(n)
+			n = next(self.tokens, None)
+			if n is None or n.string not in OPERATORS:
+				return left, n
+			left, n = self.parse_term(left, n)
+		else:
+			left, n = self.parse_term(self.parse_operand(n))
+			
+		while n is not None and n.type == tokenize.OP and n.string in ADDITIVE:
+			op = n.string
+			right, n = self.parse_term(self.parse_operand())
+			left = self.fold(GraphAstExpr(op, left, right))
+			
+		return left, n
+		
+	def parse_term(self, left, n=None):
+		'''
+			term: operand (('*'|'//'|'%') operand)*
+			`left` is the first operand, n the token following it
+		'''
+		if n is None:
+			n = next(self.tokens, None)
+			
+		while n is not None and n.type == tokenize.OP and n.string in MULTIPLICATIVE:
+			left = self.fold(GraphAstExpr(n.string, left, self.parse_operand()))
+			n = next(self.tokens, None)
+			
+		return left, n
+		
+	def parse_operand(self, n=None):
+		'''
+			operand: value
+					| '-' operand
+					| '(' expr ')'
+		'''
+		if n is None:
+			n = next(self.tokens, None)
+			
+		if n is not None and n.type == tokenize.OP:
+			if n.string == '-':
+				return self.fold(GraphAstExpr('-', GraphAstLitteralValue(0), self.parse_operand()))
+			elif n.string == '(':
+				val, n = self.parse_expr()
+				self.expect(')', n)
+				return val
+				
+		return self.parse_value(n)
+		
+	def fold(self, expr):
+		# Literal operands are computed once, at compile time
+		if not (isinstance(expr.left, GraphAstLitteralValue) and isinstance(expr.right, GraphAstLitteralValue)):
+			return expr
+		
+		try:
+			return GraphAstLitteralValue(OPERATORS[expr.op](expr.left.value, expr.right.value))
+		except (TypeError, ZeroDivisionError) as e:
+			raise GraphSyntaxException(f'Invalid expression {expr.left.value!r} {expr.op} {expr.right.value!r}: {e}')
+			
+			
 	def parse_dict(self):
 		data = {}
 		
@@ -113,11 +227,8 @@ class GraphCompiler:
 				if not (n.type == tokenize.OP and n.string == ':'):
 					raise GraphSyntaxException.Expected('":"', n)
 					
-				val = self.parse_value()
-				data[key] = val
+				data[key], n = self.parse_expr()
 				
-				
-				n = next(self.tokens, None)
 				if n is None:
 					raise GraphSyntaxException.Expected('",", "}"')
 				elif (n.type == tokenize.OP and n.string == '}'):
@@ -144,11 +255,18 @@ class GraphCompiler:
 			raise GraphSyntaxException.Expected('"{"', n.string) 
 			
 		
-		data = {**self.default_edge_params, **self.parse_dict()}
-		return data
+		data = self.parse_dict()
 		
+		# Nodes and edges without properties share the defaults dict
+		if not data:
+			return self.default_edge_params
+		return {**self.default_edge_params, **data}
 		
-	def parse_edge(self, left_token, left_node):
+		
+	def parse_edge(self, left_token):
+		'''
+			edge: ('-'|'<') '{' dict '}' ('-'|'>')
+		'''
 		data = self.parse_edge_data()
 		
 		right_token = next(self.tokens, None)
@@ -164,84 +282,188 @@ class GraphCompiler:
 			if left_token.string != '-' or right_token.string != '-':
 				raise GraphException("Can't add directed edge to undirected graph")
 			
-		right_node = self.parse_node()
-		
-		return GraphAstEdge(left_node, right_node, data, left_token.string, right_token.string)
+		return GraphAstEdgeSpec(data, left_token.string, right_token.string)
 	
+	def parse_group(self):
+		'''
+			group: '[' (nodedef | name) (',' (nodedef | name))* ','? ']'
+		'''
+		# Opening bracket has already been removed by parse_node
+		nodes = []
+		
+		t = next(self.tokens, None)
+		while not (t is not None and t.type == tokenize.OP and t.string == ']'):
+			if t is None:
+				raise GraphSyntaxException.Expected('"(", (name), "]"')
+			elif t.type == tokenize.NAME:
+				nodes.append(GraphAstGetNode(t.string))
+			elif t.type == tokenize.OP and t.string == '(':
+				nodes.append(self.parse_nodedef())
+			else:
+				raise GraphSyntaxException.Expected('"(", (name), "]"', t)
+				
+			t = next(self.tokens, None)
+			if t is None:
+				raise GraphSyntaxException.Expected('",", "]"')
+			elif t.type == tokenize.OP and t.string == ',':
+				t = next(self.tokens, None)
+			elif not (t.type == tokenize.OP and t.string == ']'):
+				raise GraphSyntaxException.Expected('",", "]"', t)
+				
+		return GraphAstGroup(nodes)
+		
 	def parse_node(self, first=None):
 		'''
-			node: nodedef
-					| name
-					| node edge node 
+			node: element (edge element)*
 					| name = node
+			element: nodedef
+					| name
+					| group
 		'''
 		
-#		print('\nParse node')
-		
 		if first is None:
 			t = next(self.tokens)
 		else:
 			t = first
 			
-#		print ('\t', t)
-		
-		tree = None
-		if t.type == tokenize.NAME: # a ...			
-			n = next(self.tokens, tokenize.ENDMARKER)
-			if n.type == tokenize.OP and n.string == '=': # a = ...
+		# Chains are read in a loop, a -{}> b -{}> c gives nodes [a, b, c]
+		nodes = []
+		edges = []
 		
-				node = self.parse_node()
-				return GraphAstAssignation(t.string, node)
-			
-			elif n.type == tokenize.OP and n.string == ':': # a := ...
-				n = next(self.tokens, tokenize.ENDMARKER)
+		while True:
+			if t.type == tokenize.NAME: # a ...
+				n = next(self.tokens, None)
 				if n is None:
-					raise GraphSyntaxException.Expected('"="')
-				if not (n.type == tokenize.OP and n.string == '='):
-					raise GraphSyntaxException.Expected('"="', n)
-	
-				node = self.parse_node()
-				return GraphAstAssignation(t.string, node)
-	
-			elif n.type == tokenize.OP and n.string in ('<','-'): # a -{}> ...
-				edge = self.parse_edge(n, GraphAstGetNode(t.string))
-				return edge
+					raise GraphSyntaxException.Expected('(eol)')
+				
+				if n.type == tokenize.OP and n.string == '=': # a = ...
+					nodes.append(GraphAstAssignation(t.string, self.parse_node()))
+					break
+				
+				elif n.type == tokenize.OP and n.string == ':': # a := ...
+					n = next(self.tokens, None)
+					if n is None:
+						raise GraphSyntaxException.Expected('"="')
+					if not (n.type == tokenize.OP and n.string == '='):
+						raise GraphSyntaxException.Expected('"="', n)
+						
+					nodes.append(GraphAstAssignation(t.string, self.parse_node()))
+					break
+				
+				nodes.append(GraphAstGetNode(t.string))
+				
+			elif t.type == tokenize.OP and t.string == '(': # () ...
+				nodes.append(self.parse_nodedef())
+				n = next(self.tokens, None)
+				
+			elif t.type == tokenize.OP and t.string == '[': # [] ...
+				nodes.append(self.parse_group())
+				n = next(self.tokens, None)
 				
-	
-			elif n.type == tokenize.NEWLINE: # 'a'
-				return GraphAstGetNode(t.string)
-	
 			else:
-				raise GraphSyntaxException.Expected('(eol)', n)
+				raise GraphSyntaxException.Expected('"(", "[", (name)', t)
 				
+			if n is None or n.type in (tokenize.NEWLINE, tokenize.ENDMARKER): # 'a', '()'
+				break
 				
-		elif t.type == tokenize.OP and t.string == '(': # () ...
-			tree = self.parse_nodedef()
-			n = next(self.tokens, tokenize.ENDMARKER)
-	
-			if n.type == tokenize.OP and n.string in ('<', '-'): # () -{}> ...
-				return self.parse_edge(n, tree)
-	
-			elif n.type == tokenize.NEWLINE:  # ()
-				return tree
-	
-#		print ('\t end', t)
+			elif n.type == tokenize.OP and n.string in ('<', '-'): # ... -{}> ...
+				edges.append(self.parse_edge(n))
+				
+				t = next(self.tokens, None)
+				if t is None:
+					raise GraphSyntaxException.Expected('"(", "[", (name)')
+					
+			else:
+				raise GraphSyntaxException.Expected('(eol)', n)
+				
+		if not edges:
+			return nodes[0]
+		elif len(edges) == 1:
+			return GraphAstEdge(nodes[0], nodes[1], edges[0].data, edges[0].left_char, edges[0].right_char)
+		else:
+			return GraphAstChain(nodes, edges)
 	
 			
-	def parse_graph(self):
+	def expect(self, what, t=None):
+		if t is None:
+			t = next(self.tokens, None)
+		if t is None:
+			raise GraphSyntaxException.Expected(f'"{what}"')
+		if t.string != what:
+			raise GraphSyntaxException.Expected(f'"{what}"', t)
+		return t
+		
+	def parse_loop(self):
 		'''
-			graph: node (nl+ node)*
+			loop: 'for' name 'in' 'range' '(' expr (',' expr)* ')' ':' body
+			body: statement
+					| NEWLINE INDENT statement+ DEDENT
 		'''
-		nodes = []
+		# 'for' has already been read by parse_statement
+		name = next(self.tokens, None)
+		if name is None or name.type != tokenize.NAME:
+			raise GraphSyntaxException.Expected('(name)', name or '(eol)')
+			
+		self.expect('in')
+		self.expect('range')
+		self.expect('(')
+		
+		arg, n = self.parse_expr()
+		args = [arg]
+		while n is not None and n.string == ',':
+			arg, n = self.parse_expr()
+			args.append(arg)
+		self.expect(')', n)
+		
+		if len(args) > 3:
+			raise GraphSyntaxException('range() takes at most 3 arguments')
+			
+		self.expect(':')
+		
+		t = next(self.tokens, None)
+		if t is None:
+			raise GraphSyntaxException.Expected('(statement)')
+			
+		if t.type != tokenize.NEWLINE: # for i in range(n): (i)
+			return GraphAstLoop(name.string, args, [self.parse_statement(t)])
+			
+		t = next(self.tokens, None)
+		if t is None or t.type != tokenize.INDENT:
+			raise GraphSyntaxException.Expected('(indented block)', t or '(eol)')
+			
+		body = []
+		for t in self.tokens:
+			if t.type == tokenize.DEDENT:
+				break
+			body.append(self.parse_statement(t))
+			
+		return GraphAstLoop(name.string, args, body)
 		
+	def parse_statement(self, t):
+		'''
+			statement: loop
+					| node
+		'''
+		if t.type == tokenize.NAME and t.string == 'for':
+			return self.parse_loop()
+		return self.parse_node(t)
+		
+	def iter_graph(self):
+		'''
+			Top-level statements, parsed as tokens are read
+		'''
 		for t in self.tokens:
 			
 			if t.type in (tokenize.NEWLINE, tokenize.NL):
 				continue
-			elif t.type not in (tokenize.INDENT, tokenize.DEDENT, tokenize.ENDMARKER):
-				nodes.append(self.parse_node(t))
+			elif t.type not in (tokenize.ENCODING, tokenize.INDENT, tokenize.DEDENT, tokenize.ENDMARKER):
+				yield self.parse_statement(t)
 				
-		return GraphDef(nodes)
+	def parse_graph(self):
+		'''
+			graph: statement (nl+ statement)*
+		'''
+		return GraphDef([*self.iter_graph()])
 	
 	
 	def compile_to_ast(self):
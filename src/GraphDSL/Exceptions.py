@@ -28,4 +28,10 @@ class GraphNotDefinedException(GraphException):
 	
 
 class GraphBackendException(GraphException):
-	pass
\ No newline at end of file
+	pass
+
+
+class GraphFormatException(GraphException):
+	@staticmethod
+	def Invalid(reason):
+		return GraphFormatException(f'Invalid serialized graph: {reason}')
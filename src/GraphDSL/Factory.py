@@ -1,15 +1,35 @@
 #!/usr/bin/env python3
 # -*- coding: utf-8 -*-
 
+import os
+import asyncio
 import inspect
-import marshal
+import weakref
+import threading
 from io import BytesIO
+from types import ModuleType
+from concurrent.futures import ProcessPoolExecutor
+from collections import OrderedDict
 
 from GraphDSL.builder import GraphBuilder
 from GraphDSL.compiler import GraphCompiler
+from GraphDSL.plan import GraphPlanner, GraphWalker
+from GraphDSL.cache import GraphCache
+from GraphDSL.stats import GraphStats, phase
+from GraphDSL import serialize
+from GraphDSL.exceptions import GraphException, GraphBackendException, GraphNotDefinedException
 from GraphDSL.backend import networkx as nxbackend
 
 class GraphFactory:
+	# Compilation cache used when @Graph gets no cache_dir (path or GraphCache)
+	default_cache = None
+	
+	# Compile on first use instead of at decoration when @Graph gets no lazy
+	lazy_default = False
+	
+	# Plans kept by graphs with loops
+	plans_size = 8
+	
 	def __init__(self, f, **kwargs):
 		
 		# Get parameters
@@ -17,34 +37,474 @@ class GraphFactory:
 		self.debug_tokens = kwargs.get('debug_tokens', False)
 		self.default_node_params = kwargs.get('default_node_params', {})
 		self.default_edge_params = kwargs.get('default_edge_params', {})
+		self.lazy = kwargs.get('lazy', GraphFactory.lazy_default)
+		self.workers = kwargs.get('workers', None)
 		
-		source = inspect.getsource(f)
-		b = BytesIO(source.encode('utf-8')).readline
+		self.cache = kwargs.get('cache_dir', GraphFactory.default_cache)
+		if isinstance(self.cache, (str, os.PathLike)):
+			self.cache = GraphCache(self.cache)
+			
+		# Phase timings and counts, True for a GraphStats of its own
+		self.stats = kwargs.get('stats', None)
+		if self.stats is True:
+			self.stats = GraphStats()
 		
-		self.parser = GraphCompiler(
-			b,
-			self.debug_tokens,
-			graph_directed=self.directed,
+		# Graphs returned by calls, by id: (weakref, builder, parameters,
+		# call arguments), see rebuild. Only kept with rebuildable=True, a
+		# record holds the node and edge handles of its graph.
+		self.rebuildable = kwargs.get('rebuildable', False)
+		self.records = {}
+		
+		# Built graphs by (backend, parameters, graph_init), least recently used first
+		self.result_cache_size = kwargs.get('cache', 0)
+		self.result_cache_copy = kwargs.get('cache_copy', False)
+		self.result_cache = OrderedDict()
+		self.result_hits = 0
+		self.result_misses = 0
+		
+		self.function = f
+		self.lock = threading.RLock()
+		
+		self.parser = None
+		self.compiled_ast = None
+		
+		# Lowered on first call, then shared by every build. Graphs with
+		# loops get a plan per value of their structural parameters (the
+		# ones of range() arguments and expressions), least recently used
+		# first.
+		self.plan = None
+		self.structural = None
+		self.plans = OrderedDict()
+		
+		if not self.lazy:
+			self.compiled_ast = self.compile(self.source())
+			
+	@property
+	def ast(self):
+		if self.compiled_ast is None:
+			with self.lock:
+				if self.compiled_ast is None:
+					try:
+						self.compiled_ast = self.compile(self.source())
+					except GraphException as e:
+						raise self.located(e) from e
+						
+		return self.compiled_ast
+		
+	def source(self):
+		with phase(self.stats, 'source'):
+			return inspect.getsource(self.function)
+			
+	def located(self, e):
+		return e.__class__(f'In graph "{self.function.__qualname__}": {e}')
+		
+	def compiler_options(self):
+		return {
+			'graph_directed': self.directed,
+			'default_node_params': self.default_node_params,
+			'default_edge_params': self.default_edge_params
+		}
+		
+	def cache_key(self, source):
+		return self.cache.key(
+			source,
+			directed=self.directed,
 			default_node_params=self.default_node_params,
 			default_edge_params=self.default_edge_params
 		)
 		
-		self.ast = self.parser.compile_to_ast()
+	def compile(self, source):
+		if self.cache is not None:
+			key = self.cache_key(source)
+			
+			ast = self.cache.get(key)
+			if ast is not None:
+				return ast
+			
+		b = BytesIO(source.encode('utf-8')).readline
+		
+		self.parser = GraphCompiler(b, self.debug_tokens, **self.compiler_options())
 		
-	def __call__(self, parameters={}, backend=nxbackend, **kwargs):
+		with phase(self.stats, 'compile'):
+			if self.stats is not None:
+				self.parser.tokens = self.stats.tokens(self.parser.tokens)
+			ast = self.parser.compile_to_ast()
 		
+		if self.cache is not None:
+			self.cache.put(key, ast)
+			
+		return ast
+		
+	def lower(self, parameters={}):
+		if self.plan is not None:
+			return self.plan
+			
+		with self.lock:
+			if self.plan is not None:
+				return self.plan
+				
+			if self.structural:
+				for name in self.structural:
+					if name not in parameters:
+						raise GraphNotDefinedException.NotDefined(name)
+						
+				key = tuple(parameters[name] for name in self.structural)
+				try:
+					plan = self.plans.get(key)
+				except TypeError: # Unhashable, lowered for this call only
+					return self.lower_plan(parameters)
+					
+				if plan is None:
+					plan = self.plans[key] = self.lower_plan(parameters)
+					while len(self.plans) > self.plans_size:
+						self.plans.popitem(last=False)
+				else:
+					self.plans.move_to_end(key)
+				return plan
+				
+			plan = self.lower_plan(parameters)
+			
+			self.structural = sorted(plan.structural)
+			if self.structural:
+				self.plans[tuple(parameters[name] for name in self.structural)] = plan
+			else:
+				self.plan = plan
+			return plan
+			
+	def lower_plan(self, parameters):
+		ast = self.ast
+		with phase(self.stats, 'lower'):
+			if self.workers:
+				return GraphPlanner.lower_parallel(ast, self.workers, graph_directed=self.directed, parameters=parameters)
+			return GraphPlanner(ast, graph_directed=self.directed, parameters=parameters).lower()
+		
+	def builder(self, parameters, backend, **kwargs):
 		graph_init = kwargs.get('graph_init', None)
 		
 		builder = GraphBuilder(
-			self.ast,
+			self.lower(parameters),
 			backend,
 			graph_directed=self.directed,
-			graph_init=graph_init
+			graph_init=graph_init,
+			stats=self.stats
 		)
 		
 		builder.parameters = {**parameters}
-		return builder.build()
+		return builder
+		
+	def __call__(self, parameters={}, backend=nxbackend, shared=None, **kwargs):
+		if shared:
+			# Array backend graph copied to shared memory (True) or to a file
+			g = self(parameters, backend, **kwargs)
+			if not hasattr(g, 'share'):
+				raise GraphBackendException('Shared graphs need the array backend')
+			return g.share(None if shared is True else shared)
+			
+		if not self.result_cache_size:
+			builder = self.builder(parameters, backend, **kwargs)
+			return self.record(builder.build(), builder, parameters, backend, **kwargs)
+		
+		try:
+			key = self.result_key(parameters, backend, **kwargs)
+			hash(key)
+		except TypeError: # Unhashable parameters, not cached
+			key = None
+			
+		with self.lock:
+			entry = self.result_cache.get(key) if key is not None else None
+			if entry is not None:
+				self.result_hits += 1
+				self.result_cache.move_to_end(key)
+			else:
+				self.result_misses += 1
+				
+		# Shared cached graphs are frozen and not recorded, copies are
+		if entry is not None:
+			g, builder, copy = entry
+			if copy:
+				return self.record(builder.backend.copy_graph(g), builder, parameters, backend, **kwargs)
+			return g
+			
+		builder = self.builder(parameters, backend, **kwargs)
+		g = builder.build()
+		
+		if key is None:
+			return self.record(g, builder, parameters, backend, **kwargs)
+			
+		# Graphs of backends that can't freeze are copied, and not cached
+		# by backends that can't copy either
+		copy = self.result_cache_copy
+		if not copy:
+			frozen = builder.backend.freeze_graph(g)
+			copy = frozen is None
+			
+		if copy:
+			result = builder.backend.copy_graph(g)
+			if result is None:
+				return self.record(g, builder, parameters, backend, **kwargs)
+			result = self.record(result, builder, parameters, backend, **kwargs)
+		else:
+			g = result = frozen
+			
+		with self.lock:
+			self.result_cache[key] = (g, builder, copy)
+			while len(self.result_cache) > self.result_cache_size:
+				self.result_cache.popitem(last=False)
+				
+		return result
+		
+	async def abuild(self, parameters={}, backend=nxbackend, executor=None, chunk_size=5000, **kwargs):
+		'''
+			Builds the graph of a call without blocking the event loop.
+			Nodes and edges are added by chunks of chunk_size, the loop runs
+			between chunks, or the build runs in `executor` when one is given.
+			Cancelling stops the build at the next chunk. The result cache
+			is not used.
+		'''
+		loop = asyncio.get_running_loop()
+		
+		if self.plan is None:
+			# Compilation and lowering happen off the loop
+			await loop.run_in_executor(executor, self.lower, parameters)
+			
+		builder = self.builder(parameters, backend, **kwargs)
+		
+		# Wall time, including the tasks run between chunks
+		with phase(self.stats, 'build'):
+			g = builder.create_graph()
+			steps = builder.steps(builder.plan, g, chunk_size)
+			
+			try:
+				if executor is None:
+					for step in steps:
+						await asyncio.sleep(0)
+				else:
+					cancelled = threading.Event()
+					
+					def run():
+						for step in steps:
+							if cancelled.is_set():
+								break
+								
+					try:
+						await loop.run_in_executor(executor, run)
+					except asyncio.CancelledError:
+						# The worker thread stops at its next chunk
+						cancelled.set()
+						raise
+						
+				g = builder.backend.finish_graph(g)
+			except BaseException:
+				builder.backend.abort_graph(g)
+				raise
+			
+		if self.stats is not None:
+			self.stats.count('builds')
+			
+		return self.record(g, builder, parameters, backend, **kwargs)
 		
+	def iter_nodes(self, parameters={}):
+		'''
+			(value, data) of each node definition, in build order, without
+			building a graph. A node defined several times is yielded each
+			time, a backend would merge its data. Anonymous nodes have a
+			None value.
+		'''
+		return GraphWalker(self.ast, graph_directed=self.directed, parameters=parameters).iter_nodes()
+		
+	def iter_edges(self, parameters={}):
+		'''
+			(value, value, data) of each edge, in build order, directions
+			applied as by a build (<> gives both edges)
+		'''
+		return GraphWalker(self.ast, graph_directed=self.directed, parameters=parameters).iter_edges()
+		
+	def record(self, g, builder, parameters, backend, **kwargs):
+		'''
+			Keeps the builder of g and its parameters for rebuild, until g
+			is collected, when the factory or the call is rebuildable.
+			Returns g.
+		'''
+		if not kwargs.get('rebuildable', self.rebuildable):
+			return g
+			
+		key = id(g)
+		try:
+			ref = weakref.ref(g, lambda ref: self.forget(key, ref))
+		except TypeError: # Not weak referenceable, rebuilt from scratch
+			return g
+			
+		with self.lock:
+			self.records[key] = (ref, builder, {**parameters}, {'backend': backend, **kwargs})
+		return g
+		
+	def forget(self, key, ref):
+		with self.lock:
+			if self.records.get(key, (None,))[0] is ref:
+				del self.records[key]
+				
+	def rebuild(self, graph, parameters, **kwargs):
+		'''
+			Updates `graph`, returned by an earlier call, to `parameters`.
+			Only the node and edge attributes depending on changed parameters
+			are patched, in place. The graph is built anew when its topology
+			depends on a changed parameter, or when this factory has no record
+			of it (graphs not built rebuildable, frozen cached results).
+			Returns the updated graph.
+		'''
+		with self.lock:
+			record = self.records.get(id(graph))
+			
+		if record is None or record[0]() is not graph:
+			return self(parameters, **kwargs)
+			
+		ref, builder, old, call = record
+		
+		if not builder.overlay(graph, parameters, self.changed_parameters(old, parameters)):
+			return self(parameters, **{**call, **kwargs})
+			
+		with self.lock:
+			self.records[id(graph)] = (ref, builder, {**parameters}, call)
+		return graph
+		
+	def result_key(self, parameters, backend, **kwargs):
+		def freeze(value):
+			# Values are tagged with their type, [1] and (1,) differ as do
+			# 1, 1.0 and True
+			if isinstance(value, dict):
+				return (type(value), frozenset((freeze(k), freeze(v)) for k, v in value.items()))
+			elif isinstance(value, (list, tuple)):
+				return (type(value), tuple(freeze(v) for v in value))
+			elif isinstance(value, (set, frozenset)):
+				return (type(value), frozenset(freeze(v) for v in value))
+			return (type(value), value)
+		
+		return (backend, freeze(parameters), kwargs.get('graph_init', None))
+	
+	def cache_info(self):
+		with self.lock:
+			return {
+				'hits': self.result_hits,
+				'misses': self.result_misses,
+				'size': len(self.result_cache),
+				'maxsize': self.result_cache_size
+			}
+			
+	def cache_clear(self):
+		with self.lock:
+			self.result_cache.clear()
+			self.result_hits = 0
+			self.result_misses = 0
+			
+	def cache_invalidate(self, parameters={}, backend=nxbackend, **kwargs):
+		with self.lock:
+			self.result_cache.pop(self.result_key(parameters, backend, **kwargs), None)
+		
+	def changed_parameters(self, old, new):
+		missing = object()
+		
+		return {
+			name for name in self.lower(old).parameters
+			if old.get(name, missing) is not new.get(name, missing) and old.get(name, missing) != new.get(name, missing)
+		}
+		
+	def instantiate_many(self, parameters_list, backend=nxbackend, copy=False, **kwargs):
+		'''
+			Builds one graph per parameters dict.
+			With copy=True, graphs are structural copies of the first one where
+			only the attributes depending on changed parameters are rebuilt
+			(graphs whose nodes depend on a changed parameter are built anew).
+			Copies may share the attribute dicts of untouched nodes and edges
+			with the first graph, don't mutate them in place.
+		'''
+		graphs = []
+		base = None
+		
+		for parameters in parameters_list:
+			if copy and base is not None:
+				g = base.backend.copy_graph(graphs[0], share_data=True)
+				changed = self.changed_parameters(base.parameters, parameters)
+				
+				if g is not None and base.overlay(g, parameters, changed):
+					graphs.append(self.record(g, base, parameters, backend, **kwargs))
+					continue
+					
+			builder = self.builder(parameters, backend, **kwargs)
+			graphs.append(self.record(builder.build(), builder, parameters, backend, **kwargs))
+			
+			if base is None:
+				base = builder
+				
+		return graphs
+		
+	
+def compile_source(source, debug_tokens, options):
+	# compile_all worker, the AST is sent back serialized
+	b = BytesIO(source.encode('utf-8')).readline
+	return serialize.dumps(GraphCompiler(b, debug_tokens, **options).compile_to_ast())
+	
+	
+def compile_all(targets, workers=None):
+	'''
+		Compiles the pending (lazy, not yet compiled) factories of `targets`,
+		a module, a factory or an iterable of both, in a pool of `workers`
+		processes. Compilation caches are used as by a sequential compile.
+		Returns the number of factories compiled.
+	'''
+	if isinstance(targets, (ModuleType, GraphFactory)):
+		targets = [targets]
+		
+	factories = []
+	for target in targets:
+		if isinstance(target, ModuleType):
+			factories += [v for v in vars(target).values() if isinstance(v, GraphFactory)]
+		else:
+			factories.append(target)
+			
+	pending = []
+	
+	for factory in dict.fromkeys(factories):
+		if factory.compiled_ast is not None:
+			continue
+			
+		source = factory.source()
+		
+		key = None
+		if factory.cache is not None:
+			key = factory.cache_key(source)
+			ast = factory.cache.get(key)
+			if ast is not None:
+				factory.compiled_ast = ast
+				continue
+				
+		pending.append((factory, source, key))
+		
+	if len(pending) < 2 or workers == 1:
+		for factory, source, key in pending:
+			factory.ast
+		return len(pending)
+		
+	with ProcessPoolExecutor(workers) as pool:
+		futures = [
+			pool.submit(compile_source, source, factory.debug_tokens, factory.compiler_options())
+			for factory, source, key in pending
+		]
+		
+		for (factory, source, key), future in zip(pending, futures):
+			try:
+				ast = serialize.loads(future.result())
+			except GraphException as e:
+				raise factory.located(e) from e
+				
+			with factory.lock:
+				if factory.compiled_ast is None:
+					factory.compiled_ast = ast
+					
+			if key is not None:
+				factory.cache.put(key, ast)
+				
+	return len(pending)
+	
 	
 def Graph(**kwargs):
 	def wrapper(f):
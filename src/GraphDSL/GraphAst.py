@@ -1,56 +1,118 @@
 #!/usr/bin/env python3
 # -*- coding: utf-8 -*-
 
+import operator
 from dataclasses import dataclass
 
+# AST classes are slotted (no per-instance __dict__), the AST of a large
+# graph holds millions of them
+
 @dataclass
 class GraphAst:
-	pass
+	__slots__ = ()
 	
+	def __reduce__(self):
+		# Pickled as positional fields rather than a slot state dict
+		return (self.__class__, tuple(getattr(self, name) for name in self.__slots__))
+		
 	
 # Values	
 @dataclass	
 class GraphAstValue(GraphAst):
-	pass
+	__slots__ = ()
 	
 @dataclass
 class GraphAstLitteralValue(GraphAstValue):
+	__slots__ = ('value',)
 	value: object
 	
 @dataclass
 class GraphAstGetValue(GraphAstValue):
+	__slots__ = ('name',)
 	name: str
 	
+@dataclass
+class GraphAstExpr(GraphAstValue):
+	# Arithmetic on loop variables, parameters and literals
+	__slots__ = ('op', 'left', 'right')
+	op: str
+	left: GraphAstValue
+	right: GraphAstValue
+	
+# Operators of GraphAstExpr
+OPERATORS = {
+	'+': operator.add,
+	'-': operator.sub,
+	'*': operator.mul,
+	'//': operator.floordiv,
+	'%': operator.mod
+}
 	
+
 # Nodes
 @dataclass
 class GraphNode (GraphAst):
-	pass
+	__slots__ = ()
 	
 @dataclass
 class GraphAstAssignation (GraphNode):
+	__slots__ = ('name', 'value')
 	name: str
 	value: GraphNode
 	
 @dataclass
 class GraphAstGetNode (GraphNode):
+	__slots__ = ('name',)
 	name: str
 	
 @dataclass
 class GraphAstNodedef (GraphNode):
+	__slots__ = ('value', 'data')
 	value: object
 	data: dict
 	
 @dataclass
 class GraphAstEdge (GraphNode):
+	__slots__ = ('node1', 'node2', 'data', 'left_char', 'right_char')
 	node1: GraphNode
 	node2: GraphNode
 	data: dict
 	left_char: str
 	right_char: str
 	
+@dataclass
+class GraphAstEdgeSpec (GraphAst):
+	__slots__ = ('data', 'left_char', 'right_char')
+	data: dict
+	left_char: str
+	right_char: str
+	
+@dataclass
+class GraphAstChain (GraphNode):
+	# edges[i] links nodes[i] and nodes[i + 1]
+	__slots__ = ('nodes', 'edges')
+	nodes: [GraphNode]
+	edges: [GraphAstEdgeSpec]
+	
+	
+@dataclass
+class GraphAstGroup (GraphNode):
+	# [a, (1), ...], linked as a whole to the elements next to it
+	__slots__ = ('nodes',)
+	nodes: [GraphNode]
+	
+	
+@dataclass
+class GraphAstLoop (GraphNode):
+	# for name in range(*args): body
+	__slots__ = ('name', 'args', 'body')
+	name: str
+	args: [GraphAstValue]
+	body: [GraphNode]
+	
 	
 # Root
 @dataclass	
 class GraphDef (GraphAst):
+	__slots__ = ('nodes',)
 	nodes: [GraphNode]
\ No newline at end of file
@@ -0,0 +1,70 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import io
+import os
+
+from GraphDSL.builder import GraphBuilder
+from GraphDSL.compiler import GraphCompiler
+from GraphDSL.plan import GraphPlanner
+from GraphDSL.graphAst import GraphDef
+from GraphDSL.backend import networkx as nxbackend
+
+def load(source, directed=True, parameters={}, backend=nxbackend, batch_size=10000, **kwargs):
+	'''
+		Builds a graph from a standalone DSL file, given as a path or as a
+		(text or binary) stream.
+		The file is tokenized as it is read, and statements are lowered and
+		inserted by batches of `batch_size`: the source and the AST are never
+		held in memory as a whole.
+	'''
+	if isinstance(source, (str, os.PathLike)):
+		with open(source, 'rb') as f:
+			return load(f, directed, parameters, backend, batch_size, **kwargs)
+			
+	if isinstance(source, io.TextIOBase):
+		readline = lambda: source.readline().encode('utf-8')
+	else:
+		readline = source.readline
+		
+	compiler = GraphCompiler(
+		readline,
+		kwargs.get('debug_tokens', False),
+		graph_directed=directed,
+		default_node_params=kwargs.get('default_node_params', {}),
+		default_edge_params=kwargs.get('default_edge_params', {})
+	)
+	
+	builder = GraphBuilder(
+		None,
+		backend,
+		graph_directed=directed,
+		graph_init=kwargs.get('graph_init', None)
+	)
+	
+	builder.parameters = {**parameters}
+	g = builder.create_graph()
+	
+	def flush(statements):
+		# Names assigned by earlier batches are inputs of this one
+		plan = GraphPlanner(
+			GraphDef(statements),
+			graph_directed=directed,
+			known_names=builder.definitions,
+			parameters=parameters
+		).lower()
+		
+		builder.run(plan, g)
+		
+	batch = []
+	for statement in compiler.iter_graph():
+		batch.append(statement)
+		
+		if len(batch) >= batch_size:
+			flush(batch)
+			batch = []
+			
+	if batch:
+		flush(batch)
+		
+	return builder.backend.finish_graph(g)
@@ -0,0 +1,799 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+from bisect import bisect_left
+from itertools import chain
+from concurrent.futures import ProcessPoolExecutor
+
+from GraphDSL.graphAst import *
+from GraphDSL.exceptions import *
+
+class GraphPlan:
+	'''
+		Flat build plan lowered from a GraphDef.
+
+		Every node definition gets a slot, edges reference slots (refs past
+		the last slot point to `inputs`, names taken from an outer scope).
+		Literal values are resolved once; parameter references are kept as
+		holes filled in at build time. Loops are expanded, the parameters
+		they depend on (`structural`) are fixed for the plan.
+	'''
+
+	def __init__(self):
+		self.node_values = []
+		self.node_data = []
+		self.value_holes = []		# (slot, parameter)
+		self.node_data_holes = []	# (slot, key, parameter)
+
+		self.edges = []				# (src ref, dst ref)
+		self.edge_data = []
+		self.edge_data_holes = []	# (edge, key, parameter)
+
+		self.inputs = []
+		self.outputs = {}			# name -> ref
+
+		# Parameters of range() arguments and expressions
+		self.structural = set()
+
+		# Filled by index(): parameter -> ([slots], [edges]) whose data
+		# reference it, and holes by slot / edge
+		self.dependents = {}
+		self.value_parameters = set()
+		self.slot_holes = {}
+		self.edge_holes = {}
+		self.edge_parameters = set()
+
+
+	def resolve_nodes(self, parameters, start=0, stop=None):
+		if stop is None:
+			stop = len(self.node_values)
+
+		values = self.node_values[start:stop]
+		data = [None if d is None else {**d} for d in self.node_data[start:stop]]
+
+		# Holes are in slot order
+		value_holes = self.value_holes
+		data_holes = self.node_data_holes
+		if start or stop < len(self.node_values):
+			value_holes = value_holes[bisect_left(value_holes, (start,)):bisect_left(value_holes, (stop,))]
+			data_holes = data_holes[bisect_left(data_holes, (start,)):bisect_left(data_holes, (stop,))]
+
+		try:
+			for slot, name in value_holes:
+				values[slot - start] = parameters[name]
+			for slot, key, name in data_holes:
+				data[slot - start][key] = parameters[name]
+		except KeyError as e:
+			raise GraphNotDefinedException.NotDefined(e.args[0])
+
+		return [*zip(values, data)]
+
+
+	def resolve_edges(self, parameters, table):
+		for name in self.edge_parameters:
+			if name not in parameters:
+				raise GraphNotDefinedException.NotDefined(name)
+
+		return self.generate_edges(parameters, table)
+
+	def generate_edges(self, parameters, table):
+		# Lazy, the resolved edge list never exists as a whole
+		holes = self.edge_holes
+
+		for edge, ((s, d), data) in enumerate(zip(self.edges, self.edge_data)):
+			data = {**data}
+			if edge in holes:
+				for key, name in holes[edge]:
+					data[key] = parameters[name]
+
+			yield table[s], table[d], data
+
+
+	def resolve_node(self, slot, parameters):
+		data = self.node_data[slot]
+		data = None if data is None else {**data}
+
+		try:
+			for key, name in self.slot_holes.get(slot, ()):
+				data[key] = parameters[name]
+		except KeyError as e:
+			raise GraphNotDefinedException.NotDefined(e.args[0])
+
+		return data
+
+	def resolve_edge(self, edge, parameters):
+		data = {**self.edge_data[edge]}
+
+		try:
+			for key, name in self.edge_holes.get(edge, ()):
+				data[key] = parameters[name]
+		except KeyError as e:
+			raise GraphNotDefinedException.NotDefined(e.args[0])
+
+		return data
+
+
+	def fold(self):
+		'''
+			Removes the node definitions of literal values that change
+			nothing however a backend handles repeated definitions (keeping
+			the first one or merging them in order): those without data,
+			folded into the first slot of the value, and those with the same
+			data as the previous definition of the value. Refs to them point
+			to the slot they are folded into. Anonymous nodes, parameter
+			values and definitions with data holes are kept, and definitions
+			with data are not folded across a parameter value (it may be
+			equal to the literal at build time).
+		'''
+		values = self.node_values
+		data = self.node_data
+		size = len(values)
+
+		barriers = {slot for slot, name in self.value_holes}
+		filled = {slot for slot, key, name in self.node_data_holes}
+
+		firsts = []
+		first = {}		# value -> first slot
+		last = {}		# value -> last kept slot since the last parameter value
+		try:
+			for slot, (v, d) in enumerate(zip(values, data)):
+				if slot in barriers:
+					last = {}
+				if v is None:
+					firsts.append(slot)
+				elif v not in first:
+					first[v] = last[v] = slot
+					firsts.append(slot)
+				elif not d and slot not in filled:
+					firsts.append(first[v])
+				else:
+					t = last.get(v)
+					if t is not None and slot not in filled and t not in filled and (d is data[t] or d == data[t]):
+						firsts.append(t)
+					else:
+						last[v] = slot
+						firsts.append(slot)
+		except TypeError: # Unhashable values, left to the backend
+			return
+
+		kept = [slot for slot, f in enumerate(firsts) if f == slot]
+		if len(kept) == size:
+			return
+
+		refs = [0] * size
+		for i, slot in enumerate(kept):
+			refs[slot] = i
+		refs = [refs[f] for f in firsts]
+
+		# Refs past the last slot are inputs
+		refs += range(len(kept), len(kept) + len(self.inputs))
+
+		# Folded slots have no holes
+		self.node_values = [values[slot] for slot in kept]
+		self.node_data = [data[slot] for slot in kept]
+		self.value_holes = [(refs[slot], name) for slot, name in self.value_holes]
+		self.node_data_holes = [(refs[slot], k, name) for slot, k, name in self.node_data_holes]
+
+		self.edges = [(refs[s], refs[d]) for s, d in self.edges]
+		self.outputs = {name: refs[ref] for name, ref in self.outputs.items()}
+
+	def index(self):
+		# A structural parameter changes nodes as a whole, like a value
+		self.value_parameters = {name for slot, name in self.value_holes} | self.structural
+
+		self.dependents = {}
+		self.slot_holes = {}
+		self.edge_holes = {}
+
+		for slot, key, name in self.node_data_holes:
+			self.dependents.setdefault(name, ([], []))[0].append(slot)
+			self.slot_holes.setdefault(slot, []).append((key, name))
+		for edge, key, name in self.edge_data_holes:
+			self.dependents.setdefault(name, ([], []))[1].append(edge)
+			self.edge_holes.setdefault(edge, []).append((key, name))
+
+		self.edge_parameters = {name for edge, key, name in self.edge_data_holes}
+
+	@property
+	def parameters(self):
+		return self.value_parameters | self.dependents.keys()
+
+
+	@staticmethod
+	def merge(plans):
+		'''
+			Concatenates plans lowered from consecutive statement ranges.
+			Their inputs are resolved against the outputs of the preceding
+			plans, which gives the plan of the whole statement list.
+		'''
+		merged = GraphPlan()
+
+		# Templates stay shared within each plan only, they are at most
+		# duplicated once per plan
+		for plan in plans:
+			offset = len(merged.node_values)
+			edge_offset = len(merged.edges)
+
+			refs = [*range(offset, offset + len(plan.node_values))]
+			for name in plan.inputs:
+				if name not in merged.outputs:
+					raise GraphNotDefinedException.NotDefined(name)
+				refs.append(merged.outputs[name])
+
+			merged.node_values += plan.node_values
+			merged.node_data += plan.node_data
+			merged.value_holes += [(slot + offset, name) for slot, name in plan.value_holes]
+			merged.node_data_holes += [(slot + offset, k, name) for slot, k, name in plan.node_data_holes]
+
+			merged.edges += [(refs[s], refs[d]) for s, d in plan.edges]
+			merged.edge_data += plan.edge_data
+			merged.edge_data_holes += [(edge + edge_offset, k, name) for edge, k, name in plan.edge_data_holes]
+
+			merged.outputs.update((name, refs[ref]) for name, ref in plan.outputs.items())
+			merged.structural |= plan.structural
+
+		merged.fold()
+		merged.index()
+
+		return merged
+
+
+class AnyName:
+	# known_names of partial plans, undefined names are only caught by merge
+	def __contains__(self, name):
+		return True
+
+
+# Statements of lower_parallel, handed once to each worker (inherited
+# without pickling when workers are forked)
+worker_ast = None
+
+def init_worker(ast):
+	global worker_ast
+	worker_ast = ast
+
+def lower_range(start, stop, graph_directed, parameters):
+	ast = GraphDef(worker_ast.nodes[start:stop])
+	return GraphPlanner(ast, graph_directed=graph_directed, known_names=AnyName(), parameters=parameters).lower()
+
+
+class GraphPlanner:
+	def __init__(self, ast, **kwargs):
+		self.ast = ast
+
+		self.graph_directed = kwargs.get('graph_directed')
+		self.known_names = kwargs.get('known_names', ())
+
+		# Values of structural parameters, and of loop variables by name
+		self.parameters = kwargs.get('parameters', {})
+		self.env = kwargs.get('env', {})
+
+		# Loop variables left as holes, by template planners
+		self.symbols = kwargs.get('symbols', ())
+
+		self.plan = GraphPlan()
+
+		self.definitions = {}
+
+		# Identical literal templates are shared, they are only read
+		self.templates = {}
+
+
+	def input_ref(self, name):
+		# Input refs are negative until the slot count is known
+		if name not in self.plan.inputs:
+			self.plan.inputs.append(name)
+		return -1 - self.plan.inputs.index(name)
+
+
+	def parse_assignation(self, node):
+		assert isinstance(node, GraphAstAssignation)
+
+		ref = self.parse_node(node.value)
+		if type(ref) is list:
+			raise GraphException(f'Can\'t assign a group of nodes to "{node.name}"')
+		self.definitions[node.name] = ref
+
+		return ref
+
+	def parse_getnode(self, node):
+		assert isinstance(node, GraphAstGetNode)
+
+		name = node.name
+		if name in self.definitions.keys():
+			return self.definitions[name]
+		if name in self.known_names:
+			return self.input_ref(name)
+
+		raise GraphNotDefinedException.NotDefined(name)
+
+	def parse_nodedef(self, node):
+		assert isinstance(node, GraphAstNodedef)
+
+		slot = len(self.plan.node_values)
+
+		value, hole = self.parse_value(node.value)
+		if hole is not None:
+			self.plan.value_holes.append((slot, hole))
+
+		if node.data is None:
+			data = None
+		else:
+			data, holes = self.parse_data(node.data)
+			self.plan.node_data_holes += [(slot, k, h) for k, h in holes]
+
+		self.plan.node_values.append(value)
+		self.plan.node_data.append(data)
+
+		return slot
+
+	def add_edge(self, n1, n2, data, holes):
+		edge = len(self.plan.edges)
+
+		self.plan.edges.append((n1, n2))
+		self.plan.edge_data.append(data)
+		self.plan.edge_data_holes += [(edge, k, h) for k, h in holes]
+
+	def add_edges(self, pairs, data, holes):
+		edge = len(self.plan.edges)
+
+		self.plan.edges += pairs
+		self.plan.edge_data += [data] * (len(self.plan.edges) - edge)
+		if holes:
+			self.plan.edge_data_holes += [(e, k, h) for e in range(edge, len(self.plan.edges)) for k, h in holes]
+
+	def parse_link(self, n1, n2, spec):
+		data, holes = self.parse_data(spec.data)
+		
+		if type(n1) is list or type(n2) is list:
+			return self.parse_fan(n1, n2, spec, data, holes)
+			
+		if not self.graph_directed and spec.left_char == '-' and spec.right_char == '-':
+			self.add_edge(n1, n2, data, holes)
+		elif spec.left_char == '-' and spec.right_char == '>':
+			self.add_edge(n1, n2, data, holes)
+		elif spec.left_char == '<' and spec.right_char == '-':
+			self.add_edge(n2, n1, data, holes)
+		elif spec.left_char == '<' and spec.right_char == '>':
+			self.add_edge(n1, n2, data, holes)
+			self.add_edge(n2, n1, data, holes)
+	
+	def parse_fan(self, n1, n2, spec, data, holes):
+		# Links of groups (lists of refs), one edge per pair of their nodes
+		pairs = (
+			(s, d)
+			for s in (n1 if type(n1) is list else [n1])
+			for d in (n2 if type(n2) is list else [n2])
+		)
+
+		if spec.left_char == '<' and spec.right_char == '-':
+			pairs = ((d, s) for s, d in pairs)
+		elif spec.left_char == '<' and spec.right_char == '>':
+			pairs = (pair for s, d in pairs for pair in ((s, d), (d, s)))
+
+		self.add_edges(pairs, data, holes)
+
+	def parse_group(self, node):
+		assert isinstance(node, GraphAstGroup)
+
+		return [self.parse_node(n) for n in node.nodes]
+
+	def parse_chain(self, node):
+		assert isinstance(node, GraphAstChain)
+		
+		refs = [self.parse_node(n) for n in node.nodes]
+		
+		# Last hop first, as with nested edges
+		for i in reversed(range(len(node.edges))):
+			self.parse_link(refs[i], refs[i + 1], node.edges[i])
+			
+		return refs[0]
+	
+	def parse_edge(self, node):
+		assert isinstance(node, GraphAstEdge)
+		
+		# Edges nested through node2 are unrolled into a chain
+		nodes = [node.node1]
+		edges = []
+		
+		while isinstance(node.node2, GraphAstEdge):
+			edges.append(GraphAstEdgeSpec(node.data, node.left_char, node.right_char))
+			node = node.node2
+			nodes.append(node.node1)
+			
+		edges.append(GraphAstEdgeSpec(node.data, node.left_char, node.right_char))
+		nodes.append(node.node2)
+		
+		return self.parse_chain(GraphAstChain(nodes, edges))
+	
+	def parse_node(self, node):
+		assert isinstance(node, GraphNode)
+
+		if isinstance(node, GraphAstNodedef):
+			return self.parse_nodedef(node)
+		elif isinstance(node, GraphAstGetNode):
+			return self.parse_getnode(node)
+		elif isinstance(node, GraphAstAssignation):
+			return self.parse_assignation(node)
+		elif isinstance(node, GraphAstEdge):
+			return self.parse_edge(node)
+		elif isinstance(node, GraphAstChain):
+			return self.parse_chain(node)
+		elif isinstance(node, GraphAstGroup):
+			return self.parse_group(node)
+		elif isinstance(node, GraphAstLoop):
+			return self.parse_loop(node)
+
+
+	def parse_loop(self, node):
+		'''
+			Expands a loop into the plan. A body without loops or
+			assignments is lowered once, as a template whose slots, refs
+			and holes are then offset for each iteration.
+		'''
+		assert isinstance(node, GraphAstLoop)
+
+		iterations = self.iterations(node)
+
+		env = self.env
+		missing = object()
+		previous = env.pop(node.name, missing)
+
+		try:
+			if not iterations:
+				# Not lowered, its parameters are still structural
+				self.plan.structural |= GraphPlanner.structural_parameters(node.body, {node.name, *env})
+			elif any(isinstance(n, GraphAstLoop) for n in node.body):
+				self.expand(node, iterations)
+			else:
+				self.expand_template(node, iterations)
+		finally:
+			env.pop(node.name, None)
+			if previous is not missing:
+				env[node.name] = previous
+
+	def iterations(self, node):
+		try:
+			return range(*[self.evaluate(arg) for arg in node.args])
+		except (TypeError, ValueError) as e:
+			raise GraphException(f'Invalid range of loop "{node.name}": {e}')
+
+	def expand(self, node, iterations):
+		for i in iterations:
+			self.env[node.name] = i
+			for n in node.body:
+				self.parse_node(n)
+
+	def expand_template(self, node, iterations):
+		planner = GraphPlanner(
+			GraphDef(node.body),
+			graph_directed=self.graph_directed,
+			known_names=AnyName(),
+			parameters=self.parameters,
+			env=self.env,
+			symbols={node.name}
+		)
+		for n in node.body:
+			planner.parse_node(n)
+
+		if planner.definitions: # Names rebound by each iteration
+			return self.expand(node, iterations)
+
+		template = planner.plan
+		plan = self.plan
+		plan.structural |= template.structural
+
+		inputs = [self.parse_getnode(GraphAstGetNode(name)) for name in template.inputs]
+
+		# Built by columns, the values of a template field for each
+		# iteration, interleaved into the plan
+		xs = [*iterations]
+		count = len(xs)
+		size = len(template.node_values)
+		base = len(plan.node_values)
+		edge_base = len(plan.edges)
+
+		interleave = lambda columns: chain.from_iterable(zip(*columns))
+
+		values = [[v] * count for v in template.node_values]
+		for slot, h in template.value_holes:
+			if not isinstance(h, str):
+				values[slot] = self.column(h, node.name, xs)
+
+		ref = lambda r: range(base + r, base + r + count * size, size) if r >= 0 else [inputs[-1 - r]] * count
+
+		plan.node_values += interleave(values)
+		plan.node_data += interleave(self.data_columns(template.node_data, template.node_data_holes, node.name, xs))
+
+		plan.edges += zip(
+			interleave([ref(s) for s, d in template.edges]),
+			interleave([ref(d) for s, d in template.edges])
+		)
+		plan.edge_data += interleave(self.data_columns(template.edge_data, template.edge_data_holes, node.name, xs))
+
+		# Parameter holes, in slot order
+		plan.value_holes += [
+			(base + i * size + slot, h)
+			for i in range(count) for slot, h in template.value_holes if isinstance(h, str)
+		]
+		plan.node_data_holes += [
+			(base + i * size + slot, k, h)
+			for i in range(count) for slot, k, h in template.node_data_holes if isinstance(h, str)
+		]
+		edges = len(template.edges)
+		plan.edge_data_holes += [
+			(edge_base + i * edges + edge, k, h)
+			for i in range(count) for edge, k, h in template.edge_data_holes if isinstance(h, str)
+		]
+
+	def data_columns(self, data, holes, name, xs):
+		columns = [[d] * len(xs) for d in data]
+
+		exprs = {}
+		for i, k, h in holes:
+			if not isinstance(h, str):
+				exprs.setdefault(i, []).append((k, h))
+
+		# Dicts are only copied by iteration when they depend on it
+		for i, keys in exprs.items():
+			column = columns[i] = [{**data[i]} for x in xs]
+			for k, h in keys:
+				for d, v in zip(column, self.column(h, name, xs)):
+					d[k] = v
+
+		return columns
+
+	def column(self, node, name, xs):
+		# Values of a template hole for each value `xs` of its loop variable
+		if isinstance(node, GraphAstGetValue) and node.name == name:
+			return xs
+		if not isinstance(node, GraphAstExpr):
+			return [self.evaluate(node)] * len(xs)
+
+		left, right = self.column(node.left, name, xs), self.column(node.right, name, xs)
+		try:
+			return [*map(OPERATORS[node.op], left, right)]
+		except (TypeError, ZeroDivisionError) as e:
+			raise GraphException(f'Invalid expression in loop "{name}": {e}')
+
+
+	def parse_value(self, node):
+		'''
+			Returns a (literal, parameter name) pair. Values on the loop
+			variables of a template are returned as is, as holes.
+		'''
+		if node is None:
+			return None, None
+
+		assert isinstance(node, GraphAstValue)
+
+		if isinstance(node, GraphAstLitteralValue):
+			return node.value, None
+		elif isinstance(node, GraphAstGetValue):
+			name = node.name
+			if name in self.env:
+				return self.env[name], None
+			if name in self.symbols:
+				return None, node
+			return None, name
+		elif isinstance(node, GraphAstExpr):
+			if self.symbols and self.structural_parameters([node], ()) & self.symbols:
+				return None, node
+			return self.evaluate(node), None
+
+	def evaluate(self, node):
+		'''
+			Value of a range() argument or an expression, parameters
+			read being structural
+		'''
+		if isinstance(node, GraphAstLitteralValue):
+			return node.value
+		elif isinstance(node, GraphAstGetValue):
+			name = node.name
+			if name in self.env:
+				return self.env[name]
+			if name not in self.parameters:
+				raise GraphNotDefinedException.NotDefined(name)
+			self.plan.structural.add(name)
+			return self.parameters[name]
+
+		left, right = self.evaluate(node.left), self.evaluate(node.right)
+		try:
+			return OPERATORS[node.op](left, right)
+		except (TypeError, ZeroDivisionError) as e:
+			raise GraphException(f'Invalid expression {left!r} {node.op} {right!r}: {e}')
+
+	@staticmethod
+	def structural_parameters(nodes, bound, every=False):
+		'''
+			Names read by the range() arguments and expressions of `nodes`,
+			other than the loop variables and the names of `bound`. With
+			`every`, names read by node values and data are included.
+		'''
+		names = set()
+		work = [(n, frozenset(bound)) for n in nodes]
+
+		while work:
+			node, bound = work.pop()
+
+			if isinstance(node, GraphAstExpr):
+				work += [(node.left, bound), (node.right, bound)]
+			elif isinstance(node, GraphAstGetValue):
+				if node.name not in bound:
+					names.add(node.name)
+			elif isinstance(node, GraphAstLoop):
+				work += [(arg, bound) for arg in node.args]
+				work += [(n, bound | {node.name}) for n in node.body]
+			elif isinstance(node, GraphAstNodedef):
+				if every or isinstance(node.value, GraphAstExpr):
+					work.append((node.value, bound))
+				if node.data:
+					work += [(v, bound) for v in node.data.values() if every or isinstance(v, GraphAstExpr)]
+			elif isinstance(node, (GraphAstEdge, GraphAstEdgeSpec)):
+				work += [(v, bound) for v in node.data.values() if every or isinstance(v, GraphAstExpr)]
+				if isinstance(node, GraphAstEdge):
+					work += [(node.node1, bound), (node.node2, bound)]
+			elif isinstance(node, GraphAstChain):
+				work += [(n, bound) for n in node.nodes + node.edges]
+			elif isinstance(node, GraphAstGroup):
+				work += [(n, bound) for n in node.nodes]
+			elif isinstance(node, GraphAstAssignation):
+				work.append((node.value, bound))
+
+		return names
+
+	def parse_data(self, data):
+		template = {}
+		holes = []
+
+		for k, v in data.items():
+			template[k], hole = self.parse_value(v)
+			if hole is not None:
+				holes.append((k, hole))
+
+		try:
+			template = self.templates.setdefault(tuple(template.items()), template)
+		except TypeError: # Unhashable literal
+			pass
+
+		return template, holes
+
+
+	@staticmethod
+	def lower_parallel(ast, workers, **kwargs):
+		'''
+			Same plan as GraphPlanner(ast, graph_directed=..., parameters=...).lower(), the
+			statements being lowered by ranges in `workers` processes
+		'''
+		assert isinstance(ast, GraphDef)
+
+		graph_directed = kwargs.get('graph_directed')
+		parameters = kwargs.get('parameters', {})
+
+		count = len(ast.nodes)
+		chunks = min(count, workers * 4)
+		if chunks < 2:
+			return GraphPlanner(ast, graph_directed=graph_directed, parameters=parameters).lower()
+
+		bounds = [count * i // chunks for i in range(chunks + 1)]
+
+		with ProcessPoolExecutor(workers, initializer=init_worker, initargs=(ast,)) as pool:
+			futures = [
+				pool.submit(lower_range, start, stop, graph_directed, parameters)
+				for start, stop in zip(bounds, bounds[1:])
+			]
+
+			# In statement order, so errors and the result are deterministic
+			return GraphPlan.merge(f.result() for f in futures)
+
+	def lower(self):
+		assert isinstance(self.ast, GraphDef)
+
+		for n in self.ast.nodes:
+			self.parse_node(n)
+
+		# Move input refs after the node slots
+		size = len(self.plan.node_values)
+		fix = lambda ref: ref if ref >= 0 else size - 1 - ref
+
+		self.plan.edges = [(fix(s), fix(d)) for s, d in self.plan.edges]
+		self.plan.outputs = {k: fix(v) for k, v in self.definitions.items()}
+
+		self.plan.fold()
+		self.plan.index()
+
+		return self.plan
+
+
+class GraphWalker(GraphPlanner):
+	'''
+		Resolved nodes and edges of a GraphDef, in build order, without a
+		plan. Loops and groups are expanded as they are walked, so memory
+		doesn't grow with the graph. Node refs are (value,) tuples, and
+		each node definition is yielded, a backend would merge them.
+	'''
+
+	def __init__(self, ast, **kwargs):
+		super().__init__(ast, **kwargs)
+
+		# Iterables of the (kind, item) of the statement being walked
+		self.pending = []
+
+	def check(self):
+		for name in GraphPlanner.structural_parameters(self.ast.nodes, (), every=True):
+			if name not in self.parameters:
+				raise GraphNotDefinedException.NotDefined(name)
+
+	def iter_nodes(self):
+		self.check()
+		return (item for kind, item in self.walk(self.ast.nodes) if kind == NODE)
+
+	def iter_edges(self):
+		self.check()
+		return (item for kind, item in self.walk(self.ast.nodes) if kind == EDGE)
+
+	def walk(self, nodes):
+		for node in nodes:
+			if isinstance(node, GraphAstLoop):
+				yield from self.walk_loop(node)
+				continue
+
+			self.parse_node(node)
+			pending = self.pending
+			self.pending = []
+			for items in pending:
+				yield from items
+
+	def walk_loop(self, node):
+		iterations = self.iterations(node)
+
+		env = self.env
+		missing = object()
+		previous = env.pop(node.name, missing)
+
+		try:
+			for i in iterations:
+				env[node.name] = i
+				yield from self.walk(node.body)
+		finally:
+			env.pop(node.name, None)
+			if previous is not missing:
+				env[node.name] = previous
+
+	def lookup(self, name):
+		try:
+			return self.parameters[name]
+		except KeyError:
+			raise GraphNotDefinedException.NotDefined(name)
+
+	def parse_nodedef(self, node):
+		assert isinstance(node, GraphAstNodedef)
+
+		value, hole = self.parse_value(node.value)
+		if hole is not None:
+			value = self.lookup(hole)
+
+		data = {} if node.data is None else self.parse_data(node.data)[0]
+		self.pending.append(((NODE, (value, data)),))
+
+		return (value,)
+
+	def parse_data(self, data):
+		# Resolved, and not shared as templates are
+		resolved = {}
+		for k, v in data.items():
+			resolved[k], hole = self.parse_value(v)
+			if hole is not None:
+				resolved[k] = self.lookup(hole)
+
+		return resolved, ()
+
+	def add_edge(self, n1, n2, data, holes):
+		self.pending.append(((EDGE, (n1[0], n2[0], {**data})),))
+
+	def add_edges(self, pairs, data, holes):
+		self.pending.append((EDGE, (s[0], d[0], {**data})) for s, d in pairs)
+
+
+# Kinds of the items walked by GraphWalker
+NODE, EDGE = range(2)
@@ -0,0 +1,455 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+'''
+	Compact binary format for compiled GraphDef ASTs and lowered GraphPlans.
+
+	Layout: magic, format version, kind (AST / plan), literal codec, then
+	length-prefixed sections. Strings (names, keys, edge chars) and literal
+	values are stored once in tables, written with marshal (pickle for
+	literals marshal can't handle). The AST itself is a postfix stream of
+	opcodes and varint table indices, decoded with a stack and no
+	recursion. Shared nodes and dicts stay shared.
+'''
+
+import gc
+import pickle
+import marshal
+from array import array
+from itertools import chain
+
+from GraphDSL.graphAst import *
+from GraphDSL.plan import GraphPlan
+from GraphDSL.exceptions import GraphFormatException
+
+MAGIC = b'GDSL'
+
+# Bumped whenever the encoding changes, other versions are rejected
+VERSION = 2
+
+AST, PLAN = b'A', b'P'
+MARSHAL, PICKLE = 0, 1
+
+# Payloads from which loads pauses the garbage collector
+NO_GC_SIZE = 1 << 16
+
+# Opcodes of the AST stream, the first two have no operand. NODELIT is
+# NODEDEF on a literal and a dict already seen, the most common node.
+NONE, NODEDEF, LIT, GETVAL, DATA, DICTREF, GETNODE, ASSIGN, EDGE, SPEC, CHAIN, GRAPH, NODELIT, EXPR, LOOP, GROUP = range(16)
+
+
+def write_varint(out, n):
+	while n > 127:
+		out.append(n & 127 | 128)
+		n >>= 7
+	out.append(n)
+
+def read_varint(data, pos, n):
+	# n is the first byte, already read and >= 128
+	n &= 127
+	shift = 7
+	while True:
+		b = data[pos]
+		pos += 1
+		n |= (b & 127) << shift
+		if b < 128:
+			return n, pos
+		shift += 7
+
+
+def encode_table(values, allow_pickle):
+	try:
+		return MARSHAL, marshal.dumps(values)
+	except ValueError as e: # Not a marshallable literal
+		if not allow_pickle:
+			raise GraphFormatException(f"Can't serialize literals: {e}")
+		return PICKLE, pickle.dumps(values, pickle.HIGHEST_PROTOCOL)
+
+def decode_table(codec, data, allow_pickle):
+	# Unpickling runs code named by the payload, only done on request
+	if codec == MARSHAL:
+		return marshal.loads(data)
+	if codec != PICKLE:
+		raise GraphFormatException.Invalid(f'literal codec {codec}')
+	if not allow_pickle:
+		raise GraphFormatException.Invalid('pickled literals, loads them with allow_pickle=True')
+	return pickle.loads(data)
+
+
+def pack(kind, strings, literals, body):
+	# Literals of a compiled AST always marshal, only plans may need pickle
+	codec, table = encode_table(literals, kind == PLAN)
+
+	out = bytearray(MAGIC)
+	out += bytes((VERSION,)) + kind + bytes((codec,))
+	for section in (marshal.dumps(strings), table):
+		write_varint(out, len(section))
+		out += section
+	out += body
+
+	return bytes(out)
+
+def unpack(data, allow_pickle=False):
+	data = memoryview(data)
+
+	if bytes(data[:4]) != MAGIC:
+		raise GraphFormatException.Invalid('bad magic')
+	if data[4] != VERSION:
+		raise GraphFormatException.Invalid(f'format version {data[4]}, expected {VERSION}')
+
+	kind = bytes(data[5:6])
+	codec = data[6]
+	pos = 7
+
+	sections = []
+	for i in range(2):
+		size = data[pos]
+		pos += 1
+		if size > 127:
+			size, pos = read_varint(data, pos, size)
+		sections.append(data[pos:pos + size])
+		pos += size
+
+	strings = marshal.loads(sections[0])
+	literals = decode_table(codec, sections[1], allow_pickle and kind == PLAN)
+
+	return kind, strings, literals, bytes(data[pos:])
+
+
+class Tables:
+	def __init__(self):
+		self.strings = {}
+		self.literals = {}		# id(GraphAstLitteralValue) -> index
+		self.literal_values = []
+		self.dicts = {}			# id(dict) -> index
+
+	def string(self, s):
+		index = self.strings.get(s)
+		if index is None:
+			index = self.strings[s] = len(self.strings)
+		return index
+
+
+def encode_ast(ast):
+	tables = Tables()
+	out = bytearray()
+
+	# Postfix: an item's children are written before its opcode, the
+	# tuples pushed on `work` being the opcodes to write once they are
+	work = [ast]
+
+	while work:
+		item = work.pop()
+
+		if type(item) is tuple:
+			for n in item:
+				write_varint(out, n)
+
+		elif item is None:
+			out.append(NONE)
+
+		elif type(item) is GraphAstLitteralValue:
+			index = tables.literals.get(id(item))
+			if index is None:
+				index = tables.literals[id(item)] = len(tables.literal_values)
+				tables.literal_values.append(item.value)
+			out.append(LIT)
+			write_varint(out, index)
+
+		elif type(item) is dict:
+			index = tables.dicts.get(id(item))
+			if index is not None:
+				out.append(DICTREF)
+				write_varint(out, index)
+				continue
+			tables.dicts[id(item)] = len(tables.dicts)
+			work.append((DATA, len(item), *map(tables.string, item)))
+			work += reversed(item.values())
+
+		elif type(item) is GraphAstGetValue:
+			work.append((GETVAL, tables.string(item.name)))
+
+		elif type(item) is GraphAstNodedef:
+			literal = tables.literals.get(id(item.value))
+			data = tables.dicts.get(id(item.data))
+			if literal is not None and data is not None and type(item.value) is GraphAstLitteralValue:
+				out.append(NODELIT)
+				write_varint(out, literal)
+				write_varint(out, data)
+			else:
+				work += [(NODEDEF,), item.data, item.value]
+
+		elif type(item) is GraphAstGetNode:
+			work.append((GETNODE, tables.string(item.name)))
+
+		elif type(item) is GraphAstAssignation:
+			work += [(ASSIGN, tables.string(item.name)), item.value]
+
+		elif type(item) is GraphAstEdge:
+			work += [
+				(EDGE, tables.string(item.left_char), tables.string(item.right_char)),
+				item.data, item.node2, item.node1
+			]
+
+		elif type(item) is GraphAstEdgeSpec:
+			work += [(SPEC, tables.string(item.left_char), tables.string(item.right_char)), item.data]
+
+		elif type(item) is GraphAstChain:
+			work.append((CHAIN, len(item.nodes)))
+			work += reversed(item.edges)
+			work += reversed(item.nodes)
+
+		elif type(item) is GraphAstExpr:
+			work += [(EXPR, tables.string(item.op)), item.right, item.left]
+
+		elif type(item) is GraphAstGroup:
+			work.append((GROUP, len(item.nodes)))
+			work += reversed(item.nodes)
+
+		elif type(item) is GraphAstLoop:
+			work.append((LOOP, tables.string(item.name), len(item.args), len(item.body)))
+			work += reversed(item.body)
+			work += reversed(item.args)
+
+		elif type(item) is GraphDef:
+			work.append((GRAPH, len(item.nodes)))
+			work += reversed(item.nodes)
+
+		else:
+			raise GraphFormatException(f"Can't serialize {item!r}")
+
+	return pack(AST, tuple(tables.strings), tables.literal_values, out)
+
+
+def decode_ast(strings, literal_values, data):
+	literals = [GraphAstLitteralValue(v) for v in literal_values]
+	dicts = []
+
+	stack = []
+	push = stack.append
+	pop = stack.pop
+
+	pos = 0
+	end = len(data)
+
+	while pos < end:
+		op = data[pos]
+		pos += 1
+
+		if op == NODEDEF:
+			d = pop()
+			push(GraphAstNodedef(pop(), d))
+			continue
+		elif op == NONE:
+			push(None)
+			continue
+
+		a = data[pos]
+		pos += 1
+		if a > 127:
+			a, pos = read_varint(data, pos, a)
+
+		if op == NODELIT:
+			b = data[pos]
+			pos += 1
+			if b > 127:
+				b, pos = read_varint(data, pos, b)
+			push(GraphAstNodedef(literals[a], dicts[b]))
+
+		elif op == LIT:
+			push(literals[a])
+
+		elif op == DATA:
+			keys = []
+			for i in range(a):
+				k = data[pos]
+				pos += 1
+				if k > 127:
+					k, pos = read_varint(data, pos, k)
+				keys.append(strings[k])
+			if a:
+				d = dict(zip(keys, stack[-a:]))
+				del stack[-a:]
+			else:
+				d = {}
+			dicts.append(d)
+			push(d)
+
+		elif op == DICTREF:
+			push(dicts[a])
+
+		elif op == EDGE:
+			b = data[pos]
+			pos += 1
+			if b > 127:
+				b, pos = read_varint(data, pos, b)
+			d = pop()
+			n2 = pop()
+			push(GraphAstEdge(pop(), n2, d, strings[a], strings[b]))
+
+		elif op == SPEC:
+			b = data[pos]
+			pos += 1
+			if b > 127:
+				b, pos = read_varint(data, pos, b)
+			push(GraphAstEdgeSpec(pop(), strings[a], strings[b]))
+
+		elif op == GETVAL:
+			push(GraphAstGetValue(strings[a]))
+
+		elif op == GETNODE:
+			push(GraphAstGetNode(strings[a]))
+
+		elif op == ASSIGN:
+			push(GraphAstAssignation(strings[a], pop()))
+
+		elif op == CHAIN:
+			edges = stack[len(stack) - a + 1:]
+			del stack[len(stack) - a + 1:]
+			nodes = stack[len(stack) - a:]
+			del stack[len(stack) - a:]
+			push(GraphAstChain(nodes, edges))
+
+		elif op == EXPR:
+			right = pop()
+			push(GraphAstExpr(strings[a], pop(), right))
+
+		elif op == LOOP:
+			counts = []
+			for i in range(2):
+				b = data[pos]
+				pos += 1
+				if b > 127:
+					b, pos = read_varint(data, pos, b)
+				counts.append(b)
+			nargs, nbody = counts
+			body = stack[len(stack) - nbody:]
+			del stack[len(stack) - nbody:]
+			args = stack[len(stack) - nargs:]
+			del stack[len(stack) - nargs:]
+			push(GraphAstLoop(strings[a], args, body))
+
+		elif op == GROUP:
+			nodes = stack[len(stack) - a:]
+			del stack[len(stack) - a:]
+			push(GraphAstGroup(nodes))
+
+		elif op == GRAPH:
+			nodes = stack[len(stack) - a:]
+			del stack[len(stack) - a:]
+			push(GraphDef(nodes))
+
+		else:
+			raise GraphFormatException.Invalid(f'opcode {op}')
+
+	if len(stack) != 1 or type(stack[0]) is not GraphDef:
+		raise GraphFormatException.Invalid('truncated AST')
+
+	return stack[0]
+
+
+def pack_ints(values):
+	# Unsigned array of the smallest item size that fits
+	values = array('Q', values)
+	top = max(values, default=0)
+	for code in 'BHI':
+		if top < 1 << 8 * array(code).itemsize:
+			values = array(code, values)
+			break
+	return values.typecode, values.tobytes()
+
+def unpack_ints(packed):
+	code, data = packed
+	values = array(code)
+	values.frombytes(data)
+	return values
+
+
+def encode_plan(plan):
+	# Data templates are stored once each, node and edge data as indices
+	data = plan.node_data + plan.edge_data
+	ids = [*map(id, data)]
+	templates = dict(zip(ids, data))
+	index = dict(zip(templates, range(len(templates))))
+
+	literals = [[*templates.values()], plan.node_values]
+
+	body = marshal.dumps((
+		pack_ints(map(index.__getitem__, ids)),
+		pack_ints(chain.from_iterable(plan.edges)),
+		plan.value_holes,
+		plan.node_data_holes,
+		plan.edge_data_holes,
+		plan.inputs,
+		[*plan.outputs.items()],
+		sorted(plan.structural)
+	))
+
+	return pack(PLAN, (), literals, body)
+
+
+def decode_plan(literals, data):
+	templates, node_values = literals
+	data, edges, value_holes, node_data_holes, edge_data_holes, inputs, outputs, structural = marshal.loads(data)
+
+	plan = GraphPlan()
+
+	data = [templates[i] for i in unpack_ints(data)]
+	plan.node_values = node_values
+	plan.node_data = data[:len(node_values)]
+	plan.edge_data = data[len(node_values):]
+
+	refs = unpack_ints(edges)
+	plan.edges = [*zip(refs[0::2], refs[1::2])]
+
+	plan.value_holes = value_holes
+	plan.node_data_holes = node_data_holes
+	plan.edge_data_holes = edge_data_holes
+	plan.inputs = inputs
+	plan.outputs = dict(outputs)
+	plan.structural = set(structural)
+
+	plan.index()
+
+	return plan
+
+
+def dumps(obj):
+	'''
+		Serializes a GraphDef or a GraphPlan
+	'''
+	if isinstance(obj, GraphDef):
+		return encode_ast(obj)
+	if isinstance(obj, GraphPlan):
+		return encode_plan(obj)
+
+	raise GraphFormatException(f"Can't serialize {type(obj).__name__}")
+
+def loads(data, allow_pickle=False):
+	'''
+		Reads the GraphDef or GraphPlan serialized by dumps. Plans whose
+		literals had to be pickled are only read with allow_pickle=True,
+		for trusted data: unpickling can run arbitrary code.
+	'''
+	# Decoding only allocates acyclic objects, collections would only
+	# rescan them (they take more than half of the time otherwise). The
+	# collector is process wide, it is only paused for large payloads.
+	paused = len(data) >= NO_GC_SIZE and gc.isenabled()
+	if paused:
+		gc.disable()
+
+	try:
+		kind, strings, literals, body = unpack(data, allow_pickle)
+
+		if kind == AST:
+			return decode_ast(strings, literals, body)
+		if kind == PLAN:
+			return decode_plan(literals, body)
+	except (IndexError, ValueError, EOFError, TypeError, pickle.UnpicklingError, ImportError, AttributeError) as e:
+		# Pickled literal tables can fail with any of the last three
+		raise GraphFormatException.Invalid(e) from e
+	finally:
+		if paused:
+			gc.enable()
+
+	raise GraphFormatException.Invalid(f'unknown kind {kind!r}')
@@ -0,0 +1,118 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import json
+import threading
+from time import perf_counter
+from contextlib import contextmanager, nullcontext
+
+# Backend methods timed by GraphStats.observe
+BACKEND_METHODS = (
+	'create_directed_graph', 'create_undirected_graph',
+	'add_node', 'add_edge', 'add_nodes_from', 'add_edges_from',
+	'finish_graph', 'copy_graph', 'update_nodes', 'update_edges'
+)
+
+class GraphStats:
+	'''
+		Timings and counts of a GraphFactory, enabled with @Graph(stats=True)
+		or by passing a GraphStats to share it between graphs.
+
+		Phases are 'source' (inspect.getsource), 'compile' (tokenizing and
+		parsing), 'lower', 'build', 'overlay' (rebuild) and 'backend.<method>'
+		for backend calls. Counts are the tokens read, the nodes and edges
+		emitted by builds and the number of builds. `hook`, if given, is
+		called with (phase, seconds) at the end of each phase.
+	'''
+
+	def __init__(self, hook=None):
+		self.hook = hook
+		self.lock = threading.Lock()
+
+		self.phases = {}	# phase -> [calls, seconds]
+		self.counts = {}
+
+
+	def record(self, phase, seconds):
+		with self.lock:
+			entry = self.phases.get(phase)
+			if entry is None:
+				entry = self.phases[phase] = [0, 0.0]
+			entry[0] += 1
+			entry[1] += seconds
+
+		if self.hook is not None:
+			self.hook(phase, seconds)
+
+	def count(self, name, n=1):
+		with self.lock:
+			self.counts[name] = self.counts.get(name, 0) + n
+
+
+	@contextmanager
+	def phase(self, name):
+		start = perf_counter()
+		try:
+			yield
+		finally:
+			self.record(name, perf_counter() - start)
+
+	def tokens(self, tokens):
+		# Counts the tokens of a GraphCompiler as they are read
+		n = 0
+		try:
+			for t in tokens:
+				n += 1
+				yield t
+		finally:
+			self.count('tokens', n)
+
+	def observe(self, backend):
+		'''
+			Times the calls of a backend instance, including the ones it
+			makes to itself (add_nodes_from falling back to add_node)
+		'''
+		for name in BACKEND_METHODS:
+			method = getattr(backend, name, None)
+			# Backend instances are reused by every build
+			if method is not None and getattr(method, 'stats', None) is not self:
+				setattr(backend, name, self.timed('backend.' + name, method))
+
+		return backend
+
+	def timed(self, phase, f):
+		def wrapper(*args, **kwargs):
+			start = perf_counter()
+			try:
+				return f(*args, **kwargs)
+			finally:
+				self.record(phase, perf_counter() - start)
+
+		wrapper.stats = self
+		return wrapper
+
+
+	def to_dict(self):
+		with self.lock:
+			return {
+				'phases': {
+					phase: {'calls': calls, 'seconds': seconds}
+					for phase, (calls, seconds) in self.phases.items()
+				},
+				'counts': {**self.counts}
+			}
+
+	def to_json(self, **kwargs):
+		return json.dumps(self.to_dict(), **kwargs)
+
+	def reset(self):
+		with self.lock:
+			self.phases.clear()
+			self.counts.clear()
+
+
+def phase(stats, name):
+	# No-op context when stats are disabled
+	if stats is None:
+		return nullcontext()
+	return stats.phase(name)
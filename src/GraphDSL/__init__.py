@@ -1,3 +1,6 @@
 #!/usr/bin/env python3
 
-from .factory import Graph
\ No newline at end of file
+__version__ = '1.0.0'
+
+from .factory import Graph, compile_all
+from .loader import load
\ No newline at end of file
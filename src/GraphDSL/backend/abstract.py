@@ -18,4 +18,52 @@ class Backend():
 	def add_edge(self, graph, n1, n2, data):
 		pass
 		
+	# Bulk insertion, backends override these when the library has a faster path.
+	# `nodes` is a list of (value, data), `edges` an iterable of (n1, n2, data);
+	# data dicts are built for the call, the backend may keep them.
+		
+	def add_nodes_from(self, graph, nodes):
+		return [self.add_node(graph, value, data) for value, data in nodes]
+		
+	def add_edges_from(self, graph, edges):
+		return [self.add_edge(graph, n1, n2, data) for n1, n2, data in edges]
+		
+	# Nodes and edges per add_*_from call during a build, None for a single
+	# call each
+	
+	chunk_size = None
+		
+	# Called once the graph is built, returns the result of the build
+	# (sink backends close their output there)
+	
+	def finish_graph(self, graph):
+		return graph
+		
+	# Called instead of finish_graph when the build raises (sink backends
+	# close and remove their partial output)
+	
+	def abort_graph(self, graph):
+		pass
+		
+	# Structural copies, to derive graphs that only differ by some attributes.
+	# copy_graph returns None when the backend can't copy; with share_data
+	# the copy may share attribute dicts (update_* never mutate them).
+	# freeze_graph returns a read-only graph, shared by the calls hitting the
+	# result cache, or None when the backend can't freeze.
+	# Backends that can't update a built graph set updatable to False.
+	
+	updatable = True
+	
+	def copy_graph(self, graph, share_data=False):
+		return None
+	
+	def freeze_graph(self, graph):
+		return None
+	
+	def update_nodes(self, graph, nodes):
+		pass
+	
+	def update_edges(self, graph, edges):
+		pass
+		
 
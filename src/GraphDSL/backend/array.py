@@ -0,0 +1,488 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import os
+import sys
+import mmap
+import pickle
+from array import array
+from collections import namedtuple
+from multiprocessing.shared_memory import SharedMemory
+
+from .abstract import Backend
+from GraphDSL.exceptions import GraphBackendException
+
+try:
+	import numpy as np
+except ImportError:
+	imported = False
+else:
+	imported = True
+
+
+MISSING = object()
+
+INT, FLOAT, OBJECT = range(3)
+
+def typecode(values):
+	# Typed columns are arrays, or memoryviews over shared memory
+	if isinstance(values, array):
+		return values.typecode
+	if isinstance(values, memoryview):
+		return values.format
+	return None
+
+def kind(value):
+	if value is MISSING or type(value) is float:
+		return FLOAT
+	if type(value) is int:
+		return INT
+	return OBJECT
+
+
+class Column:
+	'''
+		Attribute column, an int64 or float64 array while every value fits,
+		a list otherwise. Missing values are nan (ints are promoted to float
+		for them) or None.
+	'''
+	__slots__ = ('values', 'kind')
+
+	def __init__(self):
+		self.values = array('q')
+		self.kind = INT
+
+	def __len__(self):
+		return len(self.values)
+
+	def promote(self, k):
+		if k <= self.kind:
+			return
+		if k == FLOAT:
+			self.values = array('d', self.values)
+		else:
+			self.values = [*self.values]
+		self.kind = k
+
+	def convert(self, values):
+		if self.kind == FLOAT:
+			return [float('nan') if v is MISSING else v for v in values]
+		if self.kind == OBJECT:
+			return [None if v is MISSING else v for v in values]
+		return values
+
+	def extend(self, values):
+		self.promote(max(map(kind, values), default=INT))
+		try:
+			self.values.extend(self.convert(values))
+		except OverflowError:
+			self.promote(OBJECT)
+			self.values.extend(self.convert(values))
+
+	def set(self, row, value):
+		self.promote(kind(value))
+		try:
+			self.values[row] = self.convert((value,))[0]
+		except OverflowError:
+			self.promote(OBJECT)
+			self.values[row] = value
+
+
+CSR = namedtuple('CSR', ('indptr', 'indices', 'data', 'shape'))
+
+
+class ArrayGraph:
+	'''
+		Compact graph: node values are interned to dense ints, edges are
+		two int64 arrays and attributes are stored by column.
+
+		Numpy views returned by node_column / edge_column share memory with the graph, which
+		can't grow while they are alive.
+	'''
+
+	def __init__(self, directed=True):
+		self.directed = directed
+
+		self.ids = []		# node -> value, None for anonymous nodes
+		self.index = {}		# value -> node
+
+		self.src = array('q')
+		self.dst = array('q')
+
+		self.node_columns = {}
+		self.edge_columns = {}
+
+	def number_of_nodes(self):
+		return len(self.ids)
+
+	def number_of_edges(self):
+		return len(self.src)
+
+
+	@staticmethod
+	def fill(columns, size, rows):
+		# Appends `rows` (dicts) to `columns`, `size` being the row count before
+		keys = dict.fromkeys(k for d in rows for k in d)
+
+		for k in keys:
+			if k not in columns:
+				columns[k] = Column()
+				if size:
+					columns[k].extend([MISSING] * size)
+
+		for k, column in columns.items():
+			column.extend([d.get(k, MISSING) for d in rows])
+
+	def add_nodes(self, nodes):
+		'''
+			Interns (value, data) pairs, returns their node ids. Data of a
+			repeated value is merged into the existing node.
+		'''
+		size = len(self.ids)
+		handles = []
+		rows = []
+		updates = []
+
+		for value, data in nodes:
+			node = self.index.get(value) if value is not None else None
+
+			if node is None:
+				node = size + len(rows)
+				if value is not None:
+					self.index[value] = node
+				self.ids.append(value)
+				rows.append(data or {})
+			elif data:
+				if node >= size:
+					rows[node - size].update(data)
+				else:
+					updates.append((node, data))
+
+			handles.append(node)
+
+		self.fill(self.node_columns, size, rows)
+
+		for node, data in updates:
+			self.update_node(node, data)
+
+		return handles
+
+	def add_edges(self, edges):
+		'''
+			Appends (n1, n2, data) edges between node ids, returns their
+			edge ids
+		'''
+		size = len(self.src)
+		rows = []
+
+		for n1, n2, data in edges:
+			self.src.append(n1)
+			self.dst.append(n2)
+			rows.append(data)
+
+		self.fill(self.edge_columns, size, rows)
+
+		return range(size, len(self.src))
+
+	def update_node(self, node, data):
+		for k, v in data.items():
+			if k not in self.node_columns:
+				self.node_columns[k] = column = Column()
+				column.extend([MISSING] * len(self.ids))
+			self.node_columns[k].set(node, v)
+
+	def update_edge(self, edge, data):
+		for k, v in data.items():
+			if k not in self.edge_columns:
+				self.edge_columns[k] = column = Column()
+				column.extend([MISSING] * len(self.src))
+			self.edge_columns[k].set(edge, v)
+
+
+	def node_data(self, node):
+		return {k: c.values[node] for k, c in self.node_columns.items()}
+
+	def edge_data(self, edge):
+		return {k: c.values[edge] for k, c in self.edge_columns.items()}
+
+	def edges(self):
+		ids = self.ids
+		return [(ids[s], ids[d]) for s, d in zip(self.src, self.dst)]
+
+
+	@staticmethod
+	def view(values):
+		if not imported:
+			raise GraphBackendException("Can't import module numpy")
+
+		code = typecode(values)
+		if code is not None:
+			return np.frombuffer(values, dtype=np.int64 if code == 'q' else np.float64)
+		return np.array(values, dtype=object)
+
+	def node_column(self, key):
+		return self.view(self.node_columns[key].values)
+
+	def edge_column(self, key):
+		return self.view(self.edge_columns[key].values)
+
+	def to_csr(self, weight=None):
+		'''
+			Adjacency in CSR form (numpy arrays). Values are the `weight`
+			edge column (1 where missing) or 1, parallel edges are kept as
+			duplicate entries and undirected edges are stored both ways.
+		'''
+		src = self.view(self.src)
+		dst = self.view(self.dst)
+
+		if weight not in self.edge_columns:
+			data = np.ones(len(src))
+		else:
+			data = self.edge_column(weight).astype(np.float64)
+			data[np.isnan(data)] = 1
+
+		if not self.directed:
+			loops = src == dst
+			src, dst = np.concatenate((src, dst[~loops])), np.concatenate((dst, src[~loops]))
+			data = np.concatenate((data, data[~loops]))
+
+		n = len(self.ids)
+		order = np.argsort(src, kind='stable')
+
+		indptr = np.zeros(n + 1, dtype=np.int64)
+		np.cumsum(np.bincount(src, minlength=n), out=indptr[1:])
+
+		return CSR(indptr, dst[order], data[order], (n, n))
+
+	def to_scipy(self, weight=None):
+		'''
+			scipy.sparse csr_array over the to_csr arrays, without copying them
+		'''
+		try:
+			import scipy.sparse
+		except ImportError:
+			raise GraphBackendException("Can't import module scipy")
+
+		csr = self.to_csr(weight)
+		return scipy.sparse.csr_array((csr.data, csr.indices, csr.indptr), shape=csr.shape, copy=False)
+
+	def share(self, path=None):
+		'''
+			Copies the graph to a new shared memory block, or to the file at
+			`path`, and returns it as a SharedArrayGraph
+		'''
+		return SharedArrayGraph.create(self, path)
+
+
+def aligned(size):
+	return -(-size // 8) * 8
+
+
+class SharedArrayGraph(ArrayGraph):
+	'''
+		Read-only ArrayGraph whose arrays are memoryviews over a shared
+		memory block or a memory-mapped file.
+
+		Pickling it only carries the block name (or file path), processes
+		unpickling it attach to the same memory. Node values and list
+		columns are pickled in the block header, the arrays are not copied.
+		The creator owns the block and has to unlink() it.
+	'''
+
+	def __init__(self, buffer, name=None, path=None, shm=None, mapped=None):
+		self.name = name
+		self.path = path
+		self.shm = shm
+		self.mapped = mapped
+		self.buffer = buffer
+		self.views = []
+
+		# Layout: header size (8 bytes), pickled header, 8-aligned arrays
+		size = int.from_bytes(buffer[:8], 'little')
+		header = pickle.loads(buffer[8:8 + size])
+		start = aligned(8 + size)
+
+		self.directed = header['directed']
+		self.ids = header['ids']
+		self.index = {v: i for i, v in enumerate(self.ids) if v is not None}
+
+		self.node_columns = {}
+		self.edge_columns = {}
+
+		for role, key, code, offset, count in header['layout']:
+			offset += start
+			view = buffer[offset:offset + count * 8].cast(code)
+			self.views.append(view)
+
+			if role == 'src':
+				self.src = view
+			elif role == 'dst':
+				self.dst = view
+			else:
+				self.column(role, key, view, INT if code == 'q' else FLOAT)
+
+		for (role, key), values in header['objects'].items():
+			self.column(role, key, values, OBJECT)
+
+	def column(self, role, key, values, kind):
+		columns = self.node_columns if role == 'node' else self.edge_columns
+		columns[key] = column = Column()
+		column.values = values
+		column.kind = kind
+
+	@classmethod
+	def create(cls, graph, path=None):
+		arrays = [('src', None, graph.src), ('dst', None, graph.dst)]
+		arrays += [('node', k, c.values) for k, c in graph.node_columns.items()]
+		arrays += [('edge', k, c.values) for k, c in graph.edge_columns.items()]
+
+		layout = []
+		typed = []
+		objects = {}
+		size = 0
+
+		for role, key, values in arrays:
+			code = typecode(values)
+			if code is None:
+				objects[(role, key)] = values
+			else:
+				layout.append((role, key, code, size, len(values)))
+				typed.append((size, values))
+				size += len(values) * 8
+
+		header = pickle.dumps({
+			'directed': graph.directed,
+			'ids': graph.ids,
+			'layout': layout,
+			'objects': objects
+		}, protocol=pickle.HIGHEST_PROTOCOL)
+		start = aligned(8 + len(header))
+
+		def write(buffer):
+			buffer[:8] = len(header).to_bytes(8, 'little')
+			buffer[8:8 + len(header)] = header
+			for offset, values in typed:
+				buffer[start + offset:start + offset + len(values) * 8] = memoryview(values).cast('B')
+
+		if path is None:
+			shm = SharedMemory(create=True, size=start + size)
+			write(shm.buf)
+			return cls(shm.buf.toreadonly(), name=shm.name, shm=shm)
+
+		with open(path, 'w+b') as f:
+			f.truncate(start + size)
+			with mmap.mmap(f.fileno(), start + size) as mapped:
+				with memoryview(mapped) as buffer:
+					write(buffer)
+
+		return cls.attach(path=path)
+
+	@classmethod
+	def attach(cls, name=None, path=None):
+		if path is not None:
+			with open(path, 'rb') as f:
+				mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+			return cls(memoryview(mapped), path=path, mapped=mapped)
+
+		if os.name == 'nt':
+			shm = SharedMemory(name)
+			return cls(shm.buf.toreadonly(), name=name, shm=shm)
+
+		# The block must not be registered with this process' resource
+		# tracker, which unlinks it when the process exits
+		if sys.version_info >= (3, 13):
+			shm = SharedMemory(name, track=False)
+			return cls(shm.buf.toreadonly(), name=name, shm=shm)
+
+		# SharedMemory always registers it before 3.13, it is mapped directly
+		import _posixshmem
+
+		fd = _posixshmem.shm_open('/' + name, os.O_RDONLY, mode=0o600)
+		try:
+			mapped = mmap.mmap(fd, os.fstat(fd).st_size, access=mmap.ACCESS_READ)
+		finally:
+			os.close(fd)
+		return cls(memoryview(mapped), name=name, mapped=mapped)
+
+	def __reduce__(self):
+		return (SharedArrayGraph.attach, (self.name, self.path))
+
+	def close(self):
+		for view in self.views:
+			view.release()
+		self.buffer.release()
+
+		if self.shm is not None:
+			self.shm.close()
+		if self.mapped is not None:
+			self.mapped.close()
+
+	def __del__(self):
+		# Before the SharedMemory / mmap, which can't close with views alive
+		try:
+			self.close()
+		except BufferError: # Views still exported to the caller
+			pass
+
+	def unlink(self):
+		if self.path is not None:
+			os.remove(self.path)
+		else:
+			self.shm.unlink()
+
+	def __enter__(self):
+		return self
+
+	def __exit__(self, *args):
+		self.close()
+
+
+class ArrayBackend(Backend):
+	def __init__(self):
+		self.__name__ = 'array'
+
+	def create_directed_graph(self):
+		return ArrayGraph(directed=True)
+
+	def create_undirected_graph(self):
+		return ArrayGraph(directed=False)
+
+	def add_node(self, graph, value, data):
+		return graph.add_nodes(((value, data),))[0]
+
+	def add_edge(self, graph, n1, n2, data):
+		return graph.add_edges(((n1, n2, data),))[0]
+
+	def add_nodes_from(self, graph, nodes):
+		return graph.add_nodes(nodes)
+
+	def add_edges_from(self, graph, edges):
+		return graph.add_edges(edges)
+
+	def copy_graph(self, graph, share_data=False):
+		copy = ArrayGraph(graph.directed)
+		copy.ids = [*graph.ids]
+		copy.index = {**graph.index}
+		copy.src = array('q', graph.src)
+		copy.dst = array('q', graph.dst)
+
+		for columns, copied in ((graph.node_columns, copy.node_columns), (graph.edge_columns, copy.edge_columns)):
+			for k, column in columns.items():
+				copied[k] = c = Column()
+				code = typecode(column.values)
+				c.values = [*column.values] if code is None else array(code, column.values)
+				c.kind = column.kind
+
+		return copy
+
+	def update_nodes(self, graph, nodes):
+		for n, data in nodes:
+			if data:
+				graph.update_node(n, data)
+
+	def update_edges(self, graph, edges):
+		for e, data in edges:
+			graph.update_edge(e, data)
+
+
+default = ArrayBackend
@@ -33,6 +33,7 @@ class IGraphBackend(Backend):
 			return graph.add_vertex(name=value, attr=data)
 		
 		if value in self.nodes.keys():
+			# A vertex keeps the data of its first definition
 			return self.nodes[value]
 		
 		node = graph.add_vertex(name=value, attr=data)
@@ -43,6 +44,66 @@ class IGraphBackend(Backend):
 	def add_edge(self, graph, n1, n2, data):
 		return graph.add_edge(n1, n2, **data)
 		
+	def add_nodes_from(self, graph, nodes):
+		# Vertices are created by a single add_vertices call, handles are
+		# the future vertex indices
+		base = graph.vcount()
+		handles = []
+		names = []
+		attrs = []
+		
+		for value, data in nodes:
+			if value is not None and value in self.nodes.keys():
+				handles.append(self.nodes[value])
+				continue
+				
+			index = base + len(names)
+			if value is not None:
+				self.nodes[value] = index
+				
+			handles.append(index)
+			names.append(value)
+			attrs.append(data)
+			
+		if names:
+			graph.add_vertices(len(names), attributes={'name': names, 'attr': attrs})
+			
+		return handles
+	
+	def add_edges_from(self, graph, edges):
+		pairs = []
+		data = []
+		
+		for n1, n2, d in edges:
+			pairs.append((n1, n2))
+			data.append(d)
+			
+		# Columnar attributes, missing values are None as with add_edge
+		keys = dict.fromkeys(k for d in data for k in d)
+		attributes = {k: [d.get(k) for d in data] for k in keys}
+		
+		base = graph.ecount()
+		if pairs:
+			graph.add_edges(pairs, attributes=attributes)
+			
+		return [*range(base, base + len(pairs))]
+	
+	def copy_graph(self, graph, share_data=False):
+		return graph.copy()
+	
+	def update_nodes(self, graph, nodes):
+		# Every definition of a vertex is given, like add_node the vertex
+		# keeps the data of the first one
+		seen = set()
+		for v, data in nodes:
+			if v not in seen:
+				seen.add(v)
+				graph.vs[v]['attr'] = data
+				
+	def update_edges(self, graph, edges):
+		for e, data in edges:
+			graph.es[e].update_attributes(data)
+		
 	
 default = IGraphBackend
 	
\ No newline at end of file
@@ -3,6 +3,7 @@
 
 from .abstract import Backend
 from GraphDSL.exceptions import GraphBackendException
+import re
 import uuid
 
 try:
@@ -11,6 +12,15 @@ except ImportError:
 	imported = False
 else:
 	imported = True
+	
+def version(text):
+	# (major, minor) of a version string, '3.4rc0' included
+	return tuple(int(part) for part in re.findall(r'\d+', text)[:2])
+	
+# The bulk paths fill the adjacency dicts of multigraphs directly. Their
+# layout is the same from networkx 2.0 to 3.x, other versions go through
+# the public API.
+internals = imported and (2, 0) <= version(nx.__version__) < (4, 0)
 
 class NetworkXBackend(Backend):
 	def __init__(self):
@@ -48,7 +58,122 @@ class NetworkXBackend(Backend):
 		node1 = self.nodes[n1]
 		node2 = self.nodes[n2]
 		
-		graph.add_edge(node1, node2, **data)
+		key = graph.add_edge(node1, node2, **data)
+		
+		return (node1, node2, key) if graph.is_multigraph() else (node1, node2)
+		
+	def add_nodes_from(self, graph, nodes):
+		identifiers = []
+		
+		# Repeated values are merged here (same result as successive add_node
+		# calls) so networkx only sees each node once
+		merged = {}
+		
+		for value, data in nodes:
+			if value is None:
+				value = len(self.nodes)
+			
+			self.nodes[value] = value
+			identifiers.append(value)
+			
+			if value not in merged:
+				merged[value] = data if data is not None else {}
+			elif data:
+				merged[value].update(data)
+			
+		graph.add_nodes_from(merged.items())
+		
+		return identifiers
+	
+	def add_edges_from(self, graph, edges):
+		if type(graph) not in (nx.MultiDiGraph, nx.MultiGraph):
+			return [self.add_edge(graph, n1, n2, data) for n1, n2, data in edges]
+			
+		if not internals:
+			edges = [*edges]
+			keys = graph.add_edges_from(edges)
+			return [(n1, n2, key) for (n1, n2, data), key in zip(edges, keys)]
+			
+		# Endpoints come from add_nodes_from, so the adjacency can be filled
+		# directly instead of going through MultiGraph.add_edge per edge
+		succ = graph._succ if graph.is_directed() else graph._adj
+		pred = graph._pred if graph.is_directed() else graph._adj
+		keydict_factory = graph.edge_key_dict_factory
+		
+		handles = []
+		
+		for n1, n2, data in edges:
+			keydict = succ[n1].get(n2)
+			if keydict is None:
+				keydict = succ[n1][n2] = pred[n2][n1] = keydict_factory()
+				
+			# Same key scheme as MultiGraph.new_edge_key
+			key = len(keydict)
+			while key in keydict:
+				key += 1
+				
+			keydict[key] = data
+			handles.append((n1, n2, key))
+			
+		# From networkx 3.3, views of the adjacency are cached on the graph
+		if hasattr(nx, '_clear_cache'):
+			nx._clear_cache(graph)
+			
+		return handles
+	
+	def copy_graph(self, graph, share_data=False):
+		if not share_data or not internals or type(graph) not in (nx.MultiDiGraph, nx.MultiGraph):
+			return graph.copy()
+		
+		# Same structure as graph.copy(), but attribute dicts are shared:
+		# update_nodes/update_edges replace them instead of mutating them
+		copy = graph.__class__()
+		copy.graph.update(graph.graph)
+		copy._node.update(graph._node)
+		
+		directed = graph.is_directed()
+		
+		for n in graph._node:
+			copy._adj[n] = {}
+			if directed:
+				copy._pred[n] = {}
+				
+		# Keydicts are shared between both ends of an edge, so is their copy
+		keydicts = {}
+		
+		for u, neighbors in graph._adj.items():
+			adjacency = copy._adj[u]
+			for v, keydict in neighbors.items():
+				kd = keydicts.get(id(keydict))
+				if kd is None:
+					kd = keydicts[id(keydict)] = {**keydict}
+					if directed:
+						copy._pred[v][u] = kd
+				adjacency[v] = kd
+				
+		return copy
+	
+	def freeze_graph(self, graph):
+		return nx.freeze(graph)
+	
+	def update_nodes(self, graph, nodes):
+		# Data dicts may be shared with copies (copy_graph), they are
+		# replaced. Without internals, copies don't share them.
+		for n, data in nodes:
+			if not data:
+				continue
+			if internals:
+				graph._node[n] = {**graph._node[n], **data}
+			else:
+				graph.nodes[n].update(data)
+				
+	def update_edges(self, graph, edges):
+		for e, data in edges:
+			if internals and graph.is_multigraph():
+				u, v, key = e
+				graph._adj[u][v][key] = {**graph._adj[u][v][key], **data}
+			else:
+				graph.edges[e].update(data)
 
 	
 default = NetworkXBackend
@@ -0,0 +1,305 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+'''
+	Sink backends, writing the graph to a file or a text stream as it is
+	built instead of keeping it in memory. Only the node table (and, for
+	GraphML, the node data) is held until the end of the build.
+
+	Sinks take their output, so they are passed as instances:
+	g(backend=EdgeListBackend('out.txt')). The build returns the output,
+	path or stream. Streams are flushed, not closed. If the build raises,
+	a partial output file is removed.
+'''
+
+import os
+import csv
+import shutil
+import tempfile
+from itertools import islice
+from xml.sax.saxutils import escape, quoteattr
+
+from .abstract import Backend
+
+# Edges formatted per write
+CHUNK = 4096
+
+class SinkGraph:
+	'''
+		Graph of a sink backend: the open output and the node table
+	'''
+
+	def __init__(self, out, directed):
+		self.out = out
+		self.directed = directed
+
+		if isinstance(out, (str, os.PathLike)):
+			self.file = open(out, 'w', encoding='utf-8', newline='')
+		else:
+			self.file = out
+
+		self.nodes = {}
+		self.edge_count = 0
+
+	def close(self):
+		if self.file is self.out:
+			self.file.flush()
+		else:
+			self.file.close()
+
+	def abort(self):
+		# A partial output file is removed, streams are left as they are
+		if self.file is not self.out:
+			self.file.close()
+			try:
+				os.unlink(self.out)
+			except OSError:
+				pass
+
+
+class SinkBackend(Backend):
+	# Written graphs can't be patched by rebuild
+	updatable = False
+
+	# Resolved nodes are not held as a whole either
+	chunk_size = CHUNK
+
+	def __init__(self, out):
+		self.__name__ = 'sink'
+		self.out = out
+
+	def create_graph(self, directed):
+		graph = SinkGraph(self.out, directed)
+		try:
+			self.begin(graph)
+		except BaseException:
+			self.abort_graph(graph)
+			raise
+		return graph
+
+	def create_directed_graph(self):
+		return self.create_graph(True)
+
+	def create_undirected_graph(self):
+		return self.create_graph(False)
+
+	def finish_graph(self, graph):
+		self.end(graph)
+		graph.close()
+		return graph.out
+
+	def abort_graph(self, graph):
+		graph.abort()
+
+
+	def begin(self, graph):
+		pass
+
+	def end(self, graph):
+		pass
+
+	def write_nodes(self, graph, nodes):
+		pass
+
+	def write_edges(self, graph, edges):
+		pass
+
+
+	def add_nodes_from(self, graph, nodes):
+		# Same identifiers as the networkx backend
+		table = graph.nodes
+		written = []
+
+		for value, data in nodes:
+			if value is None:
+				value = len(table)
+			table.setdefault(value, None)
+			written.append((value, data))
+
+		self.write_nodes(graph, written)
+
+		return [n for n, d in written]
+
+	def add_edges_from(self, graph, edges):
+		# Written by chunks, the edge iterable is never held as a whole
+		start = graph.edge_count
+		edges = iter(edges)
+
+		chunk = [*islice(edges, CHUNK)]
+		while chunk:
+			self.write_edges(graph, chunk)
+			graph.edge_count += len(chunk)
+			chunk = [*islice(edges, CHUNK)]
+
+		return range(start, graph.edge_count)
+
+	def add_node(self, graph, value, data):
+		return self.add_nodes_from(graph, [(value, data)])[0]
+
+	def add_edge(self, graph, n1, n2, data):
+		return self.add_edges_from(graph, [(n1, n2, data)])[0]
+
+
+class EdgeListBackend(SinkBackend):
+	'''
+		networkx edge list format: `u v {data}` per edge, `u v` with
+		data=False, or the values of the given keys with a list of keys
+	'''
+
+	def __init__(self, out, delimiter=' ', data=True):
+		super().__init__(out)
+		self.__name__ = 'edgelist'
+		self.delimiter = delimiter
+		self.data = data
+
+	def write_edges(self, graph, edges):
+		sep = self.delimiter
+
+		if self.data is True:
+			lines = [f'{u}{sep}{v}{sep}{d!r}\n' for u, v, d in edges]
+		elif self.data is False:
+			lines = [f'{u}{sep}{v}\n' for u, v, d in edges]
+		else:
+			lines = [
+				sep.join(map(str, (u, v, *(d[k] for k in self.data if k in d)))) + '\n'
+				for u, v, d in edges
+			]
+
+		graph.file.write(''.join(lines))
+
+
+class CSVBackend(SinkBackend):
+	'''
+		CSV edge list with a source,target,*columns header, missing
+		attributes left empty
+	'''
+
+	def __init__(self, out, columns=(), **fmtparams):
+		super().__init__(out)
+		self.__name__ = 'csv'
+		self.columns = [*columns]
+		self.fmtparams = fmtparams
+
+	def begin(self, graph):
+		graph.writer = csv.writer(graph.file, **self.fmtparams)
+		graph.writer.writerow(['source', 'target', *self.columns])
+
+	def write_edges(self, graph, edges):
+		columns = self.columns
+		graph.writer.writerows([u, v, *(d.get(k, '') for k in columns)] for u, v, d in edges)
+
+
+class DOTBackend(SinkBackend):
+	'''
+		Graphviz DOT. Every node definition is written as a node statement,
+		DOT merges the attributes of repeated ones.
+	'''
+
+	def __init__(self, out, name=''):
+		super().__init__(out)
+		self.__name__ = 'dot'
+		self.name = name
+
+	@staticmethod
+	def id(value):
+		return '"' + str(value).replace('\\', '\\\\').replace('"', '\\"') + '"'
+
+	@staticmethod
+	def attributes(data):
+		if not data:
+			return ''
+		return ' [' + ', '.join(f'{DOTBackend.id(k)}={DOTBackend.id(v)}' for k, v in data.items()) + ']'
+
+	def begin(self, graph):
+		kind = 'digraph' if graph.directed else 'graph'
+		graph.file.write(f'{kind} {self.id(self.name) + " " if self.name else ""}{{\n')
+
+	def end(self, graph):
+		graph.file.write('}\n')
+
+	def write_nodes(self, graph, nodes):
+		graph.file.write(''.join(f'{self.id(n)}{self.attributes(d)};\n' for n, d in nodes))
+
+	def write_edges(self, graph, edges):
+		op = '->' if graph.directed else '--'
+		graph.file.write(''.join(f'{self.id(u)} {op} {self.id(v)}{self.attributes(d)};\n' for u, v, d in edges))
+
+
+class GraphMLBackend(SinkBackend):
+	'''
+		GraphML. Attribute keys have to be declared before the graph, so
+		edges are written to a spooled temporary file (on disk past
+		spool_size bytes) and copied after the header at the end. Node
+		data is kept in the node table until then.
+	'''
+
+	TYPES = {bool: 'boolean', int: 'long', float: 'double', str: 'string'}
+
+	def __init__(self, out, spool_size=2**20):
+		super().__init__(out)
+		self.__name__ = 'graphml'
+		self.spool_size = spool_size
+
+	def begin(self, graph):
+		graph.edges = tempfile.SpooledTemporaryFile(self.spool_size, mode='w+', encoding='utf-8')
+		graph.keys = {'node': {}, 'edge': {}}	# name -> [id, type]
+
+	def abort_graph(self, graph):
+		if hasattr(graph, 'edges'):
+			graph.edges.close()
+		super().abort_graph(graph)
+
+	def key(self, graph, domain, name, value):
+		keys = graph.keys[domain]
+		t = self.TYPES.get(type(value), 'string')
+
+		key = keys.get(name)
+		if key is None:
+			key = keys[name] = [f'{domain[0]}{len(keys)}', t]
+		elif key[1] != t:
+			key[1] = 'string'
+
+		return key[0]
+
+	def data(self, graph, domain, data):
+		return ''.join(
+			f'<data key="{self.key(graph, domain, k, v)}">{escape(str(v).lower() if type(v) is bool else str(v))}</data>'
+			for k, v in data.items()
+		)
+
+	def write_nodes(self, graph, nodes):
+		table = graph.nodes
+		for n, d in nodes:
+			if not d:
+				continue
+			if table[n] is None:
+				table[n] = d
+			else:
+				table[n].update(d)
+
+	def write_edges(self, graph, edges):
+		graph.edges.write(''.join(
+			f'<edge source={quoteattr(str(u))} target={quoteattr(str(v))}>{self.data(graph, "edge", d)}</edge>\n'
+			for u, v, d in edges
+		))
+
+	def end(self, graph):
+		out = graph.file
+
+		# Node keys are only known once every node is formatted
+		nodes = tempfile.SpooledTemporaryFile(self.spool_size, mode='w+', encoding='utf-8')
+		for n, d in graph.nodes.items():
+			nodes.write(f'<node id={quoteattr(str(n))}>{self.data(graph, "node", d) if d else ""}</node>\n')
+
+		out.write('<?xml version="1.0" encoding="utf-8"?>\n')
+		out.write('<graphml xmlns="http://graphml.graphdrawing.org/xmlns">\n')
+		for domain, keys in graph.keys.items():
+			for name, (key, t) in keys.items():
+				out.write(f'<key id="{key}" for="{domain}" attr.name={quoteattr(str(name))} attr.type="{t}"/>\n')
+		out.write(f'<graph edgedefault="{"directed" if graph.directed else "undirected"}">\n')
+		for spool in (nodes, graph.edges):
+			spool.seek(0)
+			shutil.copyfileobj(spool, out)
+			spool.close()
+
+		out.write('</graph>\n</graphml>\n')
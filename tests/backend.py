@@ -0,0 +1,425 @@
+#!/usr/bin/env python3
+
+import io
+import os
+import asyncio
+import csv
+import pickle
+import tempfile
+import tracemalloc
+import unittest
+import unittest.mock
+import context
+
+from GraphDSL.Factory import Graph
+from GraphDSL.Exceptions import GraphBackendException, GraphNotDefinedException
+from GraphDSL.backend.abstract import Backend
+from GraphDSL.backend import networkx as nxbackend
+from GraphDSL.backend import igraph as igbackend
+from GraphDSL.backend import array as arraybackend
+from GraphDSL.backend.sink import SinkGraph, EdgeListBackend, CSVBackend, DOTBackend, GraphMLBackend
+
+@Graph(directed=True, default_node_params={'size': 1})
+def g(clr):
+	a = (1, {color: clr}) -{length: 1}> (2) <{length: 2}> (3)
+	a -{}> (2) -{}> (1, {size: 3})
+	(4) <{}- (3)
+	
+@Graph(directed=True)
+def repeated(v, c):
+	(3, {a: 1}) -{}> (v, {b: 2})
+	(3, {b: 3}) -{}> (v, {a: c})
+	
+@Graph(directed=True)
+def chain(n):
+	for i in range(n):
+		(i) -{w: i}> (i + 1)
+		
+@Graph(directed=True)
+def literals():
+	(1, {a: 1}) -{}> (2)
+	(1, {a: 2, b: 1}) -{}> (1)
+	
+@Graph(directed=False)
+def u():
+	(1) -{w: 1}- (2) -{w: 2}- (1)
+	(2) -{}- (2)
+	
+
+class TestNetworkXBackend(unittest.TestCase):
+	
+	class PerElement(nxbackend.NetworkXBackend):
+		add_nodes_from = Backend.add_nodes_from
+		add_edges_from = Backend.add_edges_from
+		
+	def assertSameGraph(self, p, q):
+		self.assertEqual(list(p.nodes(data=True)), list(q.nodes(data=True)))
+		if p.is_multigraph():
+			self.assertEqual(list(p.edges(keys=True, data=True)), list(q.edges(keys=True, data=True)))
+		else:
+			self.assertEqual(list(p.edges(data=True)), list(q.edges(data=True)))
+		
+	@unittest.skipUnless(nxbackend.imported, 'networkx not installed')
+	def test_bulk_directed(self):
+		self.assertSameGraph(
+			g(parameters={'clr': 'red'}),
+			g(parameters={'clr': 'red'}, backend=self.PerElement)
+		)
+		
+	@unittest.skipUnless(nxbackend.imported, 'networkx not installed')
+	def test_bulk_undirected(self):
+		self.assertSameGraph(u(), u(backend=self.PerElement))
+		
+	@unittest.skipUnless(nxbackend.imported, 'networkx not installed')
+	def test_public_api(self):
+		self.assertEqual(nxbackend.version('3.4rc0'), (3, 4))
+		
+		# As with a networkx version whose internals are not known
+		expected = g(parameters={'clr': 'red'})
+		with unittest.mock.patch.object(nxbackend, 'internals', False):
+			self.assertSameGraph(g(parameters={'clr': 'red'}), expected)
+			self.assertSameGraph(u(), u(backend=self.PerElement))
+			
+			p, q = g.instantiate_many([{'clr': 'blue'}, {'clr': 'red'}], copy=True)
+			self.assertSameGraph(q, expected)
+			self.assertEqual(p.nodes[1]['color'], 'blue')
+			
+	@unittest.skipUnless(nxbackend.imported, 'networkx not installed')
+	def test_bulk_graph_init(self):
+		import networkx as nx
+		
+		self.assertSameGraph(
+			u(graph_init=(nx.path_graph, 3)),
+			u(graph_init=(nx.path_graph, 3), backend=self.PerElement)
+		)
+		
+		
+class TestIGraphBackend(unittest.TestCase):
+	
+	class PerElement(igbackend.IGraphBackend):
+		add_nodes_from = Backend.add_nodes_from
+		add_edges_from = Backend.add_edges_from
+		
+	def assertSameGraph(self, p, q):
+		self.assertEqual(p.vcount(), q.vcount())
+		self.assertEqual(p.get_edgelist(), q.get_edgelist())
+		self.assertEqual(p.vs['name'], q.vs['name'])
+		self.assertEqual(p.vs['attr'], q.vs['attr'])
+		for key in set(p.es.attributes()) | set(q.es.attributes()):
+			self.assertEqual(p.es[key], q.es[key])
+		
+	@unittest.skipUnless(igbackend.imported, 'igraph not installed')
+	def test_bulk_directed(self):
+		self.assertSameGraph(
+			g(parameters={'clr': 'red'}, backend=igbackend),
+			g(parameters={'clr': 'red'}, backend=self.PerElement)
+		)
+		
+	@unittest.skipUnless(igbackend.imported, 'igraph not installed')
+	def test_bulk_undirected(self):
+		self.assertSameGraph(u(backend=igbackend), u(backend=self.PerElement))
+		
+	@unittest.skipUnless(igbackend.imported, 'igraph not installed')
+	def test_single_calls(self):
+		import igraph as ig
+		
+		# One add_vertices and one add_edges call whatever the size
+		for n in (10, 10000):
+			with unittest.mock.patch.object(ig.Graph, 'add_vertices', autospec=True, side_effect=ig.Graph.add_vertices) as add_vertices:
+				with unittest.mock.patch.object(ig.Graph, 'add_edges', autospec=True, side_effect=ig.Graph.add_edges) as add_edges:
+					p = chain(parameters={'n': n}, backend=igbackend)
+					
+			self.assertEqual(add_vertices.call_count, 1)
+			self.assertEqual(add_edges.call_count, 1)
+			self.assertEqual((p.vcount(), p.ecount()), (n + 1, n))
+			self.assertEqual(p.es['w'][-1], n - 1)
+			
+	@unittest.skipUnless(igbackend.imported, 'igraph not installed')
+	def test_first_definition(self):
+		# A vertex keeps the data of its first definition, a parameter value
+		# equal to a literal included, while networkx merges them
+		parameters = {'v': 3, 'c': 4}
+		expected = [{'a': 1}]
+		
+		self.assertEqual(repeated(parameters=parameters, backend=igbackend).vs['attr'], expected)
+		self.assertEqual(repeated(parameters=parameters, backend=self.PerElement).vs['attr'], expected)
+		self.assertEqual(literals(backend=igbackend).vs['attr'], [{'a': 1}, {}])
+		self.assertEqual(literals(backend=self.PerElement).vs['attr'], [{'a': 1}, {}])
+		
+		p = repeated(parameters={'v': 3, 'c': 0}, backend=igbackend, rebuildable=True)
+		self.assertIs(repeated.rebuild(p, parameters), p)
+		self.assertEqual(p.vs['attr'], expected)
+		
+		if nxbackend.imported:
+			self.assertEqual(list(repeated(parameters=parameters).nodes(data=True)), [(3, {'a': 4, 'b': 3})])
+			self.assertEqual(list(literals().nodes(data=True)), [(1, {'a': 2, 'b': 1}), (2, {})])
+			
+		
+class TestArrayBackend(unittest.TestCase):
+	
+	class PerElement(arraybackend.ArrayBackend):
+		add_nodes_from = Backend.add_nodes_from
+		add_edges_from = Backend.add_edges_from
+		
+	def assertSameGraph(self, p, q):
+		self.assertEqual(p.ids, q.ids)
+		self.assertEqual(p.edges(), q.edges())
+		# Missing floats are nan, compared through repr
+		self.assertEqual(
+			repr([p.node_data(n) for n in range(p.number_of_nodes())]),
+			repr([q.node_data(n) for n in range(q.number_of_nodes())])
+		)
+		self.assertEqual(
+			repr([p.edge_data(e) for e in range(p.number_of_edges())]),
+			repr([q.edge_data(e) for e in range(q.number_of_edges())])
+		)
+		
+	def test_bulk(self):
+		self.assertSameGraph(
+			g(parameters={'clr': 'red'}, backend=arraybackend),
+			g(parameters={'clr': 'red'}, backend=self.PerElement)
+		)
+		self.assertSameGraph(u(backend=arraybackend), u(backend=self.PerElement))
+		
+	def test_nodes(self):
+		p = g(parameters={'clr': 'red'}, backend=arraybackend)
+		
+		self.assertEqual(p.ids, [1, 2, 3, 4])
+		self.assertEqual(p.node_data(0), {'size': 3, 'color': 'red'})
+		self.assertEqual(p.node_data(3), {'size': 1, 'color': None})
+		self.assertEqual(p.node_columns['size'].values.typecode, 'q')
+		
+	def test_columns(self):
+		p = u(backend=arraybackend)
+		
+		self.assertEqual(p.edges(), [(2, 1), (1, 2), (2, 2)])
+		self.assertEqual(p.edge_columns['w'].values.typecode, 'd')
+		self.assertEqual(p.edge_data(0), {'w': 2})
+		
+		p.update_edge(2, {'w': 'x'})
+		self.assertEqual(p.edge_columns['w'].values, [2, 1, 'x'])
+		
+	@unittest.skipUnless(arraybackend.imported, 'numpy not installed')
+	def test_csr(self):
+		import numpy as np
+		
+		p = g(parameters={'clr': 'red'}, backend=arraybackend)
+		csr = p.to_csr()
+		
+		self.assertEqual(csr.indptr.tolist(), [0, 2, 4, 6, 6])
+		self.assertEqual(csr.indices.tolist(), [1, 1, 2, 0, 1, 3])
+		# Columns are views on the graph arrays
+		column = p.node_column('size')
+		self.assertEqual(column.tolist(), [3, 1, 1, 1])
+		self.assertTrue(np.shares_memory(column, p.node_columns['size'].values))
+		p.node_columns['size'].values[1] = 2
+		self.assertEqual(column.tolist(), [3, 2, 1, 1])
+		
+	@unittest.skipUnless(arraybackend.imported and nxbackend.imported, 'numpy or networkx not installed')
+	def test_scipy(self):
+		import networkx as nx
+		
+		try:
+			import numpy as np
+			import scipy.sparse
+		except ImportError:
+			self.skipTest('scipy not installed')
+			
+		for graph, params in ((g, {'clr': 'red'}), (u, {})):
+			p = graph(parameters=params, backend=arraybackend)
+			q = graph(parameters=params)
+			
+			for weight in (None, 'length', 'w'):
+				m = p.to_scipy(weight)
+				self.assertTrue(np.array_equal(
+					m.toarray(),
+					nx.to_scipy_sparse_array(q, weight=weight).toarray()
+				))
+				
+			csr = p.to_csr()
+			m = scipy.sparse.csr_array((csr.data, csr.indices, csr.indptr), shape=csr.shape, copy=False)
+			self.assertTrue(np.shares_memory(m.indices, csr.indices))
+			
+	def test_overlay(self):
+		p, q = g.instantiate_many([{'clr': 'red'}, {'clr': 'blue'}], backend=arraybackend, copy=True)
+		
+		self.assertEqual(p.node_data(0)['color'], 'red')
+		self.assertEqual(q.node_data(0)['color'], 'blue')
+		self.assertEqual(p.edges(), q.edges())
+		
+		
+class TestSinkBackends(unittest.TestCase):
+	
+	parameters = {'clr': 'red'}
+	
+	def setUp(self):
+		self.directory = tempfile.TemporaryDirectory()
+		
+	def tearDown(self):
+		self.directory.cleanup()
+		
+	@unittest.skipUnless(nxbackend.imported, 'networkx not installed')
+	def test_edgelist(self):
+		out = io.StringIO()
+		self.assertIs(g(self.parameters, backend=EdgeListBackend(out)), out)
+		
+		expected = g(self.parameters)
+		self.assertEqual(sorted(out.getvalue().splitlines()), sorted(f'{u} {v} {d!r}' for u, v, d in expected.edges(data=True)))
+		self.assertFalse(out.closed)
+		
+		out = io.StringIO()
+		g(self.parameters, backend=EdgeListBackend(out, delimiter=',', data=['length']))
+		self.assertEqual(out.getvalue().splitlines()[:2], ['2,3,2', '3,2,2'])
+		
+	def test_csv(self):
+		path = os.path.join(self.directory.name, 'g.csv')
+		self.assertEqual(g(self.parameters, backend=CSVBackend(path, columns=['length'])), path)
+		
+		with open(path, newline='') as f:
+			rows = [*csv.reader(f)]
+			
+		self.assertEqual(rows[0], ['source', 'target', 'length'])
+		self.assertEqual(len(rows), 7)
+		self.assertIn(['1', '2', '1'], rows)
+		self.assertIn(['3', '4', ''], rows)
+		
+	def test_dot(self):
+		out = io.StringIO()
+		g(self.parameters, backend=DOTBackend(out))
+		lines = out.getvalue().splitlines()
+		
+		self.assertEqual(lines[0], 'digraph {')
+		self.assertEqual(lines[-1], '}')
+		# Definitions of a node are written in order, DOT merges them
+		self.assertEqual([line for line in lines if line.startswith('"1" [')], ['"1" ["size"="1", "color"="red"];', '"1" ["size"="3"];'])
+		self.assertIn('"3" -> "2" ["length"="2"];', lines)
+		
+		out = io.StringIO()
+		u(backend=DOTBackend(out, name='u "1"'))
+		lines = out.getvalue().splitlines()
+		
+		self.assertEqual(lines[0], 'graph "u \\"1\\"" {')
+		self.assertIn('"2" -- "2";', lines)
+		
+	@unittest.skipUnless(nxbackend.imported, 'networkx not installed')
+	def test_graphml(self):
+		import networkx as nx
+		
+		expected = g(self.parameters)
+		
+		for spool_size in (10, 2**20):
+			path = os.path.join(self.directory.name, f'g{spool_size}.graphml')
+			g(self.parameters, backend=GraphMLBackend(path, spool_size=spool_size))
+			
+			h = nx.read_graphml(path, node_type=int)
+			self.assertEqual(dict(h.nodes(data=True)), dict(expected.nodes(data=True)))
+			self.assertEqual(sorted(map(repr, h.edges(data=True))), sorted(map(repr, expected.edges(data=True))))
+			
+	def test_failed_build(self):
+		# The output file is closed and removed, a stream is left open
+		abort = SinkGraph.abort
+		path = os.path.join(self.directory.name, 'g.out')
+		
+		for backend in (EdgeListBackend, CSVBackend, DOTBackend, GraphMLBackend):
+			for build in (g, lambda parameters, backend: asyncio.run(g.abuild(parameters, backend=backend))):
+				with unittest.mock.patch.object(SinkGraph, 'abort', autospec=True, side_effect=abort) as aborted:
+					with unittest.mock.patch.object(backend, 'write_edges', side_effect=OSError('No space left')):
+						with self.assertRaises(OSError):
+							build(self.parameters, backend=backend(path))
+							
+				graph, = aborted.call_args.args
+				self.assertTrue(graph.file.closed)
+				self.assertFalse(os.path.exists(path))
+				
+		out = io.StringIO()
+		with self.assertRaises(GraphNotDefinedException):
+			g({}, backend=DOTBackend(out))
+		self.assertFalse(out.closed)
+		
+	def test_rebuild(self):
+		# Nothing to patch, the output is written again
+		out = io.StringIO()
+		backend = DOTBackend(out)
+		g(self.parameters, backend=backend)
+		
+		size = len(out.getvalue())
+		self.assertIs(g.rebuild(out, {'clr': 'blue'}, backend=backend), out)
+		self.assertIn('"1" ["size"="1", "color"="blue"];', out.getvalue()[size:].splitlines())
+		
+	def test_memory(self):
+		# Written edges are not held, the peak doesn't grow with their count
+		from GraphDSL.Compiler import GraphCompiler
+		from GraphDSL.Plan import GraphPlanner
+		from GraphDSL.Builder import GraphBuilder
+		
+		peaks = []
+		for n in (10000, 40000):
+			source = f'@Graph(directed=True)\ndef g():\n\tfor i in range({n}):\n\t\t(0) -{{}}> (1)\n'
+			ast = GraphCompiler(
+				io.BytesIO(source.encode('utf-8')).readline,
+				graph_directed=True, default_node_params={}, default_edge_params={}
+			).compile_to_ast()
+			plan = GraphPlanner(ast, graph_directed=True).lower()
+			
+			tracemalloc.start()
+			GraphBuilder(plan, CSVBackend(os.devnull), graph_directed=True).build()
+			peaks.append(tracemalloc.get_traced_memory()[1])
+			tracemalloc.stop()
+			
+		self.assertLess(peaks[1], 1.5 * peaks[0])
+		
+	def test_loader(self):
+		import GraphDSL
+		
+		out = GraphDSL.load(io.StringIO('(1) -{w: 1}> (2)\n(2) <{}> (3)\n'), backend=CSVBackend(io.StringIO(), columns=['w']))
+		self.assertEqual(out.getvalue().splitlines(), ['source,target,w', '1,2,1', '2,3,', '3,2,'])
+		
+		
+class TestSharedArrayGraph(unittest.TestCase):
+	
+	def assertSameGraph(self, p, q):
+		TestArrayBackend.assertSameGraph(self, p, q)
+		
+	def test_shared_memory(self):
+		p = g(parameters={'clr': 'red'}, backend=arraybackend)
+		s = g(parameters={'clr': 'red'}, backend=arraybackend, shared=True)
+		
+		try:
+			self.assertSameGraph(p, s)
+			
+			# Only the block name is pickled
+			with pickle.loads(pickle.dumps(s)) as t:
+				self.assertEqual(t.name, s.name)
+				self.assertSameGraph(p, t)
+				
+			with self.assertRaises(TypeError):
+				s.update_edge(0, {'length': 3})
+		finally:
+			s.close()
+			s.unlink()
+			
+	def test_file(self):
+		with tempfile.TemporaryDirectory() as directory:
+			path = os.path.join(directory, 'graph')
+			p = u(backend=arraybackend)
+			s = u(backend=arraybackend, shared=path)
+			
+			with pickle.loads(pickle.dumps(s)) as t:
+				self.assertSameGraph(p, t)
+				
+			# Copies are regular, writable graphs
+			c = arraybackend.ArrayBackend().copy_graph(s)
+			c.update_edge(0, {'w': 3})
+			self.assertEqual(c.edge_data(0), {'w': 3})
+			self.assertEqual(s.edge_data(0), {'w': 2})
+			
+			s.close()
+			
+	@unittest.skipUnless(nxbackend.imported, 'networkx not installed')
+	def test_backend(self):
+		with self.assertRaises(GraphBackendException):
+			u(shared=True)
+			
+			
+if __name__ == '__main__':
+	unittest.main()
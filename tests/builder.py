@@ -6,6 +6,10 @@ import context
 
 from GraphDSL.Factory import Graph
 from GraphDSL.backend.abstract import Backend
+from GraphDSL.Exceptions import GraphException, GraphNotDefinedException
+from GraphDSL.GraphAst import *
+from GraphDSL.Plan import GraphPlanner
+from GraphDSL.backend import networkx as nxbackend
 
 backend = Backend
 
@@ -177,6 +181,54 @@ class TestBuildingMethods(unittest.TestCase):
 		backend.add_node.assert_called_once_with(self.G, 126, {'color':'red'})
 		
 		
+	def test_missing_param(self):
+		@Graph(directed=True)
+		def g(data):
+			(data)
+			
+		self.assertRaises(GraphNotDefinedException, g, backend=backend)
+		
+		
+	# Tests build plan
+	
+	def test_plan_reused(self):
+		@Graph(directed=True)
+		def g(clr):
+			(42, {color: clr}) -{}> (72)
+			
+		g(backend=backend, parameters={'clr': 'red'})
+		plan = g.plan
+		
+		backend.add_node = unittest.mock.MagicMock(side_effect=[self.N1, self.N2])
+		g(backend=backend, parameters={'clr': 'blue'})
+		
+		self.assertIs(g.plan, plan)
+		backend.add_node.assert_has_calls([
+			unittest.mock.call(self.G, 42, {'color': 'blue'}),
+			unittest.mock.call(self.G, 72, {}),
+		],any_order=False)
+		
+	def test_undefined_node(self):
+		@Graph(directed=True)
+		def g():
+			(42) -{}> a
+			
+		self.assertRaises(GraphNotDefinedException, g, backend=backend)
+		
+		
+	def test_long_chain(self):
+		ast = GraphDef(nodes=[GraphAstChain(
+			nodes=[GraphAstNodedef(value=GraphAstLitteralValue(value=i), data={}) for i in range(5001)],
+			edges=[GraphAstEdgeSpec(data={}, left_char='-', right_char='>') for i in range(5000)]
+		)])
+		
+		plan = GraphPlanner(ast, graph_directed=True).lower()
+		
+		self.assertEqual(len(plan.node_values), 5001)
+		self.assertEqual(plan.edges[0], (4999, 5000)) # Last edges first
+		self.assertEqual(plan.edges[-1], (0, 1))
+		
+		
 	# Test custom graph init
 	
 	def test_graph_custom_init_function(self):
@@ -226,10 +278,337 @@ class TestBuildingMethods(unittest.TestCase):
 		# Test mocked G in edges creation
 		backend.add_edge.assert_called_once_with(mocked_G, self.N1, self.N2, {})
 
+
+class TestParallelLowering(unittest.TestCase):
+	
+	def assertSamePlan(self, p, q):
+		for field in ('node_values', 'node_data', 'value_holes', 'node_data_holes', 'edges', 'edge_data', 'edge_data_holes', 'inputs', 'dependents'):
+			self.assertEqual(getattr(p, field), getattr(q, field), field)
+		self.assertEqual([*p.outputs.items()], [*q.outputs.items()])
+		
+	def test_same_plan(self):
+		@Graph(directed=True, lazy=True)
+		def g(clr, n):
+			b = (2)
+			a = (1, {color: clr}) -{w: 1}> b
+			(n) -{w: n}> a
+			c = b
+			b = (3) <{}> (4, {size: 2}) -{}> a
+			(5) -{}> (6) -{}> (7)
+			c -{w: 2}> b <{}- a
+			(8, {size: n})
+			
+		plan = GraphPlanner(g.ast, graph_directed=True).lower()
+		
+		for workers in (1, 2, 3):
+			self.assertSamePlan(GraphPlanner.lower_parallel(g.ast, workers, graph_directed=True), plan)
+			
+	def test_undefined_node(self):
+		@Graph(directed=True, lazy=True)
+		def g():
+			(1) -{}> a
+			(2) -{}> b
+			a = (3)
+			
+		with self.assertRaisesRegex(GraphNotDefinedException, '"a"'):
+			GraphPlanner.lower_parallel(g.ast, 2, graph_directed=True)
+			
+	@unittest.skipUnless(nxbackend.imported, 'networkx not installed')
+	def test_factory(self):
+		@Graph(directed=False, workers=2)
+		def g():
+			a = (1) -{w: 1}- (2)
+			(3) -{w: 2}- a
+			(2) -{}- (3) -{}- (4)
+			
+		@Graph(directed=False)
+		def h():
+			a = (1) -{w: 1}- (2)
+			(3) -{w: 2}- a
+			(2) -{}- (3) -{}- (4)
+			
+		p, q = g(), h()
+		self.assertEqual(list(p.nodes(data=True)), list(q.nodes(data=True)))
+		self.assertEqual(list(p.edges(keys=True, data=True)), list(q.edges(keys=True, data=True)))
+		
+	
+		
+		
+class TestNodeFolding(unittest.TestCase):
+	
+	def test_fold(self):
+		# Definitions without data, or with the data of the previous one of
+		# the value, change nothing whether a backend merges or keeps the first
+		@Graph(directed=True)
+		def g(c):
+			a = (1, {color: 'red'}) -{}> (2)
+			(2) -{}> (1)
+			(2, {size: 2}) -{}> (1, {color: 'red'})
+			b = (1, {color: c})
+			b -{}> (1, {color: 'red'})
+			
+		plan = g.lower()
+		
+		self.assertEqual(plan.node_values, [1, 2, 2, 1, 1])
+		self.assertEqual(plan.node_data_holes, [(3, 'color', 'c')])
+		self.assertEqual(plan.edges, [(0, 1), (1, 0), (2, 0), (3, 4)])
+		self.assertEqual(plan.outputs, {'a': 0, 'b': 3})
+		
+		self.assertEqual([d for v, d in plan.resolve_nodes({'c': 'blue'})], [
+			{'color': 'red'}, {}, {'size': 2}, {'color': 'blue'}, {'color': 'red'}
+		])
+		
+	def test_defaults_not_folded(self):
+		# A definition with default data overrides the previous one
+		@Graph(directed=True, default_node_params={'size': 1})
+		def g():
+			(1) -{}> (1, {size: 2}) -{}> (1)
+			
+		self.assertEqual(g.lower().node_values, [1, 1, 1])
+		
+		if nxbackend.imported:
+			self.assertEqual(dict(g().nodes(data=True)), {1: {'size': 1}})
+			
+	def test_not_folded(self):
+		@Graph(directed=True)
+		def g(v):
+			(v, {a: 1}) -{}> (1)
+			(v, {b: 2}) -{}> ()
+			() -{}> (1)
+			
+		plan = g.lower()
+		self.assertEqual(plan.node_values, [None, 1, None, None, None])
+		self.assertEqual(plan.value_holes, [(0, 'v'), (2, 'v')])
+		self.assertEqual(plan.edges, [(0, 1), (2, 3), (4, 1)])
+		
+	def test_parameter_between(self):
+		@Graph(directed=True)
+		def g(v):
+			(3, {c: 1})
+			(v, {c: 2})
+			(3) -{}> (4, {c: 1})
+			(3, {c: 1})
+			(4, {c: 2})
+		
+		plan = g.lower()
+		self.assertEqual(plan.node_values, [3, None, 4, 3, 4])
+		self.assertEqual(plan.edges, [(0, 2)])
+		self.assertEqual(plan.resolve_nodes({'v': 3}), [
+			(3, {'c': 1}), (3, {'c': 2}), (4, {'c': 1}), (3, {'c': 1}), (4, {'c': 2})
+		])
+		
+		if nxbackend.imported:
+			self.assertEqual(dict(g(parameters={'v': 3}).nodes(data=True)), {3: {'c': 1}, 4: {'c': 2}})
+		
+	def test_parallel(self):
+		@Graph(directed=True, lazy=True)
+		def g(c):
+			a = (1, {w: 1}) -{}> (2)
+			(2, {w: c}) -{}> (3)
+			(3) -{}> a
+			(1, {w: 1}) -{}> (3, {w: c})
+			b = (2, {w: 2})
+			(4) -{}> b
+			
+		plan = GraphPlanner(g.ast, graph_directed=True).lower()
+		self.assertEqual(len(plan.node_values), 7)
+		
+		for workers in (2, 3):
+			TestParallelLowering.assertSamePlan(self, GraphPlanner.lower_parallel(g.ast, workers, graph_directed=True), plan)
+			
+	@unittest.skipUnless(nxbackend.imported, 'networkx not installed')
+	def test_rebuild(self):
+		@Graph(directed=True, rebuildable=True)
+		def g(c, d):
+			(1, {color: c}) -{}> (2)
+			(2) -{}> (1, {size: d})
+			
+		p = g(parameters={'c': 'red', 'd': 1})
+		self.assertIs(g.rebuild(p, {'c': 'blue', 'd': 2}), p)
+		self.assertEqual(dict(p.nodes(data=True)), {1: {'color': 'blue', 'size': 2}, 2: {}})
+		
+		
+class TestGroups(unittest.TestCase):
 	
+	def test_unrolled(self):
+		@Graph(directed=True)
+		def g(c):
+			hub = ('hub')
+			hub -{w: c}> [(1), (2, {size: 2})]
+			[(3), hub] <{}> [(4), (5)]
+			(6) <{}- [(7), (8)] -{}> (9)
+			
+		@Graph(directed=True)
+		def h(c):
+			hub = ('hub')
+			hub -{w: c}> (1)
+			hub -{w: c}> (2, {size: 2})
+			(3) <{}> (4)
+			(3) <{}> (5)
+			hub <{}> (4)
+			hub <{}> (5)
+			(7) -{}> (9)
+			(8) -{}> (9)
+			(6) <{}- (7)
+			(6) <{}- (8)
+			
+		self.assertEqual(list(g.iter_edges({'c': 1})), list(h.iter_edges({'c': 1})))
+		self.assertEqual({str(n) for n in g.iter_nodes({'c': 1})}, {str(n) for n in h.iter_nodes({'c': 1})})
+		self.assertEqual(g.lower().dependents['c'], ([], [0, 1]))
+		
+	def test_loop(self):
+		@Graph(directed=True)
+		def g(n):
+			for i in range(n):
+				(i) -{}> [(i + 1), (i + 2)]
+				
+		self.assertEqual([(u, v) for u, v, d in g.iter_edges({'n': 2})], [(0, 1), (0, 2), (1, 2), (1, 3)])
+		
+	def test_assignation(self):
+		@Graph(directed=True, lazy=True)
+		def g():
+			a = [(1), (2)] -{}> (3)
+			
+		with self.assertRaisesRegex(GraphException, 'group'):
+			g.lower()
+			
+	@unittest.skipUnless(nxbackend.imported, 'networkx not installed')
+	def test_networkx(self):
+		@Graph(directed=False)
+		def g():
+			(0) -{w: 1}- [(1), (2), (3)]
+			
+		self.assertEqual(sorted(g().edges(data=True)), [(0, 1, {'w': 1}), (0, 2, {'w': 1}), (0, 3, {'w': 1})])
 		
 		
+class TestLoops(unittest.TestCase):
 	
+	def assertSameGraph(self, g, h, p={}, q={}):
+		self.assertEqual(list(g.iter_nodes(p)), list(h.iter_nodes(q)))
+		self.assertEqual(list(g.iter_edges(p)), list(h.iter_edges(q)))
+		
+	def test_unrolled(self):
+		@Graph(directed=True)
+		def g(c):
+			hub = ('hub')
+			for i in range(3):
+				(i, {color: c, double: i * 2}) -{w: i + 1, c: c}> (i + 1)
+				hub -{}> (i)
+				
+		@Graph(directed=True)
+		def h(c):
+			hub = ('hub')
+			(0, {color: c, double: 0}) -{w: 1, c: c}> (1)
+			hub -{}> (0)
+			(1, {color: c, double: 2}) -{w: 2, c: c}> (2)
+			hub -{}> (1)
+			(2, {color: c, double: 4}) -{w: 3, c: c}> (3)
+			hub -{}> (2)
+			
+		self.assertSameGraph(g, h, {'c': 'red'}, {'c': 'red'})
+		self.assertEqual(g.lower().parameters, {'c'})
+		
+	def test_nested(self):
+		@Graph(directed=True)
+		def g(n):
+			for i in range(n):
+				for j in range(n - 1):
+					(i * n + j) -{}> (i * n + j + 1)
+				(i)
+				
+		edges = [(i * 3 + j, i * 3 + j + 1, {}) for i in range(3) for j in range(2)]
+		
+		self.assertEqual(list(g.iter_edges({'n': 3})), edges)
+		self.assertEqual(len({v for v, d in g.iter_nodes({'n': 3})}), 9)
+		
+	def test_assignments(self):
+		# Bodies rebinding names are expanded statement by statement
+		@Graph(directed=True)
+		def g(n):
+			last = (0)
+			for i in range(1, n):
+				last = (i) -{}> last
+			last -{}> ('end')
+			
+		self.assertEqual([(u, v) for u, v, d in g.iter_edges({'n': 4})], [(1, 0), (2, 1), (3, 2), (3, 'end')])
+		
+	def test_structural_parameters(self):
+		@Graph(directed=True)
+		def g(n, k, c):
+			for i in range(n):
+				(i + k, {color: c})
+				
+		self.assertEqual(len(list(g.iter_nodes({'n': 10, 'k': 0, 'c': 1}))), 10)
+		self.assertEqual(len(list(g.iter_nodes({'n': 5, 'k': 0, 'c': 1}))), 5)
+		
+		g.lower({'n': 10, 'k': 0})
+		plan = g.lower({'n': 5, 'k': 0, 'c': 2})
+		self.assertEqual(plan.structural, {'n', 'k'})
+		self.assertEqual(plan.parameters, {'n', 'k', 'c'})
+		self.assertIs(g.lower({'n': 5, 'k': 0}), plan)
+		self.assertEqual(len(g.plans), 2)
+		
+		with self.assertRaisesRegex(GraphNotDefinedException, '"k"'):
+			g.lower({'n': 5})
+			
+	def test_empty_loop(self):
+		@Graph(directed=True)
+		def g(n, k):
+			for i in range(n):
+				(i * k)
+				
+		self.assertEqual(list(g.iter_nodes({'n': 0, 'k': 1})), [])
+		self.assertEqual(g.lower({'n': 0, 'k': 1}).structural, {'n', 'k'})
+		
+	def test_ast_size(self):
+		@Graph(directed=True)
+		def g(n):
+			for i in range(n):
+				(i) -{}> (i + 1)
+				
+		self.assertEqual(len(g.ast.nodes), 1)
+		self.assertEqual(len(g.lower({'n': 10000}).edges), 10000)
+		
+	def test_undefined_name(self):
+		@Graph(directed=True)
+		def g():
+			for i in range(3):
+				(i) -{}> a
+				
+		self.assertRaises(GraphNotDefinedException, g.lower)
+		
+	def test_parallel(self):
+		@Graph(directed=True, lazy=True)
+		def g(n):
+			a = (-1)
+			for i in range(n):
+				(i) -{}> a
+			for i in range(n):
+				(i) -{}> (i * 2)
+				
+		plan = GraphPlanner(g.ast, graph_directed=True, parameters={'n': 4}).lower()
+		parallel = GraphPlanner.lower_parallel(g.ast, 2, graph_directed=True, parameters={'n': 4})
+		
+		TestParallelLowering.assertSamePlan(self, parallel, plan)
+		self.assertEqual(parallel.structural, {'n'})
+		
+	@unittest.skipUnless(nxbackend.imported, 'networkx not installed')
+	def test_rebuild(self):
+		@Graph(directed=True, rebuildable=True)
+		def g(n, c):
+			for i in range(n):
+				(i, {color: c}) -{}> (i + 1)
+				
+		p = g(parameters={'n': 3, 'c': 'red'})
+		self.assertEqual(p.number_of_edges(), 3)
+		
+		q = g.rebuild(p, {'n': 3, 'c': 'blue'})
+		self.assertIs(q, p)
+		self.assertEqual(p.nodes[2], {'color': 'blue'})
+		
+		q = g.rebuild(p, {'n': 5, 'c': 'blue'})
+		self.assertIsNot(q, p)
+		self.assertEqual(q.number_of_edges(), 5)
 		
 		
 if __name__ == '__main__':
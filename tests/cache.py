@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+
+import unittest
+import unittest.mock
+import os
+import tempfile
+import pathlib
+import context
+
+from GraphDSL.Factory import Graph
+from GraphDSL.Cache import GraphCache
+from GraphDSL.Compiler import GraphCompiler
+from GraphDSL import compiler
+from GraphDSL import serialize
+
+class TestCompilationCache(unittest.TestCase):
+	
+	def setUp(self):
+		self.directory = tempfile.TemporaryDirectory()
+		self.cache = GraphCache(self.directory.name)
+		
+	def tearDown(self):
+		self.directory.cleanup()
+		
+	def define(self, **kwargs):
+		@Graph(directed=True, cache_dir=self.cache, **kwargs)
+		def g(c):
+			(1, {color: c}) -{}> (2) -{}> (3)
+			
+		return g
+		
+	def test_miss_then_hit(self):
+		g1 = self.define()
+		self.assertEqual(self.cache.stats(), {'hits': 0, 'misses': 1})
+		
+		with unittest.mock.patch.object(GraphCompiler, 'compile_to_ast') as compile_to_ast:
+			g2 = self.define()
+			compile_to_ast.assert_not_called()
+			
+		self.assertEqual(self.cache.stats(), {'hits': 1, 'misses': 1})
+		self.assertEqual(g1.ast, g2.ast)
+		
+	def test_options_in_key(self):
+		self.define()
+		self.define(default_edge_params={'w': 1})
+		
+		self.assertEqual(self.cache.stats(), {'hits': 0, 'misses': 2})
+		
+	def test_formats_in_key(self):
+		key = self.cache.key('(1)')
+		
+		with unittest.mock.patch('GraphDSL.compiler.FORMAT', compiler.FORMAT + 1):
+			self.assertNotEqual(self.cache.key('(1)'), key)
+		with unittest.mock.patch('GraphDSL.serialize.VERSION', serialize.VERSION + 1):
+			self.assertNotEqual(self.cache.key('(1)'), key)
+			
+		self.assertEqual(self.cache.key('(1)'), key)
+		
+	def test_failed_write(self):
+		for target in ('os.replace', 'tempfile.mkstemp'):
+			with unittest.mock.patch(target, side_effect=PermissionError):
+				g = self.define()
+				
+			self.assertEqual(sorted(g(parameters={'c': 'red'}).nodes), [1, 2, 3])
+			self.assertEqual(os.listdir(self.directory.name), [])
+			
+		self.define()
+		self.assertEqual(self.cache.stats(), {'hits': 0, 'misses': 3})
+		
+	def test_hook(self):
+		events = []
+		self.cache.hook = lambda event, key: events.append(event)
+		
+		self.define()
+		self.define()
+		
+		self.assertEqual(events, ['miss', 'hit'])
+		
+	def test_path_option(self):
+		@Graph(directed=True, cache_dir=self.directory.name)
+		def g():
+			(1)
+			
+		self.assertIsInstance(g.cache, GraphCache)
+		self.assertEqual(g.cache.stats(), {'hits': 0, 'misses': 1})
+		
+		@Graph(directed=True, cache_dir=pathlib.Path(self.directory.name))
+		def h():
+			(1)
+			
+		self.assertIsInstance(h.cache, GraphCache)
+		self.assertEqual(h.cache.stats(), {'hits': 0, 'misses': 1})
+		self.assertEqual(len(os.listdir(self.directory.name)), 2)
+		
+		
+if __name__ == '__main__':
+	unittest.main()
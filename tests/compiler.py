@@ -2,10 +2,12 @@
 
 import unittest
 import context
+from io import BytesIO
 
 from GraphDSL.Factory import Graph
 from GraphDSL.GraphAst import *
 from GraphDSL.Exceptions import *
+from GraphDSL.Compiler import GraphCompiler, decode_literal
 
 class TestCompilingMethods(unittest.TestCase):
 	
@@ -207,18 +209,16 @@ class TestCompilingMethods(unittest.TestCase):
 			(4) <{}- (5)
 		
 		expected = GraphDef(nodes=[
-			GraphAstEdge(
-				node1=GraphAstNodedef(value=GraphAstLitteralValue(value=1), data={}),
-				node2=GraphAstEdge(
-					node1=GraphAstNodedef(value=GraphAstLitteralValue(value=2), data={}),
-					node2=GraphAstNodedef(value=GraphAstLitteralValue(value=3), data={}),
-					data={},
-					left_char='-',
-					right_char='>'
-				),
-				data={},
-				left_char='-',
-				right_char='>'
+			GraphAstChain(
+				nodes=[
+					GraphAstNodedef(value=GraphAstLitteralValue(value=1), data={}),
+					GraphAstNodedef(value=GraphAstLitteralValue(value=2), data={}),
+					GraphAstNodedef(value=GraphAstLitteralValue(value=3), data={})
+				],
+				edges=[
+					GraphAstEdgeSpec(data={}, left_char='-', right_char='>'),
+					GraphAstEdgeSpec(data={}, left_char='-', right_char='>')
+				]
 			),
 			GraphAstEdge(
 				node1=GraphAstNodedef(value=GraphAstLitteralValue(value=4), data={}),
@@ -231,6 +231,34 @@ class TestCompilingMethods(unittest.TestCase):
 		
 		self.assertEqual(g.ast, expected)
 		
+	def test_long_chain(self):
+		source = ' -{}> '.join(f'({i})' for i in range(5001)) + '\n'
+		
+		compiler = GraphCompiler(BytesIO(source.encode('utf-8')).readline, graph_directed=True, default_node_params={}, default_edge_params={})
+		ast = compiler.parse_graph()
+		
+		self.assertEqual(len(ast.nodes), 1)
+		self.assertEqual(len(ast.nodes[0].nodes), 5001)
+		self.assertEqual(ast.nodes[0].nodes[-1], GraphAstNodedef(value=GraphAstLitteralValue(value=5000), data={}))
+		
+	def test_comments(self):
+		@Graph(directed=True)
+		def g():
+			# Comment
+			(1) -{}> (2) # Comment
+			
+		expected = GraphDef(nodes=[
+			GraphAstEdge(
+				node1=GraphAstNodedef(value=GraphAstLitteralValue(value=1), data={}),
+				node2=GraphAstNodedef(value=GraphAstLitteralValue(value=2), data={}),
+				data={},
+				left_char='-',
+				right_char='>'
+			)
+		])
+		
+		self.assertEqual(g.ast, expected)
+		
 	def test_assignation_edges_with_properties(self):
 		@Graph(directed=True)
 		def g():
@@ -333,6 +361,148 @@ class TestCompilingMethods(unittest.TestCase):
 		self.assertEqual(g.ast, expected)
 		
 		
+	# Tests literals
+	
+	def test_literals(self):
+		tokens = ['42', '1_000', '0x1F', '0o17', '0b101', '00', '1.5', '.5', '1e3', '1_0.5', '3j',
+			"'abc'", '"abc"', "''", '"it\'s"', "'a\\nb'", "r'a\\nb'", "b'abc'", "'''abc'''", "u'abc'"]
+			
+		for t in tokens:
+			self.assertEqual(decode_literal(t), eval(t), t)
+			self.assertIs(type(decode_literal(t)), type(eval(t)), t)
+			
+	def test_expression_literal(self):
+		def build_graph():
+			@Graph(directed=True)
+			def g():
+				(f'{print(42)}')
+				
+		self.assertRaises(GraphSyntaxException, build_graph)
+		
+	def test_expressions(self):
+		@Graph(directed=True)
+		def g(n):
+			(1 + 2 * 3, {a: (1 + 2) * 3, b: -2, c: 7 // 2 % 2})
+			(n * 2 + 1)
+			
+		expected = GraphDef(nodes=[
+			GraphAstNodedef(
+				value=GraphAstLitteralValue(value=7),
+				data={'a': GraphAstLitteralValue(value=9), 'b': GraphAstLitteralValue(value=-2), 'c': GraphAstLitteralValue(value=1)}
+			),
+			GraphAstNodedef(
+				value=GraphAstExpr('+', GraphAstExpr('*', GraphAstGetValue('n'), GraphAstLitteralValue(2)), GraphAstLitteralValue(1)),
+				data={}
+			)
+		])
+		
+		self.assertEqual(g.ast, expected)
+		
+		
+	# Tests groups
+	
+	def test_fan_out(self):
+		@Graph(directed=True)
+		def g():
+			hub = (0)
+			hub -{w: 1}> [(1), (2, {size: 2}), hub]
+			
+		expected = GraphDef(nodes=[
+			GraphAstAssignation('hub', GraphAstNodedef(GraphAstLitteralValue(0), {})),
+			GraphAstEdge(
+				GraphAstGetNode('hub'),
+				GraphAstGroup([
+					GraphAstNodedef(GraphAstLitteralValue(1), {}),
+					GraphAstNodedef(GraphAstLitteralValue(2), {'size': GraphAstLitteralValue(2)}),
+					GraphAstGetNode('hub')
+				]),
+				{'w': GraphAstLitteralValue(1)}, '-', '>'
+			)
+		])
+		
+		self.assertEqual(g.ast, expected)
+		
+	def test_fan_in(self):
+		@Graph(directed=True)
+		def g():
+			[
+				(1),
+				(2),
+			] -{}> (0)
+			
+		expected = GraphDef(nodes=[
+			GraphAstEdge(
+				GraphAstGroup([GraphAstNodedef(GraphAstLitteralValue(1), {}), GraphAstNodedef(GraphAstLitteralValue(2), {})]),
+				GraphAstNodedef(GraphAstLitteralValue(0), {}),
+				{}, '-', '>'
+			)
+		])
+		
+		self.assertEqual(g.ast, expected)
+		
+	def test_invalid_groups(self):
+		for source in ('(0) -{}> [(1) (2)]\n', '(0) -{}> [(1), [(2)]]\n', '(0) -{}> [(1), a = (2)]\n'):
+			compiler = GraphCompiler(BytesIO(source.encode()).readline, graph_directed=True, default_node_params={}, default_edge_params={})
+			with self.assertRaises(GraphSyntaxException, msg=source):
+				compiler.parse_graph()
+				
+				
+	# Tests loops
+	
+	def test_loop(self):
+		@Graph(directed=True)
+		def g(n):
+			for i in range(1, n):
+				(i) -{}> (i + 1)
+				
+			for j in range(3): (j)
+			(0)
+			
+		expected = GraphDef(nodes=[
+			GraphAstLoop('i', [GraphAstLitteralValue(1), GraphAstGetValue('n')], [
+				GraphAstEdge(
+					GraphAstNodedef(GraphAstGetValue('i'), {}),
+					GraphAstNodedef(GraphAstExpr('+', GraphAstGetValue('i'), GraphAstLitteralValue(1)), {}),
+					{}, '-', '>'
+				)
+			]),
+			GraphAstLoop('j', [GraphAstLitteralValue(3)], [GraphAstNodedef(GraphAstGetValue('j'), {})]),
+			GraphAstNodedef(GraphAstLitteralValue(0), {})
+		])
+		
+		self.assertEqual(g.ast, expected)
+		
+	def test_nested_loops(self):
+		@Graph(directed=True)
+		def g(n):
+			for i in range(n):
+				for j in range(n):
+					(i * n + j)
+				(i)
+				
+		self.assertEqual(len(g.ast.nodes), 1)
+		
+		outer = g.ast.nodes[0]
+		self.assertEqual(len(outer.body), 2)
+		self.assertIsInstance(outer.body[0], GraphAstLoop)
+		self.assertEqual(outer.body[0].name, 'j')
+		
+	def test_invalid_loops(self):
+		sources = [
+			'for i in items:\n\t(i)\n',
+			'for i in range(1, 2, 3, 4):\n\t(i)\n',
+			'for i in range(3)\n\t(i)\n',
+			'for (i) in range(3):\n\t(i)\n',
+			"(1 + 'a')\n",
+			'(1 // 0)\n',
+		]
+		
+		for source in sources:
+			compiler = GraphCompiler(BytesIO(source.encode()).readline, graph_directed=True, default_node_params={}, default_edge_params={})
+			with self.assertRaises(GraphSyntaxException, msg=source):
+				compiler.parse_graph()
+				
+				
 	# Tests default properties
 	
 	def test_nodes_with_default_properties(self):
@@ -407,18 +577,17 @@ class TestCompilingMethods(unittest.TestCase):
 			(42) -{}> (72) -{}> (123)
 			
 		expected = GraphDef(nodes=[
-			GraphAstEdge(
-				node1=GraphAstNodedef(value=GraphAstLitteralValue(value=42), data={}),
-				node2=GraphAstEdge(
-					node1=GraphAstNodedef(value=GraphAstLitteralValue(value=72), data={}),
-					node2=GraphAstNodedef(value=GraphAstLitteralValue(value=123), data={}),
-					data={'abc': GraphAstLitteralValue(value=42),'xyz': GraphAstLitteralValue(value='Foo Bar')},
-					left_char='-',
-					right_char='>'
-				),
-				data={'abc': GraphAstLitteralValue(value=42), 'xyz': GraphAstLitteralValue(value='Foo Bar')},
-				left_char='-',
-				right_char='>')
+			GraphAstChain(
+				nodes=[
+					GraphAstNodedef(value=GraphAstLitteralValue(value=42), data={}),
+					GraphAstNodedef(value=GraphAstLitteralValue(value=72), data={}),
+					GraphAstNodedef(value=GraphAstLitteralValue(value=123), data={})
+				],
+				edges=[
+					GraphAstEdgeSpec(data={'abc': GraphAstLitteralValue(value=42), 'xyz': GraphAstLitteralValue(value='Foo Bar')}, left_char='-', right_char='>'),
+					GraphAstEdgeSpec(data={'abc': GraphAstLitteralValue(value=42),'xyz': GraphAstLitteralValue(value='Foo Bar')}, left_char='-', right_char='>')
+				]
+			)
 		])
 		
 		
@@ -431,18 +600,17 @@ class TestCompilingMethods(unittest.TestCase):
 			(42) -{abc:'def'}> (72) -{xyz: 72}> (123)
 			
 		expected = GraphDef(nodes=[
-			GraphAstEdge(
-				node1=GraphAstNodedef(value=GraphAstLitteralValue(value=42), data={}),
-				node2=GraphAstEdge(
-					node1=GraphAstNodedef(value=GraphAstLitteralValue(value=72), data={}),
-					node2=GraphAstNodedef(value=GraphAstLitteralValue(value=123), data={}),
-					data={'abc': GraphAstLitteralValue(value=42), 'xyz': GraphAstLitteralValue(value=72)},
-					left_char='-',
-					right_char='>'
-				),
-				data={'abc': GraphAstLitteralValue(value='def'), 'xyz': GraphAstLitteralValue(value='Foo Bar')},
-				left_char='-',
-				right_char='>')
+			GraphAstChain(
+				nodes=[
+					GraphAstNodedef(value=GraphAstLitteralValue(value=42), data={}),
+					GraphAstNodedef(value=GraphAstLitteralValue(value=72), data={}),
+					GraphAstNodedef(value=GraphAstLitteralValue(value=123), data={})
+				],
+				edges=[
+					GraphAstEdgeSpec(data={'abc': GraphAstLitteralValue(value='def'), 'xyz': GraphAstLitteralValue(value='Foo Bar')}, left_char='-', right_char='>'),
+					GraphAstEdgeSpec(data={'abc': GraphAstLitteralValue(value=42), 'xyz': GraphAstLitteralValue(value=72)}, left_char='-', right_char='>')
+				]
+			)
 		])
 		
 		self.assertEqual(g.ast, expected)
@@ -454,18 +622,17 @@ class TestCompilingMethods(unittest.TestCase):
 			(42) -{}> (72) -{}> (123)
 			
 		expected = GraphDef(nodes=[
-			GraphAstEdge(
-				node1=GraphAstNodedef(value=GraphAstLitteralValue(value=42), data={}),
-				node2=GraphAstEdge(
-					node1=GraphAstNodedef(value=GraphAstLitteralValue(value=72), data={}),
-					node2=GraphAstNodedef(value=GraphAstLitteralValue(value=123), data={}),
-					data={'abc': GraphAstLitteralValue(value=42),'xyz': GraphAstLitteralValue(value='Foo Bar')},
-					left_char='-',
-					right_char='>'
-				),
-				data={'abc': GraphAstLitteralValue(value=42), 'xyz': GraphAstLitteralValue(value='Foo Bar')},
-				left_char='-',
-				right_char='>')
+			GraphAstChain(
+				nodes=[
+					GraphAstNodedef(value=GraphAstLitteralValue(value=42), data={}),
+					GraphAstNodedef(value=GraphAstLitteralValue(value=72), data={}),
+					GraphAstNodedef(value=GraphAstLitteralValue(value=123), data={})
+				],
+				edges=[
+					GraphAstEdgeSpec(data={'abc': GraphAstLitteralValue(value=42), 'xyz': GraphAstLitteralValue(value='Foo Bar')}, left_char='-', right_char='>'),
+					GraphAstEdgeSpec(data={'abc': GraphAstLitteralValue(value=42),'xyz': GraphAstLitteralValue(value='Foo Bar')}, left_char='-', right_char='>')
+				]
+			)
 		])
 		
 		
@@ -0,0 +1,670 @@
+#!/usr/bin/env python3
+
+import types
+import asyncio
+import inspect
+import tracemalloc
+import tempfile
+import unittest
+import unittest.mock
+import threading
+import context
+from concurrent.futures import ThreadPoolExecutor
+
+from GraphDSL.Factory import Graph, GraphFactory, compile_all
+from GraphDSL.Cache import GraphCache
+from GraphDSL.GraphAst import *
+from GraphDSL.Compiler import GraphCompiler
+from GraphDSL.Exceptions import *
+from GraphDSL.backend.abstract import Backend
+from GraphDSL.backend import networkx as nxbackend
+from GraphDSL.backend import igraph as igbackend
+from GraphDSL.backend import array as arraybackend
+
+class TestLazyCompilation(unittest.TestCase):
+	
+	def setUp(self):
+		self.compile_to_ast = unittest.mock.patch.object(GraphCompiler, 'compile_to_ast', autospec=True, side_effect=GraphCompiler.compile_to_ast)
+		self.mocked = self.compile_to_ast.start()
+		
+	def tearDown(self):
+		self.compile_to_ast.stop()
+		
+	def test_not_compiled_at_definition(self):
+		@Graph(directed=True, lazy=True)
+		def g():
+			(42)
+			
+		self.mocked.assert_not_called()
+		
+	def test_compiled_once_on_access(self):
+		@Graph(directed=True, lazy=True)
+		def g():
+			(42)
+			
+		g.ast
+		g.ast
+		
+		self.mocked.assert_called_once()
+		
+	def test_lazy_default(self):
+		with unittest.mock.patch.object(GraphFactory, 'lazy_default', True):
+			@Graph(directed=True)
+			def g():
+				(42)
+				
+		self.mocked.assert_not_called()
+		
+	def test_compiled_once_across_threads(self):
+		@Graph(directed=True, lazy=True)
+		def g():
+			(1) -{}> (2) -{}> (3)
+			
+		barrier = threading.Barrier(8)
+		results = []
+		
+		def access():
+			barrier.wait()
+			results.append(g.ast)
+			
+		threads = [threading.Thread(target=access) for i in range(8)]
+		for t in threads:
+			t.start()
+		for t in threads:
+			t.join()
+			
+		self.mocked.assert_called_once()
+		self.assertTrue(all(r is results[0] for r in results))
+		
+	def test_error_on_first_call(self):
+		@Graph(directed=True, lazy=True)
+		def g():
+			(1) -{}- (2)
+			
+		with self.assertRaises(GraphException) as error:
+			g(backend=Backend)
+			
+		self.assertIn('"TestLazyCompilation.test_error_on_first_call.<locals>.g"', str(error.exception))
+		
+		
+@Graph(directed=True, default_edge_params={'w': 0}, rebuildable=True)
+def sweep(c, l, v):
+	a = (1, {color: c, size: 1}) -{length: l}> (2) <{}> (3, {color: c})
+	(1, {color: 'black'}) -{length: 2}> (v)
+	a -{w: l}> (2)
+	
+	
+class TestInstantiateMany(unittest.TestCase):
+	
+	parameters = [
+		{'c': 'red', 'l': 1, 'v': 4},
+		{'c': 'blue', 'l': 1, 'v': 4},
+		{'c': 'red', 'l': 5, 'v': 4},
+		{'c': 'green', 'l': 6, 'v': 5},
+	]
+	
+	def test_builds_each(self):
+		backend = unittest.mock.MagicMock(spec=Backend)
+		backend.return_value.add_nodes_from.side_effect = lambda g, nodes: [v for v, d in nodes]
+		backend.return_value.finish_graph.side_effect = lambda g: g
+		backend.return_value.chunk_size = None
+		
+		graphs = sweep.instantiate_many(self.parameters, backend=backend)
+		
+		self.assertEqual(len(graphs), 4)
+		self.assertEqual(backend.return_value.add_nodes_from.call_count, 4)
+		
+	@unittest.skipUnless(nxbackend.imported, 'networkx not installed')
+	def test_copy_networkx(self):
+		graphs = sweep.instantiate_many(self.parameters, copy=True)
+		
+		for p, g in zip(self.parameters, graphs):
+			expected = sweep(parameters=p)
+			self.assertEqual(list(g.nodes(data=True)), list(expected.nodes(data=True)))
+			self.assertEqual(list(g.edges(keys=True, data=True)), list(expected.edges(keys=True, data=True)))
+			
+	@unittest.skipUnless(igbackend.imported, 'igraph not installed')
+	def test_copy_igraph(self):
+		graphs = sweep.instantiate_many(self.parameters, backend=igbackend, copy=True)
+		
+		for p, g in zip(self.parameters, graphs):
+			expected = sweep(parameters=p, backend=igbackend)
+			self.assertEqual(g.get_edgelist(), expected.get_edgelist())
+			self.assertEqual(g.vs['attr'], expected.vs['attr'])
+			self.assertEqual(g.es['length'], expected.es['length'])
+			self.assertEqual(g.es['w'], expected.es['w'])
+			
+	def test_changed_parameters(self):
+		self.assertEqual(sweep.changed_parameters(self.parameters[0], self.parameters[2]), {'l'})
+		self.assertEqual(sweep.changed_parameters(self.parameters[0], {**self.parameters[0], 'other': 1}), set())
+		
+		
+class TestRebuild(unittest.TestCase):
+	
+	parameters = TestInstantiateMany.parameters
+	
+	def assertSameNetworkX(self, g, expected):
+		self.assertEqual(list(g.nodes(data=True)), list(expected.nodes(data=True)))
+		self.assertEqual(list(g.edges(keys=True, data=True)), list(expected.edges(keys=True, data=True)))
+		
+	@unittest.skipUnless(nxbackend.imported, 'networkx not installed')
+	def test_networkx(self):
+		g = sweep(parameters=self.parameters[0])
+		
+		for p in self.parameters[1:3]:
+			self.assertIs(sweep.rebuild(g, p), g)
+			self.assertSameNetworkX(g, sweep(parameters=p))
+			
+	@unittest.skipUnless(igbackend.imported, 'igraph not installed')
+	def test_igraph(self):
+		g = sweep(parameters=self.parameters[0], backend=igbackend)
+		
+		for p in self.parameters[1:3]:
+			self.assertIs(sweep.rebuild(g, p), g)
+			expected = sweep(parameters=p, backend=igbackend)
+			self.assertEqual(g.vs['attr'], expected.vs['attr'])
+			self.assertEqual(g.es['length'], expected.es['length'])
+			self.assertEqual(g.es['w'], expected.es['w'])
+			
+	def test_array(self):
+		g = sweep(parameters=self.parameters[0], backend=arraybackend)
+		
+		self.assertIs(sweep.rebuild(g, self.parameters[2]), g)
+		expected = sweep(parameters=self.parameters[2], backend=arraybackend)
+		self.assertEqual(repr([g.edge_data(e) for e in range(g.number_of_edges())]), repr([expected.edge_data(e) for e in range(expected.number_of_edges())]))
+		
+	@unittest.skipUnless(nxbackend.imported, 'networkx not installed')
+	def test_only_affected(self):
+		g = sweep(parameters=self.parameters[0])
+		
+		with unittest.mock.patch.object(nxbackend.NetworkXBackend, 'update_nodes') as update_nodes:
+			with unittest.mock.patch.object(nxbackend.NetworkXBackend, 'update_edges') as update_edges:
+				sweep.rebuild(g, self.parameters[2])
+				
+		update_nodes.assert_not_called()
+		self.assertEqual([e for e, data in update_edges.call_args.args[1]], [(1, 2, 0), (1, 2, 1)])
+		
+	@unittest.skipUnless(nxbackend.imported, 'networkx not installed')
+	def test_topology_changed(self):
+		g = sweep(parameters=self.parameters[2])
+		h = sweep.rebuild(g, self.parameters[3])
+		
+		self.assertIsNot(h, g)
+		self.assertSameNetworkX(h, sweep(parameters=self.parameters[3]))
+		self.assertSameNetworkX(g, sweep(parameters=self.parameters[2]))
+		
+		# h is rebuilt in place in turn
+		self.assertIs(sweep.rebuild(h, {**self.parameters[3], 'c': 'pink'}), h)
+		
+	@unittest.skipUnless(nxbackend.imported, 'networkx not installed')
+	def test_unknown_graph(self):
+		import networkx as nx
+		
+		g = nx.MultiDiGraph()
+		h = sweep.rebuild(g, self.parameters[0])
+		
+		self.assertIsNot(h, g)
+		self.assertSameNetworkX(h, sweep(parameters=self.parameters[0]))
+		
+	@unittest.skipUnless(nxbackend.imported, 'networkx not installed')
+	def test_cached_graph(self):
+		@Graph(directed=True, cache=2)
+		def cached(c):
+			(1, {color: c}) -{}> (2)
+			
+		g = cached(parameters={'c': 'red'})
+		h = cached.rebuild(g, {'c': 'blue'})
+		
+		self.assertIsNot(h, g)
+		self.assertEqual(g.nodes[1]['color'], 'red')
+		self.assertEqual(h.nodes[1]['color'], 'blue')
+		
+	@unittest.skipUnless(nxbackend.imported, 'networkx not installed')
+	def test_not_rebuildable(self):
+		@Graph(directed=True)
+		def g(c):
+			(1, {color: c}) -{}> (2)
+			
+		p = g(parameters={'c': 'red'})
+		self.assertEqual(g.records, {})
+		
+		q = g.rebuild(p, {'c': 'blue'})
+		self.assertIsNot(q, p)
+		self.assertEqual(q.nodes[1]['color'], 'blue')
+		
+		# Opted in by the call
+		p = g(parameters={'c': 'red'}, rebuildable=True)
+		self.assertIs(g.rebuild(p, {'c': 'blue'}), p)
+		self.assertEqual(p.nodes[1]['color'], 'blue')
+		
+	@unittest.skipUnless(nxbackend.imported, 'networkx not installed')
+	def test_records_released(self):
+		g = sweep(parameters=self.parameters[0])
+		self.assertIn(id(g), sweep.records)
+		
+		key = id(g)
+		del g
+		self.assertNotIn(key, sweep.records)
+		
+		
+def chain_factory(nodes):
+	# A chain of `nodes` nodes with a parameter on its first one
+	statements = [GraphAstAssignation('a', GraphAstNodedef(GraphAstLitteralValue(0), {'color': GraphAstGetValue('c')}))]
+	statements += [
+		GraphAstEdge(GraphAstNodedef(GraphAstLitteralValue(i - 1), {}), GraphAstNodedef(GraphAstLitteralValue(i), {}), {'w': GraphAstLitteralValue(i)}, '-', '>')
+		for i in range(1, nodes)
+	]
+	
+	factory = GraphFactory(lambda: None, directed=True, lazy=True)
+	factory.compiled_ast = GraphDef(statements)
+	return factory
+	
+	
+class CountingBackend(arraybackend.ArrayBackend):
+	calls = 0
+	
+	def add_edges_from(self, graph, edges):
+		CountingBackend.calls += 1
+		return super().add_edges_from(graph, edges)
+		
+		
+class TestAsyncBuild(unittest.TestCase):
+	
+	def assertSameArray(self, g, expected):
+		self.assertEqual(g.ids, expected.ids)
+		self.assertEqual([*g.edges()], [*expected.edges()])
+		self.assertEqual(repr([g.edge_data(e) for e in range(g.number_of_edges())]), repr([expected.edge_data(e) for e in range(expected.number_of_edges())]))
+		self.assertEqual(g.node_data(0), {'color': 'red'})
+		
+	def test_same_graph(self):
+		factory = chain_factory(1000)
+		expected = factory({'c': 'red'}, backend=arraybackend)
+		
+		for chunk_size in (1, 7, 5000):
+			g = asyncio.run(factory.abuild({'c': 'red'}, backend=arraybackend, chunk_size=chunk_size))
+			self.assertSameArray(g, expected)
+			
+		with ThreadPoolExecutor(1) as executor:
+			g = asyncio.run(factory.abuild({'c': 'red'}, backend=arraybackend, executor=executor, chunk_size=100))
+		self.assertSameArray(g, expected)
+		
+	def test_recorded(self):
+		factory = chain_factory(100)
+		g = asyncio.run(factory.abuild({'c': 'red'}, backend=arraybackend, rebuildable=True))
+		
+		self.assertIs(factory.rebuild(g, {'c': 'blue'}), g)
+		self.assertEqual(g.node_data(0), {'color': 'blue'})
+		
+	def test_missing_parameter(self):
+		with self.assertRaises(GraphNotDefinedException):
+			asyncio.run(chain_factory(100).abuild({}, backend=arraybackend))
+			
+	def test_interleaved(self):
+		factory = chain_factory(20000)
+		log = []
+		
+		class Backend(arraybackend.ArrayBackend):
+			def add_nodes_from(self, graph, nodes):
+				log.append('nodes')
+				return super().add_nodes_from(graph, nodes)
+				
+			def add_edges_from(self, graph, edges):
+				log.append('edges')
+				return super().add_edges_from(graph, edges)
+				
+		async def main():
+			task = asyncio.ensure_future(factory.abuild({'c': 'red'}, backend=Backend, chunk_size=1000))
+			while not task.done():
+				log.append('tick')
+				await asyncio.sleep(0)
+			return await task
+			
+		factory.lower()
+		g = asyncio.run(main())
+		self.assertEqual(g.number_of_edges(), 19999)
+		
+		# One backend call per chunk, other tasks run between any two
+		calls = [entry for entry in log if entry != 'tick']
+		self.assertEqual(calls, ['nodes'] * 20 + ['edges'] * 20)
+		self.assertFalse(any(a != 'tick' and b != 'tick' for a, b in zip(log, log[1:])))
+		
+	def test_cancel(self):
+		factory = chain_factory(20000)
+		
+		async def main():
+			task = asyncio.ensure_future(factory.abuild({'c': 'red'}, backend=CountingBackend, chunk_size=100))
+			for i in range(10):
+				await asyncio.sleep(0)
+			task.cancel()
+			with self.assertRaises(asyncio.CancelledError):
+				await task
+				
+		CountingBackend.calls = 0
+		asyncio.run(main())
+		self.assertLess(CountingBackend.calls, 10)
+		
+	def test_cancel_executor(self):
+		factory = chain_factory(20000)
+		factory.lower()
+		started = threading.Event()
+		release = threading.Event()
+		
+		class Backend(CountingBackend):
+			def add_edges_from(self, graph, edges):
+				# The first chunk waits for the task to be cancelled
+				started.set()
+				release.wait(10)
+				return super().add_edges_from(graph, edges)
+				
+		async def main(executor):
+			task = asyncio.ensure_future(factory.abuild({'c': 'red'}, backend=Backend, executor=executor, chunk_size=100))
+			while not started.is_set():
+				await asyncio.sleep(0)
+			task.cancel()
+			with self.assertRaises(asyncio.CancelledError):
+				await task
+			release.set()
+			
+		CountingBackend.calls = 0
+		with ThreadPoolExecutor(1) as executor:
+			asyncio.run(main(executor))
+			
+		# The worker stopped after the chunk it was running
+		self.assertEqual(CountingBackend.calls, 1)
+		
+		
+@Graph(directed=True)
+def directed(c, v):
+	a = (1, {color: c}) -{w: 1}> (2)
+	(3) <{w: 2}> a <{}- (v, {size: 2})
+	(2, {size: 3}) -{}> (4) -{w: c}> (5)
+	
+@Graph(directed=True)
+def anonymous():
+	() -{}> (1)
+	
+@Graph(directed=False)
+def undirected(c):
+	(1) -{w: c}- (2) -{}- (3)
+	(2) -{}- (1)
+	
+	
+class TestIterators(unittest.TestCase):
+	
+	parameters = {'c': 'red', 'v': 6}
+	
+	@unittest.skipUnless(nxbackend.imported, 'networkx not installed')
+	def test_same_as_build(self):
+		for g, parameters in ((directed, self.parameters), (undirected, {'c': 'red'})):
+			expected = g(parameters=parameters)
+			
+			# Undirected edges are listed by networkx in adjacency order
+			key = repr if g.directed else lambda e: repr((*sorted(e[:2]), e[2]))
+			self.assertEqual(sorted(map(key, g.iter_edges(parameters))), sorted(map(key, expected.edges(data=True))))
+			
+			nodes = {}
+			for value, data in g.iter_nodes(parameters):
+				nodes.setdefault(value, {}).update(data)
+			self.assertEqual(nodes, dict(expected.nodes(data=True)))
+			
+	def test_directions(self):
+		edges = [(u, v) for u, v, d in directed.iter_edges(self.parameters)]
+		
+		self.assertEqual(edges, [(1, 2), (6, 1), (3, 1), (1, 3), (4, 5), (2, 4)])
+		
+	def test_nodes(self):
+		# Definitions of a value are merged into the first one, but not
+		# across a parameter value
+		self.assertEqual([*directed.iter_nodes(self.parameters)], [
+			(1, {'color': 'red'}), (2, {}), (3, {}), (6, {'size': 2}),
+			(2, {'size': 3}), (4, {}), (5, {})
+		])
+		
+	def test_anonymous(self):
+		self.assertEqual([*anonymous.iter_nodes()], [(None, {}), (1, {})])
+		self.assertEqual([*anonymous.iter_edges()], [(None, 1, {})])
+		
+	def test_missing_parameter(self):
+		with self.assertRaises(GraphNotDefinedException):
+			directed.iter_edges({'c': 'red'})
+		with self.assertRaises(GraphNotDefinedException):
+			directed.iter_nodes({'v': 1})
+			
+	def test_lazy(self):
+		factory = chain_factory(50000)
+		
+		edges = factory.iter_edges({'c': 'red'})
+		self.assertIsInstance(edges, types.GeneratorType)
+		
+		# Edge data dicts are built as they are consumed
+		factory.lower()
+		tracemalloc.start()
+		for edge in edges:
+			pass
+		peak = tracemalloc.get_traced_memory()[1]
+		tracemalloc.stop()
+		self.assertLess(peak, 100000)
+		
+		
+	def test_loop_memory(self):
+		# Loops and groups are expanded as they are walked, and no plan is kept
+		@Graph(directed=True)
+		def g(n):
+			for i in range(n):
+				(i) -{w: i}> [(i + 1), (i + 2)]
+				
+		peaks = []
+		for n in (10000, 100000):
+			tracemalloc.start()
+			for edge in g.iter_edges({'n': n}):
+				pass
+			for node in g.iter_nodes({'n': n}):
+				pass
+			peaks.append(tracemalloc.get_traced_memory()[1])
+			tracemalloc.stop()
+			
+		self.assertLess(peaks[1], 1.5 * peaks[0])
+		self.assertLess(peaks[1], 100000)
+		self.assertIsNone(g.plan)
+		self.assertEqual(len(g.plans), 0)
+		
+		
+class TestResultCache(unittest.TestCase):
+	
+	def setUp(self):
+		self.backend = unittest.mock.MagicMock(spec=Backend)
+		self.backend.return_value.add_nodes_from.side_effect = lambda g, nodes: [v for v, d in nodes]
+		self.backend.return_value.create_directed_graph.side_effect = lambda: unittest.mock.Mock()
+		self.backend.return_value.freeze_graph.side_effect = lambda g: g
+		self.backend.return_value.finish_graph.side_effect = lambda g: g
+		self.backend.return_value.chunk_size = None
+		self.backend.return_value.copy_graph.side_effect = lambda g: unittest.mock.Mock(copy_of=g)
+		
+	def define(self, **kwargs):
+		@Graph(directed=True, **kwargs)
+		def g(c):
+			(1, {color: c}) -{}> (2)
+			
+		return g
+		
+	def test_hit(self):
+		g = self.define(cache=4)
+		
+		p1 = g(parameters={'c': 'red'}, backend=self.backend)
+		p2 = g(parameters={'c': 'red'}, backend=self.backend)
+		p3 = g(parameters={'c': 'blue'}, backend=self.backend)
+		
+		self.assertIs(p1, p2)
+		self.assertIsNot(p1, p3)
+		self.assertEqual(g.cache_info(), {'hits': 1, 'misses': 2, 'size': 2, 'maxsize': 4})
+		self.backend.return_value.freeze_graph.assert_called()
+		
+	def test_nested_parameters(self):
+		g = self.define(cache=4)
+		
+		p1 = g(parameters={'c': {'a': [1, 2]}}, backend=self.backend)
+		p2 = g(parameters={'c': {'a': [1, 2]}}, backend=self.backend)
+		p3 = g(parameters={'c': {'a': (1, 2)}}, backend=self.backend)
+		
+		self.assertIs(p1, p2)
+		self.assertIsNot(p1, p3)
+		
+	def test_equal_scalars(self):
+		g = self.define(cache=8)
+		
+		graphs = [g(parameters={'c': c}, backend=self.backend) for c in (1, True, 1.0, [1], [True], {1.0})]
+		
+		self.assertEqual(len({*map(id, graphs)}), 6)
+		self.assertIs(g(parameters={'c': 1.0}, backend=self.backend), graphs[2])
+		
+	def test_unhashable_parameters(self):
+		g = self.define(cache=4)
+		
+		g(parameters={'c': bytearray(b'a')}, backend=self.backend)
+		g(parameters={'c': bytearray(b'a')}, backend=self.backend)
+		
+		self.assertEqual(g.cache_info()['size'], 0)
+		
+	def test_lru_eviction(self):
+		g = self.define(cache=2)
+		
+		p1 = g(parameters={'c': 1}, backend=self.backend)
+		g(parameters={'c': 2}, backend=self.backend)
+		g(parameters={'c': 1}, backend=self.backend)
+		g(parameters={'c': 3}, backend=self.backend) # Evicts 2
+		
+		self.assertIs(g(parameters={'c': 1}, backend=self.backend), p1)
+		g(parameters={'c': 2}, backend=self.backend)
+		
+		self.assertEqual(g.cache_info(), {'hits': 2, 'misses': 4, 'size': 2, 'maxsize': 2})
+		
+	def test_invalidation(self):
+		g = self.define(cache=4)
+		
+		p1 = g(parameters={'c': 1}, backend=self.backend)
+		g(parameters={'c': 2}, backend=self.backend)
+		g.cache_invalidate(parameters={'c': 1}, backend=self.backend)
+		
+		self.assertIsNot(g(parameters={'c': 1}, backend=self.backend), p1)
+		self.assertEqual(g.cache_info()['size'], 2)
+		
+		g.cache_clear()
+		self.assertEqual(g.cache_info(), {'hits': 0, 'misses': 0, 'size': 0, 'maxsize': 4})
+		
+	def test_copy(self):
+		g = self.define(cache=4, cache_copy=True)
+		
+		p1 = g(parameters={'c': 1}, backend=self.backend)
+		p2 = g(parameters={'c': 1}, backend=self.backend)
+		
+		self.assertIs(p1.copy_of, p2.copy_of)
+		self.backend.return_value.freeze_graph.assert_not_called()
+		
+	def test_not_frozen(self):
+		# Backends that can't freeze return copies of the cached graph
+		self.backend.return_value.freeze_graph.side_effect = lambda g: None
+		g = self.define(cache=4)
+		
+		p1 = g(parameters={'c': 1}, backend=self.backend)
+		p2 = g(parameters={'c': 1}, backend=self.backend)
+		
+		self.assertIsNot(p1, p2)
+		self.assertIs(p1.copy_of, p2.copy_of)
+		self.assertEqual(g.cache_info()['hits'], 1)
+		
+		# Not cached at all when they can't copy either
+		self.backend.return_value.copy_graph.side_effect = lambda g: None
+		g = self.define(cache=4)
+		
+		p1 = g(parameters={'c': 1}, backend=self.backend)
+		self.assertIsNotNone(p1)
+		self.assertIsNot(g(parameters={'c': 1}, backend=self.backend), p1)
+		self.assertEqual(g.cache_info()['size'], 0)
+		
+	def test_array_copies(self):
+		g = self.define(cache=4)
+		
+		p1 = g(parameters={'c': 'red'}, backend=arraybackend)
+		p1.ids.append(3)
+		p2 = g(parameters={'c': 'red'}, backend=arraybackend)
+		
+		self.assertEqual(p2.ids, [1, 2])
+		self.assertEqual(g.cache_info()['hits'], 1)
+		
+	@unittest.skipUnless(nxbackend.imported, 'networkx not installed')
+	def test_networkx_frozen(self):
+		import networkx as nx
+		
+		g = self.define(cache=4)
+		p = g(parameters={'c': 1})
+		
+		self.assertTrue(nx.is_frozen(p))
+		self.assertIs(g(parameters={'c': 1}), p)
+		
+		
+class TestCompileAll(unittest.TestCase):
+	
+	def factories(self):
+		@Graph(directed=True, lazy=True)
+		def g1(clr):
+			(1, {color: clr}) -{}> (2) -{w: 1}> (3)
+			
+		@Graph(directed=False, lazy=True, default_edge_params={'w': 0})
+		def g2():
+			a = (1)
+			a -{}- (2)
+			
+		@Graph(directed=True)
+		def g3():
+			(4)
+			
+		return g1, g2, g3
+	
+	def test_compile_all(self):
+		factories = self.factories()
+		expected = [f.compile(inspect.getsource(f.function)) for f in factories]
+		
+		self.assertEqual(compile_all(factories, workers=2), 2)
+		self.assertEqual([f.compiled_ast for f in factories], expected)
+		
+		# Nothing left to compile
+		self.assertEqual(compile_all(factories, workers=2), 0)
+		
+	def test_module(self):
+		module = types.ModuleType('graphs')
+		module.g1, module.g2, module.g3 = self.factories()
+		module.other = 42
+		
+		self.assertEqual(compile_all(module, workers=2), 2)
+		self.assertIsNotNone(module.g1.compiled_ast)
+		self.assertIsNotNone(module.g2.compiled_ast)
+		
+	def test_cache(self):
+		with tempfile.TemporaryDirectory() as directory:
+			cache = GraphCache(directory)
+			g1, g2, g3 = self.factories()
+			g1.cache = g2.cache = cache
+			
+			compile_all([g1, g2], workers=2)
+			self.assertEqual(cache.stats(), {'hits': 0, 'misses': 2})
+			
+			h1, h2, h3 = self.factories()
+			h1.cache = h2.cache = cache
+			
+			compile_all([h1, h2], workers=2)
+			self.assertEqual(cache.stats(), {'hits': 2, 'misses': 2})
+			self.assertEqual(h1.compiled_ast, g1.compiled_ast)
+			
+	def test_error(self):
+		@Graph(directed=True, lazy=True)
+		def g():
+			(1) -{}- (2)
+			
+		with self.assertRaises(GraphException) as error:
+			compile_all([g, *self.factories()], workers=2)
+			
+		self.assertIn('test_error.<locals>.g"', str(error.exception))
+		
+		
+if __name__ == '__main__':
+	unittest.main()
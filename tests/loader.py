@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+
+import io
+import os
+import unittest
+import unittest.mock
+import tempfile
+import context
+
+from GraphDSL.Loader import load
+from GraphDSL.Exceptions import *
+from GraphDSL.backend.abstract import Backend
+from GraphDSL.backend import networkx as nxbackend
+
+SOURCE = '''# Standalone graph
+center = ('Center', {weight: 100})
+center -{length: l}> (42)
+
+(72, {color: 'red'}) -{}> center -{}> (1)
+center
+'''
+
+class TestLoader(unittest.TestCase):
+	
+	def setUp(self):
+		self.G = unittest.mock.Mock()
+		self.backend = unittest.mock.MagicMock(spec=Backend)
+		self.backend.return_value.create_directed_graph.return_value = self.G
+		self.backend.return_value.add_nodes_from.side_effect = lambda g, nodes: [v for v, d in nodes]
+		self.backend.return_value.finish_graph.side_effect = lambda g: g
+		self.backend.return_value.chunk_size = None
+		
+	def edges(self):
+		return [e for c in self.backend.return_value.add_edges_from.call_args_list for e in c.args[1]]
+		
+	def test_text_stream(self):
+		g = load(io.StringIO(SOURCE), parameters={'l': 3}, backend=self.backend)
+		
+		self.assertIs(g, self.G)
+		self.assertEqual(self.edges(), [
+			('Center', 42, {'length': 3}),
+			('Center', 1, {}),
+			(72, 'Center', {})
+		])
+		
+	def test_binary_stream(self):
+		load(io.BytesIO(SOURCE.encode('utf-8')), parameters={'l': 3}, backend=self.backend)
+		
+		self.assertEqual(len(self.edges()), 3)
+		
+	def test_path(self):
+		with tempfile.TemporaryDirectory() as directory:
+			path = os.path.join(directory, 'graph.gdsl')
+			with open(path, 'w') as f:
+				f.write(SOURCE)
+				
+			load(path, parameters={'l': 3}, backend=self.backend)
+			
+		self.assertEqual(len(self.edges()), 3)
+		
+	def test_batches(self):
+		load(io.StringIO(SOURCE), parameters={'l': 3}, backend=self.backend, batch_size=1)
+		
+		self.assertEqual(self.backend.return_value.add_nodes_from.call_count, 4)
+		self.assertEqual(self.edges(), [
+			('Center', 42, {'length': 3}),
+			('Center', 1, {}),
+			(72, 'Center', {})
+		])
+		
+	def test_undefined_name(self):
+		self.assertRaises(GraphNotDefinedException, load, io.StringIO('(1) -{}> a\n'), backend=self.backend)
+		
+	def test_loop(self):
+		source = 'hub = (0)\nfor i in range(1, n):\n\thub -{w: i * 2}> (i)\n(n)\n'
+		g = load(io.StringIO(source), parameters={'n': 4}, backend=self.backend, batch_size=1)
+		
+		self.assertEqual(self.edges(), [(0, 1, {'w': 2}), (0, 2, {'w': 4}), (0, 3, {'w': 6})])
+		
+	@unittest.skipUnless(nxbackend.imported, 'networkx not installed')
+	def test_networkx(self):
+		g = load(io.StringIO(SOURCE), parameters={'l': 3}, batch_size=2)
+		
+		self.assertEqual(list(g.nodes(data=True)), [('Center', {'weight': 100}), (42, {}), (72, {'color': 'red'}), (1, {})])
+		self.assertEqual(g.number_of_edges(), 3)
+		
+		
+if __name__ == '__main__':
+	unittest.main()
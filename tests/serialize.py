@@ -0,0 +1,224 @@
+#!/usr/bin/env python3
+
+import gc
+import random
+import fractions
+import unittest
+import unittest.mock
+import context
+
+from GraphDSL import serialize
+from GraphDSL.Factory import Graph
+from GraphDSL.GraphAst import *
+from GraphDSL.Plan import GraphPlanner
+from GraphDSL.Exceptions import GraphException, GraphFormatException
+
+LITERALS = [0, 1, -1, 2**70, 1.5, float('inf'), True, False, None, '', 'x', 'é', b'\x00', (1, 'a'), [1, [2]], {'k': (1,)}, {1, 2}, 1j]
+
+
+def random_value(rnd, literals):
+	if rnd.random() < 0.2:
+		return GraphAstGetValue(rnd.choice(['p', 'q', 'long_parameter_name']))
+	if literals and rnd.random() < 0.3: # Shared literal node
+		return rnd.choice(literals)
+	literal = GraphAstLitteralValue(rnd.choice(LITERALS))
+	literals.append(literal)
+	return literal
+
+def random_data(rnd, literals, dicts):
+	if dicts and rnd.random() < 0.3: # Shared dict
+		return rnd.choice(dicts)
+	data = {f'k{rnd.randrange(300)}': random_value(rnd, literals) for i in range(rnd.randrange(4))}
+	dicts.append(data)
+	return data
+
+def random_node(rnd, literals, dicts, depth=0):
+	kind = rnd.randrange(6 if depth < 4 else 3)
+	
+	if kind == 0:
+		return GraphAstNodedef(random_value(rnd, literals) if rnd.random() < 0.9 else None, random_data(rnd, literals, dicts))
+	if kind == 1:
+		return GraphAstGetNode(rnd.choice(['a', 'b']))
+	if kind == 2:
+		return GraphAstNodedef(random_value(rnd, literals), None)
+	if kind == 3:
+		return GraphAstAssignation(rnd.choice(['a', 'b']), random_node(rnd, literals, dicts, depth + 1))
+	if kind == 4:
+		return GraphAstEdge(
+			random_node(rnd, literals, dicts, depth + 1),
+			random_node(rnd, literals, dicts, depth + 1),
+			random_data(rnd, literals, dicts),
+			*rnd.choice([('-', '>'), ('<', '-'), ('<', '>'), ('-', '-')])
+		)
+	
+	count = rnd.randrange(2, 5)
+	return GraphAstChain(
+		[random_node(rnd, literals, dicts, depth + 1) for i in range(count)],
+		[GraphAstEdgeSpec(random_data(rnd, literals, dicts), '-', '>') for i in range(count - 1)]
+	)
+
+def random_graphdef(seed):
+	rnd = random.Random(seed)
+	literals, dicts = [], []
+	return GraphDef([random_node(rnd, literals, dicts) for i in range(rnd.randrange(30))])
+
+
+def shared(ast):
+	'''
+		Positions of repeated literal nodes and dicts, in traversal order
+	'''
+	seen = {}
+	positions = []
+	work = [ast]
+	
+	while work:
+		item = work.pop()
+		if isinstance(item, (GraphAstLitteralValue, dict)):
+			positions.append(seen.setdefault(id(item), len(seen)))
+		if isinstance(item, dict):
+			work += item.values()
+		elif isinstance(item, GraphAst):
+			for name in item.__slots__:
+				value = getattr(item, name)
+				work += value if isinstance(value, list) else [value]
+				
+	return positions
+
+
+class TestSerialize(unittest.TestCase):
+	
+	def test_ast_round_trip(self):
+		for seed in range(200):
+			ast = random_graphdef(seed)
+			loaded = serialize.loads(serialize.dumps(ast))
+			
+			self.assertEqual(repr(loaded), repr(ast), seed)
+			self.assertEqual(shared(loaded), shared(ast), seed)
+			
+	def test_literal_types(self):
+		ast = GraphDef([GraphAstNodedef(GraphAstLitteralValue(v), {}) for v in LITERALS])
+		loaded = serialize.loads(serialize.dumps(ast))
+		
+		for node, value in zip(loaded.nodes, LITERALS):
+			self.assertIs(type(node.value.value), type(value))
+			
+	def test_pickled_literals(self):
+		# Compiled ASTs only have marshallable literals
+		ast = GraphDef([GraphAstNodedef(GraphAstLitteralValue(fractions.Fraction(1, 3)), {})])
+		with self.assertRaises(GraphFormatException):
+			serialize.dumps(ast)
+			
+		plan = GraphPlanner(ast, graph_directed=True).lower()
+		data = serialize.dumps(plan)
+		with self.assertRaisesRegex(GraphFormatException, 'allow_pickle'):
+			serialize.loads(data)
+		self.assertEqual(serialize.loads(data, allow_pickle=True).node_values, [fractions.Fraction(1, 3)])
+		
+	def test_pickled_ast(self):
+		# An AST payload claiming pickled literals is never unpickled
+		data = bytearray(serialize.dumps(random_graphdef(1)))
+		data[6] = serialize.PICKLE
+		
+		with unittest.mock.patch('pickle.loads') as loads:
+			for allow_pickle in (False, True):
+				with self.assertRaises(GraphFormatException):
+					serialize.loads(bytes(data), allow_pickle=allow_pickle)
+		loads.assert_not_called()
+		
+	def test_long_chain(self):
+		ast = GraphDef([GraphAstNodedef(GraphAstLitteralValue(0), {})])
+		for i in range(1, 5000):
+			ast.nodes[0] = GraphAstEdge(GraphAstNodedef(GraphAstLitteralValue(i), {}), ast.nodes[0], {}, '-', '>')
+			
+		# Too deep for repr / ==, encodings are compared instead
+		data = serialize.dumps(ast)
+		self.assertEqual(serialize.dumps(serialize.loads(data)), data)
+		
+	def test_compiled(self):
+		@Graph(directed=True, default_node_params={'size': 1})
+		def g(clr, n):
+			a = (1, {color: clr}) -{w: 1.5}> (2) <{}> (3)
+			a -{w: n}> (n)
+			() -{}> (4)
+			
+		self.assertEqual(serialize.loads(serialize.dumps(g.ast)), g.ast)
+		
+	def test_loops(self):
+		@Graph(directed=True)
+		def g(n, c):
+			hub = (-1)
+			for i in range(1, n * 2, 2):
+				for j in range(i):
+					(i * 100 + j, {color: c}) -{w: (i + j) % 3}> hub
+			(n // 2)
+			
+		self.assertEqual(serialize.loads(serialize.dumps(g.ast)), g.ast)
+		
+		plan = g.lower({'n': 3})
+		self.assertEqual(serialize.loads(serialize.dumps(plan)).structural, {'n'})
+		
+	def test_groups(self):
+		@Graph(directed=True)
+		def g(c):
+			hub = (0)
+			hub -{w: c}> [(1), (2), hub] -{}> [(3)]
+			[] -{}> hub
+			
+		self.assertEqual(serialize.loads(serialize.dumps(g.ast)), g.ast)
+		
+	def test_plan_round_trip(self):
+		for seed in range(200):
+			ast = random_graphdef(seed)
+			try:
+				plan = GraphPlanner(ast, graph_directed=True).lower()
+			except GraphException: # Undefined node names
+				continue
+				
+			loaded = serialize.loads(serialize.dumps(plan))
+			
+			for field in ('node_values', 'value_holes', 'node_data_holes', 'edges', 'edge_data_holes', 'inputs', 'dependents', 'edge_holes'):
+				self.assertEqual(getattr(loaded, field), getattr(plan, field), field)
+			self.assertEqual(repr(loaded.node_data), repr(plan.node_data))
+			self.assertEqual(repr(loaded.edge_data), repr(plan.edge_data))
+			self.assertEqual([*loaded.outputs.items()], [*plan.outputs.items()])
+			
+	def test_invalid(self):
+		data = serialize.dumps(random_graphdef(1))
+		
+		for bad in (b'', b'GDSL', b'PKL' + data[3:], data[:4] + bytes((99,)) + data[5:], data[:-1]):
+			with self.assertRaises(GraphFormatException):
+				serialize.loads(bad)
+				
+		with self.assertRaises(GraphFormatException):
+			serialize.dumps([])
+			
+	def test_invalid_pickle(self):
+		ast = GraphDef([GraphAstNodedef(GraphAstLitteralValue(fractions.Fraction(1, 3)), {})])
+		data = serialize.dumps(GraphPlanner(ast, graph_directed=True).lower())
+		
+		for old, new in ((b'fractions', b'fractionz'), (b'Fraction', b'Fractiom'), (b'\x80', b'\x00')):
+			self.assertIn(old, data)
+			with self.assertRaises(GraphFormatException):
+				serialize.loads(data.replace(old, new, 1), allow_pickle=True)
+				
+	def test_version(self):
+		data = serialize.dumps(random_graphdef(1))
+		self.assertEqual(data[4], serialize.VERSION)
+		
+		with self.assertRaisesRegex(GraphFormatException, 'version'):
+			serialize.loads(data[:4] + bytes((serialize.VERSION - 1,)) + data[5:])
+				
+	def test_gc_restored(self):
+		data = serialize.dumps(GraphDef([GraphAstNodedef(GraphAstLitteralValue(i), {}) for i in range(50000)]))
+		self.assertGreater(len(data), serialize.NO_GC_SIZE)
+		
+		for payload in (data, data[:-1]):
+			try:
+				serialize.loads(payload)
+			except GraphFormatException:
+				pass
+			self.assertTrue(gc.isenabled())
+			
+			
+if __name__ == '__main__':
+	unittest.main()
@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+
+import json
+import unittest
+import context
+
+from GraphDSL.Factory import Graph
+from GraphDSL.Stats import GraphStats
+from GraphDSL.backend.abstract import Backend
+from GraphDSL.backend import array as arraybackend
+
+class NodeByNodeBackend(arraybackend.ArrayBackend):
+	# Inherits the per node / per edge bulk insertion
+	add_nodes_from = Backend.add_nodes_from
+	add_edges_from = Backend.add_edges_from
+
+	def add_node(self, graph, value, data):
+		return graph.add_nodes([(value, data)])[0]
+
+	def add_edge(self, graph, n1, n2, data):
+		return graph.add_edges([(n1, n2, data)])[0]
+
+
+class TestStats(unittest.TestCase):
+
+	def define(self, **kwargs):
+		@Graph(directed=True, **kwargs)
+		def g(c, l):
+			a = (1, {color: c}) -{length: l}> (2)
+			(3) -{}> a -{}> (4)
+
+		return g
+
+	def test_phases(self):
+		g = self.define(stats=True)
+		g(parameters={'c': 'red', 'l': 1}, backend=arraybackend)
+		g(parameters={'c': 'red', 'l': 2}, backend=arraybackend)
+
+		phases = g.stats.to_dict()['phases']
+
+		self.assertEqual(phases['source']['calls'], 1)
+		self.assertEqual(phases['compile']['calls'], 1)
+		self.assertEqual(phases['lower']['calls'], 1)
+		self.assertEqual(phases['build']['calls'], 2)
+		self.assertEqual(phases['backend.add_nodes_from']['calls'], 2)
+		self.assertEqual(phases['backend.add_edges_from']['calls'], 2)
+		self.assertNotIn('backend.add_node', phases)
+
+		for entry in phases.values():
+			self.assertGreaterEqual(entry['seconds'], 0)
+
+	def test_counts(self):
+		g = self.define(stats=True)
+		g(parameters={'c': 'red', 'l': 1}, backend=arraybackend)
+
+		counts = g.stats.to_dict()['counts']
+
+		self.assertEqual(counts['builds'], 1)
+		self.assertEqual(counts['nodes'], 4)
+		self.assertEqual(counts['edges'], 3)
+		self.assertGreater(counts['tokens'], 30)
+
+	def test_backend_self_calls(self):
+		g = self.define(stats=True)
+		g(parameters={'c': 'red', 'l': 1}, backend=NodeByNodeBackend)
+
+		phases = g.stats.to_dict()['phases']
+		self.assertEqual(phases['backend.add_node']['calls'], 4)
+		self.assertEqual(phases['backend.add_edge']['calls'], 3)
+
+	def test_rebuild(self):
+		g = self.define(stats=True, rebuildable=True)
+		p = g(parameters={'c': 'red', 'l': 1}, backend=arraybackend)
+		g.rebuild(p, {'c': 'blue', 'l': 1})
+
+		phases = g.stats.to_dict()['phases']
+		self.assertEqual(phases['overlay']['calls'], 1)
+		self.assertEqual(phases['backend.update_nodes']['calls'], 1)
+		self.assertEqual(phases['build']['calls'], 1)
+
+	def test_shared_and_hook(self):
+		events = []
+		stats = GraphStats(hook=lambda phase, seconds: events.append(phase))
+
+		g1 = self.define(stats=stats)
+		g2 = self.define(stats=stats, lazy=True)
+		g2(parameters={'c': 'red', 'l': 1}, backend=arraybackend)
+
+		self.assertEqual(stats.to_dict()['phases']['compile']['calls'], 2)
+		self.assertEqual(events.count('compile'), 2)
+		self.assertEqual(events[-1], 'build')
+
+	def test_json(self):
+		g = self.define(stats=True)
+		g(parameters={'c': 'red', 'l': 1}, backend=arraybackend)
+
+		self.assertEqual(json.loads(g.stats.to_json()), g.stats.to_dict())
+
+		g.stats.reset()
+		self.assertEqual(g.stats.to_dict(), {'phases': {}, 'counts': {}})
+
+	def test_disabled(self):
+		g = self.define()
+		self.assertIsNone(g.stats)
+
+		builder = g.builder({'c': 'red', 'l': 1}, arraybackend)
+		self.assertNotIn('add_nodes_from', vars(builder.backend))
+
+
+if __name__ == '__main__':
+	unittest.main()